@@ -0,0 +1,3 @@
+"""
+Offline performance benchmarks. Run a benchmark as a module, e.g. python -m benchmarks.fsm_engine
+"""
@@ -0,0 +1,116 @@
+"""
+Compares per-action latency of the internal FSM engine against transitions.Machine.
+
+Usage: python -m benchmarks.fsm_engine [--num-actions N]
+"""
+import argparse
+import time
+from typing import Dict, List
+
+import numpy as np
+
+import openlock.finite_state_machine as finite_state_machine
+from openlock.envs.openlock_env import OpenLockEnv
+
+SCENARIOS = ["CC3", "CE3", "CC4", "CE4"]
+ACTION_LIMIT = 3
+ATTEMPT_LIMIT = 30
+
+
+def make_env(scenario_name: str, engine: str) -> OpenLockEnv:
+    default_engine = finite_state_machine.DEFAULT_ENGINE
+    finite_state_machine.DEFAULT_ENGINE = engine
+    try:
+        env = OpenLockEnv()
+        env.use_physics = False
+        env.initialize_for_scenario(scenario_name)
+        env.setup_trial(
+            scenario_name=scenario_name,
+            action_limit=ACTION_LIMIT,
+            attempt_limit=ATTEMPT_LIMIT,
+            multiproc=True,
+        )
+        env.reset()
+    finally:
+        finite_state_machine.DEFAULT_ENGINE = default_engine
+    return env
+
+
+def time_fsm_actions(env: OpenLockEnv, action_idxs: np.ndarray) -> float:
+    """
+    :return: mean seconds per Scenario.execute_fsm_action call
+    """
+    actions = [env.action_map_external_role[env.action_space[i]] for i in action_idxs]
+    scenario = env.scenario
+    start = time.perf_counter()
+    for i, action in enumerate(actions):
+        if i % ACTION_LIMIT == 0:
+            scenario.reset()
+        if action.obj == "door":
+            scenario.push_door()
+        else:
+            scenario.execute_fsm_action(action)
+    return (time.perf_counter() - start) / len(actions)
+
+
+def time_env_steps(env: OpenLockEnv, action_idxs: np.ndarray) -> float:
+    """
+    :return: mean seconds per OpenLockEnv.step call, excluding attempt resets
+    """
+    actions = [env.action_map[env.action_space[i]] for i in action_idxs]
+    total = 0.0
+    for action in actions:
+        start = time.perf_counter()
+        _, _, done, _ = env.step(action)
+        total += time.perf_counter() - start
+        if done:
+            env.finish_attempt()
+            if env.attempt_count >= ATTEMPT_LIMIT:
+                env.attempt_count = 0
+            env.reset()
+    return total / len(actions)
+
+
+def run(num_actions: int, seed: int = 0) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """
+    :param num_actions: number of random actions timed per scenario and engine
+    :param seed: seed for the random action sequence
+    :return: results[scenario][engine] = {"fsm_action_us": ..., "env_step_us": ...}
+    """
+    results = dict()
+    for scenario_name in SCENARIOS:
+        results[scenario_name] = dict()
+        for engine in finite_state_machine.MACHINE_ENGINES.keys():
+            env = make_env(scenario_name, engine)
+            rng = np.random.RandomState(seed)
+            action_idxs = rng.randint(0, len(env.action_space), size=num_actions)
+            fsm_action = time_fsm_actions(env, action_idxs)
+            env.reset()
+            env_step = time_env_steps(env, action_idxs)
+            results[scenario_name][engine] = {
+                "fsm_action_us": fsm_action * 1e6,
+                "env_step_us": env_step * 1e6,
+            }
+    return results
+
+
+def main(args: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--num-actions", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    parsed = parser.parse_args(args)
+
+    results = run(parsed.num_actions, parsed.seed)
+    engines = list(finite_state_machine.MACHINE_ENGINES.keys())
+    print(f"{'scenario':<10}{'engine':<14}{'fsm action (us)':>18}{'env step (us)':>16}")
+    for scenario_name, by_engine in results.items():
+        for engine in engines:
+            timings = by_engine[engine]
+            print(
+                f"{scenario_name:<10}{engine:<14}"
+                f"{timings['fsm_action_us']:>18.2f}{timings['env_step_us']:>16.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
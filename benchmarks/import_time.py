@@ -0,0 +1,104 @@
+"""
+Measures the startup cost of a fresh interpreter that imports openlock, and of one that runs an
+FSM-only (use_physics=False) or a physics trial setup, and reports which of the physics, shapely
+and rendering modules each one loaded. Each case runs in its own subprocess, so nothing is cached
+between repeats.
+
+Usage: python -m benchmarks.import_time [--repeats N]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+# modules only the physics simulator, clickable regions and rendering need
+HEAVY_MODULES = ["Box2D", "shapely", "pyglet", "openlock.envs.world_defs.openlock_def"]
+
+_SETUP = """
+env = OpenLockEnv()
+env.use_physics = {use_physics}
+env.human_agent = False
+env.initialize_for_scenario("CC3")
+env.setup_trial(scenario_name="CC3", action_limit=3, attempt_limit=3, multiproc=True)
+env.reset()
+"""
+
+CASES = {
+    "import openlock": "import openlock",
+    "import openlock.envs": "import openlock.envs",
+    "fsm trial": "from openlock.envs.openlock_env import OpenLockEnv\n"
+    + _SETUP.format(use_physics=False),
+    "physics trial": "from openlock.envs.openlock_env import OpenLockEnv\n"
+    + _SETUP.format(use_physics=True),
+}
+
+_REPORT = """
+import json, sys
+print(json.dumps([name for name in {heavy} if name in sys.modules]))
+"""
+
+
+def time_case(code: str) -> Dict:
+    """
+    :param code: Python source run in a fresh interpreter
+    :return: wall clock seconds of the interpreter and the heavy modules it loaded
+    """
+    start = time.perf_counter()
+    output = subprocess.run(
+        [
+            sys.executable,
+            "-W",
+            "ignore",
+            "-c",
+            code + _REPORT.format(heavy=HEAVY_MODULES),
+        ],
+        check=True,
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    ).stdout
+    seconds = time.perf_counter() - start
+    return {"seconds": seconds, "loaded": json.loads(output.splitlines()[-1])}
+
+
+def run(repeats: int) -> Dict[str, Dict]:
+    """
+    :param repeats: number of interpreters started per case
+    :return: per case, the median and min wall clock milliseconds and the heavy modules loaded
+    """
+    # the baseline cost of starting the interpreter
+    baseline = statistics.median(time_case("")["seconds"] for _ in range(repeats))
+    results = {}
+    for name, code in CASES.items():
+        timings = [time_case(code) for _ in range(repeats)]
+        seconds = [timing["seconds"] for timing in timings]
+        results[name] = {
+            "median_ms": 1e3 * statistics.median(seconds),
+            "min_ms": 1e3 * min(seconds),
+            "over_interpreter_ms": 1e3 * (statistics.median(seconds) - baseline),
+            "loaded": timings[0]["loaded"],
+        }
+    return results
+
+
+def main(args: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeats", type=int, default=5)
+    parsed = parser.parse_args(args)
+
+    results = run(parsed.repeats)
+    print(
+        f"{'case':<22}{'median (ms)':>13}{'min (ms)':>10}{'over python (ms)':>18}"
+        f"  heavy modules loaded"
+    )
+    for name, timings in results.items():
+        print(
+            f"{name:<22}{timings['median_ms']:>13.1f}{timings['min_ms']:>10.1f}"
+            f"{timings['over_interpreter_ms']:>18.1f}  {', '.join(timings['loaded'])}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Measures one damped least squares inverse kinematics iteration of the five link arm, as in
+OpenLockEnv._solve_inverse_kinematics, with the general homogeneous transform path
+(InverseKinematics) and the closed form planar path (PlanarInverseKinematics), and the per-config
+cost of a batched planar iteration over many configs.
+
+Usage: python -m benchmarks.kinematics [--num-iters N] [--batch-size N]
+"""
+import argparse
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from openlock.kine import (
+    InverseKinematics,
+    KinematicChain,
+    PlanarInverseKinematics,
+    TwoDKinematicTransform,
+    generate_five_arm,
+    planar_delta_theta_dls,
+    planar_error_vec,
+    planar_forward_kinematics,
+    planar_jacobian,
+)
+from openlock.settings_render import BOX2D_SETTINGS, ENV_SETTINGS
+
+LAMBDA = ENV_SETTINGS["INVK_DLS_LAMBDA"]
+
+
+def make_chain() -> KinematicChain:
+    return KinematicChain(
+        TwoDKinematicTransform(),
+        generate_five_arm(*BOX2D_SETTINGS["INITIAL_THETA_VECTOR"]),
+    )
+
+
+def time_iteration(ik_class, num_iters: int) -> float:
+    """
+    :return: mean seconds per error and delta theta evaluation
+    """
+    invkine = ik_class(make_chain(), TwoDKinematicTransform(x=5, y=10, theta=1))
+    start = time.perf_counter()
+    for _ in range(num_iters):
+        invkine.get_error()
+        invkine.get_delta_theta_dls(lam=LAMBDA)
+    return (time.perf_counter() - start) / num_iters
+
+
+def time_batched_iteration(batch_size: int, num_iters: int) -> float:
+    """
+    :return: mean seconds per config of a batched error and delta theta evaluation
+    """
+    rng = np.random.RandomState(0)
+    geometry = make_chain().get_planar_geometry()
+    bases = np.zeros((batch_size, 3))
+    thetas = rng.uniform(-np.pi, np.pi, size=(batch_size, len(geometry[2])))
+    targets = rng.uniform(-10, 10, size=(batch_size, 3))
+    start = time.perf_counter()
+    for _ in range(num_iters):
+        joint_positions, end_poses = planar_forward_kinematics(bases, thetas, geometry)
+        err_vecs = planar_error_vec(end_poses, targets)
+        np.linalg.norm(err_vecs, axis=-1)
+        planar_delta_theta_dls(planar_jacobian(joint_positions), err_vecs, LAMBDA)
+    return (time.perf_counter() - start) / num_iters / batch_size
+
+
+def run(num_iters: int, batch_size: int) -> Dict[str, float]:
+    """
+    :return: microseconds per iteration of each measurement
+    """
+    return {
+        "general_iteration_us": time_iteration(InverseKinematics, num_iters) * 1e6,
+        "planar_iteration_us": time_iteration(PlanarInverseKinematics, num_iters) * 1e6,
+        "batched_planar_iteration_us": time_batched_iteration(
+            batch_size, max(1, num_iters // 100)
+        )
+        * 1e6,
+    }
+
+
+def main(args: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--num-iters", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parsed = parser.parse_args(args)
+
+    results = run(parsed.num_iters, parsed.batch_size)
+    for name, value in results.items():
+        print(f"{name:<30}{value:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
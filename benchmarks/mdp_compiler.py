@@ -0,0 +1,67 @@
+"""
+Measures the time to compile trials into MDPs with openlock.mdp_compiler and to solve them with value
+and policy iteration.
+
+Usage: python -m benchmarks.mdp_compiler [--reward-mode MODE] [--gamma GAMMA]
+"""
+import argparse
+import time
+from typing import Dict, List
+
+from openlock.mdp_compiler import compile_trial
+
+# (scenario, action limit), the delay scenarios have solutions of 4 actions
+SCENARIOS = [("CC3", 3), ("CE3", 3), ("CC4", 3), ("CE4", 3), ("CC3D", 4), ("CE4D", 4)]
+
+
+def run(reward_mode: str, gamma: float) -> Dict[str, Dict[str, float]]:
+    """
+    :param reward_mode: reward mode of the MDPs
+    :param gamma: discount factor
+    :return: results[scenario] = {"states": ..., "outcomes": ..., "compile_ms": ..., "vi_ms": ...,
+    "pi_ms": ...}, for the first trial of every scenario
+    """
+    results = dict()
+    for scenario_name, action_limit in SCENARIOS:
+        start = time.perf_counter()
+        mdp = compile_trial(scenario_name, None, reward_mode, action_limit)
+        compile_ms = (time.perf_counter() - start) * 1e3
+        start = time.perf_counter()
+        mdp.value_iteration(gamma)
+        vi_ms = (time.perf_counter() - start) * 1e3
+        start = time.perf_counter()
+        mdp.policy_iteration(gamma)
+        pi_ms = (time.perf_counter() - start) * 1e3
+        results[scenario_name] = {
+            "states": mdp.num_states,
+            "outcomes": len(mdp.next_states),
+            "compile_ms": compile_ms,
+            "vi_ms": vi_ms,
+            "pi_ms": pi_ms,
+        }
+    return results
+
+
+def main(args: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--reward-mode", default="negative_immovable_partial_action_seq"
+    )
+    parser.add_argument("--gamma", type=float, default=0.99)
+    parsed = parser.parse_args(args)
+
+    results = run(parsed.reward_mode, parsed.gamma)
+    print(
+        f"{'scenario':<10}{'states':>8}{'outcomes':>10}{'compile (ms)':>14}"
+        f"{'VI (ms)':>10}{'PI (ms)':>10}"
+    )
+    for scenario_name, timings in results.items():
+        print(
+            f"{scenario_name:<10}{timings['states']:>8}{timings['outcomes']:>10}"
+            f"{timings['compile_ms']:>14.1f}{timings['vi_ms']:>10.1f}"
+            f"{timings['pi_ms']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
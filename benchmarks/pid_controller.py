@@ -0,0 +1,112 @@
+"""
+Measures the per-tick cost of the arm's cascade controller: list-based PIDController against
+ArrayPIDController, and ArmLockDef.step against ArmLockDefBatch.step over several worlds.
+
+Usage: python -m benchmarks.pid_controller [--num-ticks N] [--num-worlds N]
+"""
+import argparse
+import time
+from typing import Dict, List
+
+import numpy as np
+
+import openlock.common as common
+from openlock.envs.openlock_env import OpenLockEnv
+from openlock.envs.world_defs.openlock_def import ArmLockDefBatch
+from openlock.pid_central import ArrayPIDController, PIDController
+from openlock.settings_render import BOX2D_SETTINGS
+
+NUM_JOINTS = 5
+STEP_ARGS = (
+    1.0 / BOX2D_SETTINGS["FPS"],
+    BOX2D_SETTINGS["VEL_ITERS"],
+    BOX2D_SETTINGS["POS_ITERS"],
+)
+
+
+def time_cascade(controller_class, num_ticks: int) -> float:
+    """
+    :return: mean seconds per tick of a position and velocity controller update, as in
+    ArmLockDef.update_cascade_controller with POS_PID_CLK_DIV = 1
+    """
+    pos_controller = controller_class(
+        [10] * NUM_JOINTS,
+        [1] * NUM_JOINTS,
+        [0] * NUM_JOINTS,
+        [0.1] * NUM_JOINTS,
+        STEP_ARGS[0],
+        max_out=1.5,
+        err_wrap_func=common.wrapToMinusPiToPi,
+    )
+    vel_controller = controller_class(
+        [17000] * NUM_JOINTS,
+        [0] * NUM_JOINTS,
+        [0] * NUM_JOINTS,
+        [0] * NUM_JOINTS,
+        STEP_ARGS[0],
+        max_out=30000,
+    )
+    rng = np.random.RandomState(0)
+    values = rng.uniform(-1, 1, size=(num_ticks, 2, NUM_JOINTS)).tolist()
+    start = time.perf_counter()
+    for theta, speeds in values:
+        vel_controller.set_setpoint(pos_controller.update(theta))
+        vel_controller.update(speeds)
+    return (time.perf_counter() - start) / num_ticks
+
+
+def make_world_defs(num_worlds: int) -> list:
+    env = OpenLockEnv()
+    env.use_physics = True
+    env.human_agent = False
+    env.initialize_for_scenario("CC3")
+    env.setup_trial(
+        scenario_name="CC3", action_limit=3, attempt_limit=10, specified_trial="trial1"
+    )
+    world_defs = [env.init_world_def() for _ in range(num_worlds)]
+    for world_def in world_defs:
+        world_def.set_controllers([0.5, -0.5, 0.3, 0.2, 0.1])
+    return world_defs
+
+
+def time_world_steps(num_worlds: int, num_ticks: int, batched: bool) -> float:
+    """
+    :return: mean seconds per world per tick
+    """
+    world_defs = make_world_defs(num_worlds)
+    batch = ArmLockDefBatch(world_defs)
+    start = time.perf_counter()
+    for _ in range(num_ticks):
+        if batched:
+            batch.step(*STEP_ARGS)
+        else:
+            for world_def in world_defs:
+                world_def.step(*STEP_ARGS)
+    return (time.perf_counter() - start) / num_ticks / num_worlds
+
+
+def run(num_ticks: int, num_worlds: int) -> Dict[str, float]:
+    """
+    :return: microseconds per tick of each measurement
+    """
+    return {
+        "list_cascade_us": time_cascade(PIDController, num_ticks) * 1e6,
+        "array_cascade_us": time_cascade(ArrayPIDController, num_ticks) * 1e6,
+        "world_step_us": time_world_steps(num_worlds, num_ticks, False) * 1e6,
+        "batched_world_step_us": time_world_steps(num_worlds, num_ticks, True) * 1e6,
+    }
+
+
+def main(args: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--num-ticks", type=int, default=5000)
+    parser.add_argument("--num-worlds", type=int, default=8)
+    parsed = parser.parse_args(args)
+
+    results = run(parsed.num_ticks, parsed.num_worlds)
+    for name, value in results.items():
+        print(f"{name:<24}{value:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Measures the time to recompute the observations and rewards of recorded trials, by stepping an
+OpenLockEnv through them and by replaying them with openlock.replay, in this process and in a pool
+of worker processes.
+
+Usage: python -m benchmarks.replay [--num-records N] [--num-workers N]
+"""
+import argparse
+import os
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from openlock.envs.openlock_env import OpenLockEnv
+from openlock.replay import ReplayRecord, TrialReplayer, replay_records
+
+SCENARIOS = ["CC3", "CE4", "CC3D", "CE4D"]
+ACTION_LIMIT = 3
+ATTEMPT_LIMIT = 30
+REWARD_MODE = "negative_immovable_partial_action_seq"
+
+
+def make_records(scenario_name: str, num_records: int) -> List[ReplayRecord]:
+    """
+    :return: records of uniformly random actions in the first trial of scenario_name
+    """
+    replayer = TrialReplayer(scenario_name, None)
+    random_state = np.random.RandomState(0)
+    return [
+        ReplayRecord(
+            scenario_name,
+            replayer.trial_name,
+            tuple(
+                tuple(random_state.choice(replayer.action_space, ACTION_LIMIT))
+                for _ in range(ATTEMPT_LIMIT)
+            ),
+            seed,
+            ACTION_LIMIT,
+            ATTEMPT_LIMIT,
+        )
+        for seed in range(num_records)
+    ]
+
+
+def step_records(records: List[ReplayRecord]) -> None:
+    env = OpenLockEnv()
+    env.use_physics = False
+    env.reward_mode = REWARD_MODE
+    env.initialize_for_scenario(records[0].scenario_name)
+    for record in records:
+        env.setup_trial(
+            scenario_name=record.scenario_name,
+            action_limit=record.action_limit,
+            attempt_limit=record.attempt_limit,
+            specified_trial=record.trial_name,
+            multiproc=True,
+        )
+        env.seed(record.seed)
+        for attempt in record.attempts:
+            env.reset()
+            for action_name in attempt:
+                env.step(env.action_map[action_name])
+            env.finish_attempt()
+
+
+def run(num_records: int, num_workers: int) -> Dict[str, Dict[str, float]]:
+    """
+    :param num_records: number of recorded trials per scenario
+    :param num_workers: number of worker processes of the parallel replay
+    :return: results[scenario] = {"env_ms": ..., "replay_ms": ..., "parallel_ms": ...}, total
+    milliseconds to process the records
+    """
+    results = dict()
+    for scenario_name in SCENARIOS:
+        records = make_records(scenario_name, num_records)
+        timings = dict()
+        start = time.perf_counter()
+        step_records(records)
+        timings["env_ms"] = (time.perf_counter() - start) * 1e3
+        start = time.perf_counter()
+        replay_records(records, REWARD_MODE, num_workers=0)
+        timings["replay_ms"] = (time.perf_counter() - start) * 1e3
+        start = time.perf_counter()
+        replay_records(records, REWARD_MODE, num_workers=num_workers)
+        timings["parallel_ms"] = (time.perf_counter() - start) * 1e3
+        results[scenario_name] = timings
+    return results
+
+
+def main(args: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--num-records", type=int, default=200)
+    parser.add_argument("--num-workers", type=int, default=os.cpu_count() or 1)
+    parsed = parser.parse_args(args)
+
+    results = run(parsed.num_records, parsed.num_workers)
+    print(
+        f"{'scenario':<10}{'env (ms)':>12}{'replay (ms)':>14}{'parallel (ms)':>16}"
+        f"{'speedup':>10}"
+    )
+    for scenario_name, timings in results.items():
+        print(
+            f"{scenario_name:<10}{timings['env_ms']:>12.1f}"
+            f"{timings['replay_ms']:>14.1f}{timings['parallel_ms']:>16.1f}"
+            f"{timings['env_ms'] / timings['replay_ms']:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Measures OpenLockEnv.reset latency over 30-attempt trials, with the per-trial action and
+observation space caches and with the spaces rebuilt on every reset. With --physics, measures
+physics resets that restore the trial's Box2D world against resets that rebuild it.
+
+Usage: python -m benchmarks.reset_latency [--num-trials N] [--physics]
+"""
+import argparse
+import time
+from typing import Dict, List
+
+from openlock.envs.openlock_env import ActionSpace, ObservationSpace, OpenLockEnv
+
+SCENARIOS = ["CC3", "CE4", "CC3D", "CE4D"]
+# scenarios with a physics simulation
+PHYSICS_SCENARIOS = ["CC3", "CE4"]
+ACTION_LIMIT = 3
+ATTEMPT_LIMIT = 30
+
+
+def time_trial(scenario_name: str, cached: bool) -> float:
+    """
+    :return: mean seconds per reset over one trial of ATTEMPT_LIMIT attempts
+    """
+    env = OpenLockEnv()
+    env.use_physics = False
+    env.initialize_for_scenario(scenario_name)
+    env.setup_trial(
+        scenario_name=scenario_name,
+        action_limit=ACTION_LIMIT,
+        attempt_limit=ATTEMPT_LIMIT,
+        multiproc=True,
+    )
+    total = 0.0
+    for _ in range(ATTEMPT_LIMIT):
+        if not cached:
+            ActionSpace.cache.clear()
+            ObservationSpace.multi_discrete_cache.clear()
+            env.observation_space = None
+        start = time.perf_counter()
+        env.reset()
+        total += time.perf_counter() - start
+        env.finish_attempt()
+    return total / ATTEMPT_LIMIT
+
+
+def time_physics_trial(scenario_name: str, restore: bool) -> float:
+    """
+    :return: mean seconds per physics reset over one trial of ATTEMPT_LIMIT attempts, each
+    attempt taking one action
+    """
+    env = OpenLockEnv()
+    env.use_physics = True
+    env.human_agent = False
+    env.initialize_for_scenario(scenario_name)
+    env.setup_trial(
+        scenario_name=scenario_name,
+        action_limit=ACTION_LIMIT,
+        attempt_limit=ATTEMPT_LIMIT,
+        multiproc=True,
+    )
+    total = 0.0
+    for _ in range(ATTEMPT_LIMIT):
+        if not restore:
+            # without a world to restore, reset builds a new one
+            env.world_def = None
+        start = time.perf_counter()
+        env.reset()
+        total += time.perf_counter() - start
+        env.step(env.action_map[env.action_space[0]])
+        env.finish_attempt()
+    return total / ATTEMPT_LIMIT
+
+
+def run_physics(num_trials: int) -> Dict[str, Dict[str, float]]:
+    """
+    :param num_trials: number of trials timed per scenario and mode
+    :return: results[scenario] = {"restored_us": ..., "rebuilt_us": ...}, mean latency per reset
+    """
+    results = dict()
+    for scenario_name in PHYSICS_SCENARIOS:
+        results[scenario_name] = dict()
+        for restore in (True, False):
+            mean = (
+                sum(
+                    time_physics_trial(scenario_name, restore)
+                    for _ in range(num_trials)
+                )
+                / num_trials
+            )
+            key = "restored_us" if restore else "rebuilt_us"
+            results[scenario_name][key] = mean * 1e6
+    return results
+
+
+def run(num_trials: int) -> Dict[str, Dict[str, float]]:
+    """
+    :param num_trials: number of trials timed per scenario and mode
+    :return: results[scenario] = {"cached_us": ..., "uncached_us": ...}, mean latency per reset
+    """
+    results = dict()
+    for scenario_name in SCENARIOS:
+        results[scenario_name] = dict()
+        for cached in (True, False):
+            mean = (
+                sum(time_trial(scenario_name, cached) for _ in range(num_trials))
+                / num_trials
+            )
+            key = "cached_us" if cached else "uncached_us"
+            results[scenario_name][key] = mean * 1e6
+    return results
+
+
+def main(args: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--num-trials", type=int, default=20)
+    parser.add_argument("--physics", action="store_true")
+    parsed = parser.parse_args(args)
+
+    if parsed.physics:
+        results = run_physics(parsed.num_trials)
+        print(
+            f"{'scenario':<10}{'restored (us)':>16}{'rebuilt (us)':>16}{'speedup':>10}"
+        )
+        for scenario_name, timings in results.items():
+            print(
+                f"{scenario_name:<10}{timings['restored_us']:>16.2f}"
+                f"{timings['rebuilt_us']:>16.2f}"
+                f"{timings['rebuilt_us'] / timings['restored_us']:>10.2f}"
+            )
+        return
+
+    results = run(parsed.num_trials)
+    print(f"{'scenario':<10}{'cached (us)':>14}{'uncached (us)':>16}{'speedup':>10}")
+    for scenario_name, timings in results.items():
+        print(
+            f"{scenario_name:<10}{timings['cached_us']:>14.2f}"
+            f"{timings['uncached_us']:>16.2f}"
+            f"{timings['uncached_us'] / timings['cached_us']:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+Throughput and latency of every scenario accepted by settings_scenario.select_scenario.
+
+For each scenario and backend this measures scenario construction time, setup_trial latency, reset
+latency, env steps per second and the peak traced memory of one env. The backends are the FSM-only
+backend the scenario uses (Scenario with each state machine engine, or NoFsmScenario) and, for
+Scenario, the physics simulator. Scenarios or backends that fail to run are reported with their error.
+
+Results are written as JSON, to stdout or to --output.
+
+Usage: python -m benchmarks.suite [--num-steps N] [--num-physics-steps N] [--output FILE]
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+import openlock.finite_state_machine as finite_state_machine
+from openlock.envs.openlock_env import OpenLockEnv
+from openlock.scenario import NoFsmScenario
+from openlock.settings_scenario import SCENARIO_NAMES, select_scenario
+
+ACTION_LIMIT = 3
+ATTEMPT_LIMIT = 30
+PHYSICS_BACKEND = "physics"
+
+
+@contextlib.contextmanager
+def fsm_engine(engine: Optional[str]) -> Iterator[None]:
+    """
+    Make FiniteStateMachines built in this context use engine, if not None.
+    """
+    default_engine = finite_state_machine.DEFAULT_ENGINE
+    if engine is not None:
+        finite_state_machine.DEFAULT_ENGINE = engine
+    try:
+        yield
+    finally:
+        finite_state_machine.DEFAULT_ENGINE = default_engine
+
+
+def get_backends(scenario_name: str) -> Dict[str, Dict[str, Any]]:
+    """
+    :return: backends[name] = {"use_physics": ..., "engine": ...} for the backends of scenario_name
+    """
+    # NoFsmScenario has no physics simulator support
+    if isinstance(select_scenario(scenario_name, use_physics=False), NoFsmScenario):
+        return {"no_fsm": {"use_physics": False, "engine": None}}
+    backends = {
+        f"scenario[{engine}]": {"use_physics": False, "engine": engine}
+        for engine in finite_state_machine.MACHINE_ENGINES.keys()
+    }
+    backends[PHYSICS_BACKEND] = {"use_physics": True, "engine": None}
+    return backends
+
+
+def make_env(scenario_name: str, use_physics: bool) -> OpenLockEnv:
+    env = OpenLockEnv()
+    env.use_physics = use_physics
+    env.human_agent = False
+    env.initialize_for_scenario(scenario_name)
+    return env
+
+
+def setup_trial(env: OpenLockEnv, scenario_name: str) -> None:
+    env.setup_trial(
+        scenario_name=scenario_name,
+        action_limit=ACTION_LIMIT,
+        attempt_limit=ATTEMPT_LIMIT,
+        multiproc=True,
+    )
+
+
+def time_construction(scenario_name: str, use_physics: bool, num_repeats: int) -> float:
+    """
+    :return: mean seconds per select_scenario call
+    """
+    start = time.perf_counter()
+    for _ in range(num_repeats):
+        select_scenario(scenario_name, use_physics=use_physics)
+    return (time.perf_counter() - start) / num_repeats
+
+
+def time_setup_trial(env: OpenLockEnv, scenario_name: str, num_repeats: int) -> float:
+    """
+    :return: mean seconds per OpenLockEnv.setup_trial call
+    """
+    start = time.perf_counter()
+    for _ in range(num_repeats):
+        setup_trial(env, scenario_name)
+    return (time.perf_counter() - start) / num_repeats
+
+
+def time_steps(env: OpenLockEnv, num_steps: int, seed: int) -> Dict[str, float]:
+    """
+    Takes num_steps random actions, resetting after every attempt.
+
+    :return: {"steps_per_sec": ..., "reset_us": ...}, excluding resets from the step rate
+    """
+    env.reset()
+    rng = np.random.RandomState(seed)
+    action_idxs = rng.randint(0, len(env.action_space), size=num_steps)
+    step_time = 0.0
+    reset_time = 0.0
+    num_resets = 0
+    for action_idx in action_idxs:
+        action = env.action_map[env.action_space[action_idx]]
+        start = time.perf_counter()
+        _, _, done, _ = env.step(action)
+        step_time += time.perf_counter() - start
+        if done:
+            env.finish_attempt()
+            if env.attempt_count >= ATTEMPT_LIMIT:
+                env.attempt_count = 0
+            start = time.perf_counter()
+            env.reset()
+            reset_time += time.perf_counter() - start
+            num_resets += 1
+    # the action space is fixed by the trial, so resets are timed without re-drawing actions
+    if num_resets == 0:
+        start = time.perf_counter()
+        env.reset()
+        reset_time = time.perf_counter() - start
+        num_resets = 1
+    return {
+        "steps_per_sec": num_steps / step_time,
+        "reset_us": reset_time / num_resets * 1e6,
+    }
+
+
+def measure_peak_memory(scenario_name: str, use_physics: bool) -> float:
+    """
+    :return: peak traced memory in KiB of building an env, setting up a trial and one attempt
+    """
+    tracemalloc.start()
+    try:
+        env = make_env(scenario_name, use_physics)
+        setup_trial(env, scenario_name)
+        env.reset()
+        for action_name in env.action_space[:ACTION_LIMIT]:
+            env.step(env.action_map[action_name])
+        env.finish_attempt()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024
+
+
+def run_backend(
+    scenario_name: str,
+    use_physics: bool,
+    engine: Optional[str],
+    num_steps: int,
+    num_repeats: int,
+    seed: int,
+) -> Dict[str, float]:
+    """
+    :return: measurements of one scenario and backend
+    """
+    with fsm_engine(engine):
+        construction = time_construction(scenario_name, use_physics, num_repeats)
+        env = make_env(scenario_name, use_physics)
+        setup = time_setup_trial(env, scenario_name, num_repeats)
+        steps = time_steps(env, num_steps, seed)
+        peak_memory = measure_peak_memory(scenario_name, use_physics)
+    return {
+        "construction_us": construction * 1e6,
+        "setup_trial_us": setup * 1e6,
+        "reset_us": steps["reset_us"],
+        "steps_per_sec": steps["steps_per_sec"],
+        "peak_memory_kib": peak_memory,
+    }
+
+
+def run(
+    scenario_names: List[str],
+    num_steps: int,
+    num_physics_steps: int,
+    num_repeats: int,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    :param scenario_names: scenarios to benchmark
+    :param num_steps: number of random actions timed per FSM-only backend
+    :param num_physics_steps: number of random actions timed with the physics backend
+    :param num_repeats: number of scenario constructions and setup_trial calls timed
+    :param seed: seed for the random action sequences
+    :return: {"metadata": {...}, "results": results[scenario][backend]}, where results are
+    measurements or {"error": message}
+    """
+    results = dict()
+    for scenario_name in scenario_names:
+        results[scenario_name] = dict()
+        try:
+            backends = get_backends(scenario_name)
+        except Exception as e:
+            results[scenario_name] = {"error": repr(e)}
+            continue
+        for backend, params in backends.items():
+            steps = num_physics_steps if params["use_physics"] else num_steps
+            repeats = 1 if params["use_physics"] else num_repeats
+            try:
+                results[scenario_name][backend] = run_backend(
+                    scenario_name,
+                    num_steps=steps,
+                    num_repeats=repeats,
+                    seed=seed,
+                    **params,
+                )
+            except Exception as e:
+                results[scenario_name][backend] = {"error": repr(e)}
+    return {
+        "metadata": {
+            "time": datetime.datetime.now().isoformat(),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "num_steps": num_steps,
+            "num_physics_steps": num_physics_steps,
+            "num_repeats": num_repeats,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def main(args: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scenarios", nargs="+", default=SCENARIO_NAMES)
+    parser.add_argument("--num-steps", type=int, default=3000)
+    parser.add_argument("--num-physics-steps", type=int, default=6)
+    parser.add_argument("--num-repeats", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON output file, stdout if not given")
+    parsed = parser.parse_args(args)
+
+    results = run(
+        parsed.scenarios,
+        parsed.num_steps,
+        parsed.num_physics_steps,
+        parsed.num_repeats,
+        parsed.seed,
+    )
+    if parsed.output is None:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    else:
+        with open(parsed.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Measures the time and peak memory of recording a long run in TrialLog/AttemptLog. With --io,
+measures writing and reading the trial with jsonpickle and with the binary trial log format, and
+the time to compute the success rate of the attempts from each.
+
+Usage: python -m benchmarks.trial_log [--num-attempts N] [--io]
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, List
+
+import numpy as np
+
+from openlock.logger_env import ResultsTable, TrialLog
+from openlock.trial_log_file import TrialLogFile, write_trial_logs
+
+ACTIONS = [
+    "push_l0",
+    "pull_l0",
+    "push_l1",
+    "pull_l1",
+    "push_l2",
+    "pull_l2",
+    "push_door",
+]
+SOLUTIONS = [["push_l0", "push_l1", "push_door"], ["push_l0", "push_l2", "push_door"]]
+ACTION_LIMIT = 3
+COL_LABEL = ["frame"] + [f"s{i}" for i in range(8)] + ["agent"] + ACTIONS
+
+
+def record(num_attempts: int, seed: int = 0) -> TrialLog:
+    """
+    Records num_attempts attempts of random actions, the way OpenLockEnv drives the logs.
+
+    :return: the trial log
+    """
+    rng = np.random.RandomState(seed)
+    action_idxs = rng.randint(0, len(ACTIONS), size=(num_attempts, ACTION_LIMIT))
+    row = np.zeros(len(COL_LABEL), dtype=np.int32)
+    results = ResultsTable(COL_LABEL)
+
+    trial = TrialLog("trial1", "CC3", SOLUTIONS, time.time())
+    for attempt_idxs in action_idxs:
+        trial.add_attempt()
+        results.clear()
+        results.append(row)
+        for frame, action_idx in enumerate(attempt_idxs):
+            row[0] = frame
+            results.append(row)
+            trial.cur_attempt.add_action(ACTIONS[action_idx])
+            results.append(row)
+            trial.cur_attempt.finish_action(results)
+            trial.cur_attempt.add_reward(0)
+        trial.finish_attempt(results, [ACTIONS[i] for i in attempt_idxs])
+    return trial
+
+
+def run(num_attempts: int) -> Dict[str, float]:
+    """
+    :param num_attempts: number of attempts to record
+    :return: total seconds, microseconds per attempt and peak traced memory in MiB
+    """
+    start = time.perf_counter()
+    record(num_attempts)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    trial = record(num_attempts)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(trial.attempt_seq) == num_attempts
+
+    return {
+        "seconds": seconds,
+        "us_per_attempt": seconds / num_attempts * 1e6,
+        "peak_mib": peak / 2 ** 20,
+    }
+
+
+def run_io(num_attempts: int) -> Dict[str, Dict[str, float]]:
+    """
+    :param num_attempts: number of attempts of the trial
+    :return: per format, seconds to write, to read and to compute the attempt success rate after
+    reading, and the file size in MiB
+    """
+    import jsonpickle
+
+    trial = record(num_attempts)
+    results = dict()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "trial.json")
+        start = time.perf_counter()
+        with open(path, "w") as f:
+            f.write(jsonpickle.encode(trial))
+        write_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        with open(path) as f:
+            loaded = jsonpickle.decode(f.read())
+        read_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        np.mean([attempt.success for attempt in loaded.attempt_seq])
+        results["jsonpickle"] = {
+            "write_s": write_seconds,
+            "read_s": read_seconds,
+            "analysis_s": time.perf_counter() - start,
+            "size_mib": os.path.getsize(path) / 2 ** 20,
+        }
+
+        path = os.path.join(tmp_dir, "trial.oltl")
+        start = time.perf_counter()
+        write_trial_logs(path, [trial])
+        write_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        log_file = TrialLogFile(path)
+        read_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        log_file.columns["attempt_success"].mean()
+        results["binary"] = {
+            "write_s": write_seconds,
+            "read_s": read_seconds,
+            "analysis_s": time.perf_counter() - start,
+            "size_mib": os.path.getsize(path) / 2 ** 20,
+        }
+        log_file.close()
+    return results
+
+
+def main(args: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--num-attempts", type=int, default=10000)
+    parser.add_argument("--io", action="store_true")
+    parsed = parser.parse_args(args)
+
+    if parsed.io:
+        print(
+            f"{'format':<12}{'write (s)':>11}{'read (s)':>11}{'analysis (s)':>14}"
+            f"{'size (MiB)':>12}"
+        )
+        for name, timings in run_io(parsed.num_attempts).items():
+            print(
+                f"{name:<12}{timings['write_s']:>11.3f}{timings['read_s']:>11.4f}"
+                f"{timings['analysis_s']:>14.6f}{timings['size_mib']:>12.2f}"
+            )
+        return
+
+    results = run(parsed.num_attempts)
+    print(
+        f"{parsed.num_attempts} attempts: {results['seconds']:.3f} s "
+        f"({results['us_per_attempt']:.1f} us/attempt), "
+        f"peak memory {results['peak_mib']:.2f} MiB"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -16,9 +16,8 @@ from Box2D import (
     b2Rot,
     b2WeldJoint,
 )
-from pyglet.window import key
 
-from openlock import rendering
+from openlock import software_rendering
 from openlock.common import Color, TwoDConfig, COLORS
 from openlock.kine import TwoDKinematicTransform
 from openlock.settings_render import RENDER_SETTINGS
@@ -35,8 +34,21 @@ def screen_to_world_coord(xy):
 
 
 class Box2DRenderer:
-    def __init__(self, enter_key_callback):
-        self.viewer = rendering.Viewer(
+    def __init__(self, enter_key_callback, headless=False):
+        """
+        :param enter_key_callback: function called when enter is pressed in the window
+        :param headless: render into a NumPy frame buffer with software_rendering instead of an
+        OpenGL window. Headless renderers only support rgb_array rendering and have no input.
+        """
+        if headless:
+            self._rendering = software_rendering
+        else:
+            # needs a display and OpenGL
+            from openlock import rendering
+
+            self._rendering = rendering
+        self.headless = headless
+        self.viewer = self._rendering.Viewer(
             VIEWPORT_W, VIEWPORT_H, pre_render_callbacks=[self._draw_last_arrow]
         )
         self.viewer.set_bounds(
@@ -45,12 +57,13 @@ class Box2DRenderer:
             -VIEWPORT_H / SCALE,
             VIEWPORT_H / SCALE,
         )
-        self.viewer.window.push_handlers(
-            self.on_mouse_drag,
-            self.on_mouse_press,
-            self.on_mouse_release,
-            self.on_key_press,
-        )
+        if not headless:
+            self.viewer.window.push_handlers(
+                self.on_mouse_drag,
+                self.on_mouse_press,
+                self.on_mouse_release,
+                self.on_key_press,
+            )
 
         self.enter_key_callback = enter_key_callback
 
@@ -101,6 +114,8 @@ class Box2DRenderer:
         self.cur_arrow_end = (x, y)
 
     def on_key_press(self, symbol, modifiers):
+        from pyglet.window import key
+
         if symbol == key.ENTER or symbol == key.RETURN:
             self.enter_key_callback()
 
@@ -137,10 +152,16 @@ class Box2DRenderer:
         self.viewer.draw_line((x - size, y - size), (x + size, y + size), color=color)
         self.viewer.draw_line((x - size, y + size), (x + size, y - size), color=color)
 
-    def render_multiple_worlds(self, worlds, mode="human"):
+    def render_multiple_worlds(self, worlds, mode="human", out=None):
+        """
+        :param worlds: Box2D worlds, drawn in order
+        :param mode: "human" or "rgb_array"
+        :param out: optional preallocated (VIEWPORT_H, VIEWPORT_W, 3) uint8 frame for rgb_array
+        :return: the frame in rgb_array mode, else None
+        """
         for world in worlds:
             self._render_world(world, mode)
-        return self.viewer.render(return_rgb_array=mode == "rgb_array")
+        return self.viewer.render(return_rgb_array=mode == "rgb_array", out=out)
 
     def _render_world(self, world, mode):
         # for joint in world.joints:
@@ -192,7 +213,7 @@ class Box2DRenderer:
                         )
                     elif isinstance(fixture.shape, b2CircleShape):
                         # print fixture.body.transform
-                        trans = rendering.Transform(
+                        trans = self._rendering.Transform(
                             translation=transform * fixture.shape.pos
                         )
                         self.viewer.draw_circle(
@@ -237,12 +258,12 @@ class Box2DRenderer:
         #     self.viewer.draw_line(s2, p2, color=RENDER_SETTINGS['COLORS'][''])
         #     self.viewer.draw_line(s1, s2, color=RENDER_SETTINGS['COLORS'][''])
         elif isinstance(joint, b2RevoluteJoint):
-            trans = rendering.Transform(translation=p1)
+            trans = self._rendering.Transform(translation=p1)
             self.viewer.draw_circle(
                 0.5, fillied=True, color=RENDER_SETTINGS["COLORS"]["rev_joint"]
             ).add_attr(trans)
         elif isinstance(joint, b2WeldJoint):
-            trans = rendering.Transform(translation=p2)
+            trans = self._rendering.Transform(translation=p2)
             self.viewer.draw_circle(
                 0.5, fillied=True, color=RENDER_SETTINGS["COLORS"]["weld_joint"]
             ).add_attr(trans)
@@ -0,0 +1,84 @@
+"""
+Sources of time for the environment, its logs and the renderer.
+
+Human sessions use a RealClock. Agents use a VirtualClock, which only advances when the simulation
+ticks, so pauses meant for human viewing cost no wall-clock time.
+"""
+import time
+
+from openlock.settings_render import BOX2D_SETTINGS
+
+
+class Clock(object):
+    def time(self) -> float:
+        """
+        :return: Current time in seconds.
+        """
+        raise NotImplementedError
+
+    def tick(self, num_ticks: int = 1) -> None:
+        """
+        Mark the passing of num_ticks simulation ticks.
+
+        :param num_ticks: Number of ticks.
+        :return: Nothing.
+        """
+        raise NotImplementedError
+
+    def pause(self, seconds: float, callback=None) -> None:
+        """
+        Let seconds pass.
+
+        :param seconds: Length of the pause.
+        :param callback: Optional function called while pausing, e.g. to render.
+        :return: Nothing.
+        """
+        raise NotImplementedError
+
+
+class RealClock(Clock):
+    """
+    Wall-clock time. Ticks do not affect it.
+    """
+
+    def time(self) -> float:
+        return time.time()
+
+    def tick(self, num_ticks: int = 1) -> None:
+        pass
+
+    def pause(self, seconds: float, callback=None) -> None:
+        t_end = self.time() + seconds
+        while self.time() < t_end:
+            if callback is None:
+                time.sleep(t_end - self.time())
+            else:
+                callback()
+
+
+class VirtualClock(Clock):
+    """
+    Simulated time, advanced by tick_seconds per tick. Pauses advance the time without blocking.
+    """
+
+    def __init__(
+        self, start_time: float = 0.0, tick_seconds: float = 1.0 / BOX2D_SETTINGS["FPS"]
+    ):
+        """
+        :param start_time: Time before the first tick.
+        :param tick_seconds: Seconds per simulation tick, one Box2D step by default.
+        """
+        self.start_time = start_time
+        self.tick_seconds = tick_seconds
+        self.elapsed = 0.0
+
+    def time(self) -> float:
+        return self.start_time + self.elapsed
+
+    def tick(self, num_ticks: int = 1) -> None:
+        self.elapsed += num_ticks * self.tick_seconds
+
+    def pause(self, seconds: float, callback=None) -> None:
+        self.elapsed += seconds
+        if callback is not None:
+            callback()
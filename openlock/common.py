@@ -5,9 +5,9 @@ from collections import namedtuple
 from typing import TYPE_CHECKING, Any, Dict, NamedTuple, Optional
 
 import numpy as np
-from Box2D import *
-from shapely.geometry import Point, Polygon
 
+# Box2D and shapely are imported where the physics simulator and clickable regions are first used, so
+# runs without the physics simulator do not load them
 if TYPE_CHECKING:
     from openlock.envs.world_defs.openlock_def import ArmLockDef
 
@@ -141,6 +141,43 @@ def assign_effect_probabilities(obj_name, effect_probabilities):
     return effect_probability
 
 
+class UniformBlocks:
+    """
+    Uniform samples in [0, 1) from a Generator, drawn a block at a time. The samples are those of
+    calling generator.random() once per sample, however they are taken.
+    """
+
+    def __init__(self, generator: np.random.Generator, block_size: int = 1024):
+        self.generator = generator
+        self.block_size = block_size
+        self._block = np.empty(0)
+        self._pos = 0
+
+    def sample(self) -> float:
+        """
+        :return: the next sample
+        """
+        if self._pos == len(self._block):
+            self._block = self.generator.random(self.block_size)
+            self._pos = 0
+        sample = self._block[self._pos]
+        self._pos += 1
+        return sample
+
+    def take(self, n: int) -> np.ndarray:
+        """
+        :param n: number of samples
+        :return: the next n samples
+        """
+        out = np.empty(n)
+        num_drawn = min(n, len(self._block) - self._pos)
+        out[:num_drawn] = self._block[self._pos : self._pos + num_drawn]
+        self._pos += num_drawn
+        if num_drawn < n:
+            out[num_drawn:] = self.generator.random(n - num_drawn)
+        return out
+
+
 class Action:
     def __init__(self, name, obj, params):
         self.name = name
@@ -268,6 +305,8 @@ class Lever(Object):
 
     def unlock(self):
         if self.in_physics_simulator:
+            from Box2D import b2Dot, b2Vec2
+
             lock = self.fixture
             joint_axis = (-np.sin(lock.body.angle), np.cos(lock.body.angle))
             self.joint.maxMotorForce = abs(
@@ -290,6 +329,9 @@ class Lever(Object):
         lower_lim=-2,
         upper_lim=0,
     ):
+        from Box2D import b2Dot, b2FixtureDef, b2PolygonShape, b2Transform, b2Vec2
+        from shapely.geometry import Polygon
+
         x, y, theta = position.config
         self.gravity = world_def.world.gravity
 
@@ -420,6 +462,8 @@ class Lever(Object):
 
     # step is world_def step function
     def create_clickable(self, step):
+        from shapely.geometry import Point
+
         push = Action("push", self.name, 4)
         pull = Action("pull", self.name, 4)
 
@@ -544,6 +588,8 @@ class Door(Object):
         length=10,
         locked=True,
     ):
+        from Box2D import b2FixtureDef, b2PolygonShape
+
         # create door
         x, y, theta = position.config
 
@@ -626,6 +672,8 @@ class Button(Object):
         y_offset=0,
         clickable=None,
     ):
+        from Box2D import b2PolygonShape
+
         Object.__init__(self, name)
         self.position = position
         x, y, theta = position.config
@@ -640,6 +688,8 @@ class Button(Object):
         self.clickable = None
 
     def create_clickable(self, step, callback_action):
+        from shapely.geometry import Point, Polygon
+
         vertices = [
             self.fixture.body.GetWorldPoint(vertex)
             for vertex in self.fixture.shape.vertices
@@ -1 +1,3 @@
 from openlock.envs.openlock_env import OpenLockEnv
+from openlock.envs.batched_openlock_env import BatchedOpenLockEnv
+from openlock.envs.subproc_openlock_env import SubprocOpenLockEnv
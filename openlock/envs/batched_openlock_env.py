@@ -0,0 +1,321 @@
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import openlock.common as common
+from openlock.envs.openlock_env import OpenLockEnv
+from openlock.rewards import RewardStrategy
+from openlock.scenario import NoFsmScenario
+
+
+class BatchedOpenLockEnv:
+    """
+    Steps N copies of a single trial of an FSM-only (NoFsmScenario) scenario at once.
+
+    Lever pushed/locked state, unlock timers, action histories and attempt counters are held as
+    (num_envs, ...) NumPy arrays. Object index i < num_levers is the lever at position index i (the
+    same ordering used by the single env's observations and action space), index num_levers is the
+    door.
+
+    Actions are integer indices into action_space, which is identical to OpenLockEnv.action_space for
+    the same trial. Attempts auto-reset once action_limit actions have been taken; the trial (attempt
+    counters and completed solutions) auto-resets once attempt_limit attempts have been taken.
+
+    Effect probabilities are drawn for every environment on every step, while OpenLockEnv only draws
+    for actions that can move their object. With effect probabilities below 1, the random streams
+    are not bit-identical to those of OpenLockEnv, only the outcome distributions agree. Only the
+    basic reward mode is implemented.
+    """
+
+    # sentinel for "no timer running" in self._timers
+    _NO_TIMER = -1
+
+    def __init__(
+        self,
+        num_envs: int,
+        scenario_name: str,
+        action_limit: int,
+        attempt_limit: int,
+        specified_trial: Optional[str] = None,
+        effect_probabilities: Optional[Dict[str, float]] = None,
+        seed: Optional[int] = None,
+        reward_mode: str = "basic",
+    ) -> None:
+        """
+        :param num_envs: number of environments to step in lockstep
+        :param scenario_name: name of a NoFsmScenario scenario (e.g. CC3D)
+        :param action_limit: number of actions per attempt
+        :param attempt_limit: number of attempts per trial
+        :param specified_trial: optional trial name. If None, a random trial is selected
+        :param effect_probabilities: optional per-object effect probabilities, as in OpenLockEnv
+        :param seed: seed of the trial selection and the effect probability draws, as in
+        OpenLockEnv.seed
+        :param reward_mode: reward mode, see RewardStrategy. Only "basic" is supported
+        """
+        if reward_mode != "basic":
+            raise ValueError(
+                f"BatchedOpenLockEnv only supports the basic reward mode, got {reward_mode}"
+            )
+        self.num_envs = num_envs
+        self.action_limit = action_limit
+        self.attempt_limit = attempt_limit
+        self.reward_strategy = RewardStrategy()
+
+        # a single env is used to select the trial and build the action space, so the action
+        # indices and observation layout are exactly those of OpenLockEnv
+        env = OpenLockEnv()
+        env.use_physics = False
+        env.effect_probabilities = effect_probabilities
+        env.seed(seed)
+        env.initialize_for_scenario(scenario_name)
+        self.trial_selected = env.setup_trial(
+            scenario_name=scenario_name,
+            action_limit=action_limit,
+            attempt_limit=attempt_limit,
+            specified_trial=specified_trial,
+            multiproc=True,
+        )
+        if not isinstance(env.scenario, NoFsmScenario):
+            raise ValueError(
+                f"BatchedOpenLockEnv only supports FSM-only scenarios, got {scenario_name}"
+            )
+        env.reset()
+        self.scenario = env.scenario
+        # the effect probability draws of every env, a block of num_envs per step
+        self.random_blocks = env.random_blocks
+        self.action_space: List[str] = list(env.action_space)
+        _, self.state_labels = env.get_discrete_state()
+
+        self._init_tables(env, effect_probabilities or dict())
+
+        num_objs = len(self.obj_names)
+        self._pushed = np.empty((num_envs, num_objs), dtype=bool)
+        self._locked = np.empty((num_envs, num_objs), dtype=bool)
+        self._timers = np.empty((num_envs, num_objs), dtype=np.int32)
+        self.action_count = np.zeros(num_envs, dtype=np.int32)
+        self.action_seq = np.empty((num_envs, action_limit), dtype=np.int64)
+        self.attempt_count = np.zeros(num_envs, dtype=np.int32)
+        self.completed_solutions = np.zeros(
+            (num_envs, len(self._solutions)), dtype=bool
+        )
+        self.reset()
+
+    def _init_tables(
+        self, env: OpenLockEnv, effect_probabilities: Dict[str, float]
+    ) -> None:
+        scenario = env.scenario
+        levers = scenario.levers
+        self.num_levers = len(levers)
+        self.door_idx = self.num_levers
+        num_objs = self.num_levers + 1
+
+        names: List[Optional[str]] = [None] * num_objs
+        for lever in levers:
+            names[env.config_to_idx[lever.position.config]] = lever.name
+        names[self.door_idx] = "door"
+        self.obj_names: List[str] = names
+        obj_idx = {name: i for i, name in enumerate(names)}
+
+        self._init_locked = np.array(
+            [scenario._INIT_LOCKED[name] for name in names], dtype=bool
+        )
+        self._init_pushed = np.array(
+            [scenario._INIT_PUSHED[name] for name in names], dtype=bool
+        )
+        # the FSM-only env.reset clears the scenario's per-object probabilities, use the arguments
+        self._effect_probabilities = np.array(
+            [
+                effect_probabilities.get(name, scenario._active_effect_probability)
+                for name in names
+            ]
+        )
+        # _unlock_delays[source, target] is the delay before target unlocks after source moves
+        self._unlock_delays = np.full(
+            (num_objs, num_objs), self._NO_TIMER, dtype=np.int32
+        )
+        for source, unlocks in scenario._UNLOCKS.items():
+            for target, delay in unlocks:
+                self._unlock_delays[obj_idx[source], obj_idx[target]] = delay
+
+        self._active = np.array(
+            [
+                common.ENTITY_STATES["LEVER_INACTIVE"]
+                if re.search(common.INACTIVE_LOCK_REGEX_STR, name)
+                else common.ENTITY_STATES["LEVER_ACTIVE"]
+                for name in names[: self.num_levers]
+            ],
+            dtype=np.int8,
+        )
+
+        # action index -> (target object index, push)
+        self._action_targets = np.empty(len(self.action_space), dtype=np.int64)
+        self._action_push = np.empty(len(self.action_space), dtype=bool)
+        for i, action_name in enumerate(self.action_space):
+            action = env.action_map_external_role[action_name]
+            self._action_targets[i] = obj_idx[action.obj]
+            self._action_push[i] = action.name == "push"
+        self._push_door = self.action_space.index("push_door")
+
+        # solutions as action index arrays, "*" wildcards are -1
+        solutions = [
+            [
+                -1 if str(action) == "*" else self.action_space.index(str(action))
+                for action in solution
+            ]
+            for solution in env.get_solutions()
+        ]
+        self._solutions = np.array(solutions, dtype=np.int64)
+
+    def reset(self) -> np.ndarray:
+        """
+        Resets every environment to the start of the trial.
+
+        :return: stacked observations, shape (num_envs, observation size)
+        """
+        self.attempt_count[:] = 0
+        self.completed_solutions[:] = False
+        self._reset_attempts(np.ones(self.num_envs, dtype=bool))
+        return self._observe()
+
+    def _reset_attempts(self, mask: np.ndarray) -> None:
+        self._pushed[mask] = self._init_pushed
+        self._locked[mask] = self._init_locked
+        self._timers[mask] = self._NO_TIMER
+        self.action_count[mask] = 0
+        self.action_seq[mask] = -1
+
+    def step(
+        self, actions: Sequence[int]
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Executes one action in every environment.
+
+        :param actions: integer action indices into action_space, shape (num_envs,)
+        :return: observations, rewards, done flags and an info dict. For environments that finished an
+        attempt, the observation is that of the new attempt; the final observation of the finished
+        attempt is in info["terminal_observation"].
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        envs = np.arange(self.num_envs)
+
+        self.action_seq[envs, self.action_count] = actions
+        self.action_count += 1
+
+        # same order of operations as NoFsmScenario.execute_fsm_action: tick timers, then act
+        self._tick_timers()
+        targets = self._action_targets[actions]
+        push = self._action_push[actions]
+        movable = ~self._locked[envs, targets] & (self._pushed[envs, targets] != push)
+        draws = self.random_blocks.take(self.num_envs)
+        moved = movable & (draws <= self._effect_probabilities[targets])
+        self._pushed[envs[moved], targets[moved]] = push[moved]
+        self._add_timers(envs[moved], targets[moved])
+
+        rewards = self._determine_rewards(actions)
+        observations = self._observe()
+
+        dones = self.action_count >= self.action_limit
+        attempt_success = np.zeros(self.num_envs, dtype=bool)
+        trial_finished = np.zeros(self.num_envs, dtype=bool)
+        terminal_observations = observations.copy()
+        if dones.any():
+            attempt_success = self._finish_attempts(dones)
+            trial_finished = dones & (self.attempt_count >= self.attempt_limit)
+            self.attempt_count[trial_finished] = 0
+            self.completed_solutions[trial_finished] = False
+            self._reset_attempts(dones)
+            observations = self._observe()
+
+        return (
+            observations,
+            rewards,
+            dones,
+            {
+                "action_success": moved,
+                "attempt_success": attempt_success,
+                "trial_finished": trial_finished,
+                "terminal_observation": terminal_observations,
+            },
+        )
+
+    def _tick_timers(self) -> None:
+        running = self._timers != self._NO_TIMER
+        self._timers[running] -= 1
+        expired = running & (self._timers <= 0)
+        self._locked[expired] = False
+        self._timers[expired] = self._NO_TIMER
+
+    def _add_timers(self, envs: np.ndarray, sources: np.ndarray) -> None:
+        delays = self._unlock_delays[sources]
+        timers = self._timers[envs]
+        new = delays != self._NO_TIMER
+        running = timers != self._NO_TIMER
+        self._timers[envs] = np.where(
+            new, np.where(running, np.minimum(timers, delays), delays), timers
+        )
+
+    def _solution_matches(self, partial: bool) -> np.ndarray:
+        """
+        Compares the current action sequences against every solution. Wildcards in solutions match
+        any action.
+
+        :param partial: if True, match as OpenLockEnv.determine_partial_solution (the sequence must be
+        a prefix of the solution). Otherwise match as TrialLog.finish_attempt (the sequence and the
+        solution must agree on their common length).
+        :return: (num_envs, num_solutions) boolean matches
+        """
+        length = self._solutions.shape[1]
+        width = min(length, self.action_limit)
+        seq = self.action_seq[:, None, :width]
+        solutions = self._solutions[None, :, :width]
+        equal = (seq == solutions) | (solutions == -1)
+        taken = np.arange(width)[None, None, :] < self.action_count[:, None, None]
+        matches = np.all(equal | ~taken, axis=2)
+        if partial:
+            matches &= (self.action_count <= length)[:, None]
+        return matches
+
+    def _determine_rewards(self, actions: np.ndarray) -> np.ndarray:
+        """
+        Rewards of RewardStrategy.reward_basic: REWARD_OPEN for pushing the unlocked door,
+        REWARD_UNLOCK for an unlocked door after a partial solution and REWARD_NONE otherwise.
+        """
+        door_unlocked = ~self._locked[:, self.door_idx]
+        door_open = door_unlocked & (actions == self._push_door)
+        partial_solution = self._solution_matches(partial=True).any(axis=1)
+        rewards = np.full(self.num_envs, self.reward_strategy.REWARD_NONE, dtype=float)
+        rewards[door_unlocked & partial_solution] = self.reward_strategy.REWARD_UNLOCK
+        rewards[door_open] = self.reward_strategy.REWARD_OPEN
+        return rewards
+
+    def _finish_attempts(self, dones: np.ndarray) -> np.ndarray:
+        """
+        Same matching as TrialLog.finish_attempt: an attempt succeeds if it matches a solution that
+        has not been completed yet.
+        """
+        matches = self._solution_matches(partial=False) & dones[:, None]
+        success = matches.any(axis=1) & ~(matches & self.completed_solutions).any(
+            axis=1
+        )
+        first_match = np.argmax(matches, axis=1)
+        self.completed_solutions[success, first_match[success]] = True
+        self.attempt_count[dones] += 1
+        return success
+
+    def _observe(self) -> np.ndarray:
+        """
+        :return: observations laid out as in ObservationSpace.create_discrete_observation_from_fsm
+        """
+        observations = np.empty((self.num_envs, 2 * self.num_levers + 2), dtype=np.int8)
+        levers = slice(0, self.num_levers)
+        # state=1 represents pulled, state=0 is pushed
+        observations[:, levers] = ~self._pushed[:, levers]
+        observations[:, self.num_levers : 2 * self.num_levers] = self._active
+        observations[:, -2] = self._locked[:, self.door_idx]
+        observations[:, -1] = self._pushed[:, self.door_idx]
+        return observations
+
+    @property
+    def trial_success(self) -> np.ndarray:
+        return self.completed_solutions.all(axis=1)
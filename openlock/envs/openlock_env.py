@@ -1,39 +1,68 @@
-import copy
+from __future__ import annotations
+
 import logging
 import re
-import time
-from glob import glob
-from typing import Optional
+from typing import TYPE_CHECKING, Dict, Optional
 
 import gym  # type: ignore
 import numpy as np
 import openlock.common as common
-from Box2D import b2Distance, b2RayCastInput, b2RayCastOutput
+from openlock.clock import Clock, RealClock, VirtualClock
 from gym.spaces import MultiDiscrete
 
-# from openlock.box2d_renderer import Box2DRenderer
-from openlock.envs.world_defs.openlock_def import ArmLockDef
 from openlock.kine import (
-    InverseKinematics,
     KinematicChain,
+    PlanarInverseKinematics,
     TwoDKinematicTransform,
     discretize_path,
     generate_five_arm,
 )
-from openlock.logger_env import ActionLog, TrialLog
-from openlock.rewards import RewardStrategy
+from openlock.logger_env import ActionLog, ResultsTable, ResultsWriter, TrialLog
+from openlock.rewards import RewardStrategy, RewardTable
 from openlock.settings_render import BOX2D_SETTINGS, ENV_SETTINGS, RENDER_SETTINGS
 from openlock.settings_scenario import select_scenario
 from openlock.settings_trial import get_trial, select_trial
+from openlock.solution_automaton import SolutionAutomaton
+from openlock.trajectory_library import TrajectoryLibrary
+
+if TYPE_CHECKING:
+    from openlock.envs.world_defs.openlock_def import ArmLockDef
+
+# Box2D, the world definition and the renderer are imported where the physics simulator is first
+# used, so runs without it do not load them
 
 # TODO(mjedmonds): add ability to move base
 # TODO(mjedmonds): more physically plausible units?
 
+# "dynamic" moves the arm with the joint controllers along every path. "kinematic" places the arm at
+# the end of moves that do not touch objects and only simulates the moves that push or pull them.
+PHYSICS_MODES = ["dynamic", "kinematic"]
+
 
 class ActionSpace:
+    # action spaces and maps shared by every env with the same (scenario, trial, lever_index_mode).
+    # The cached lists and dicts must not be mutated.
+    cache = dict()
+
     def __init__(self):
         pass
 
+    @staticmethod
+    def get_action_space(env, obj_map, scenario_name, trial_name):
+        """
+        Returns the cached action space of a trial, creating it if needed.
+
+        :param env: env, used for lever_index_mode and config_to_idx
+        :param obj_map: obj_map of the scenario
+        :param scenario_name: name of the scenario
+        :param trial_name: name of the trial
+        :return: action_space, action_map, action_map_external_role, action_map_role_external
+        """
+        key = (scenario_name, trial_name, env.lever_index_mode)
+        if key not in ActionSpace.cache:
+            ActionSpace.cache[key] = ActionSpace.create_action_space(env, obj_map)
+        return ActionSpace.cache[key]
+
     @staticmethod
     def create_action_space(env, obj_map):
         # this must be preallocated; they are filled by position, not by symbol
@@ -102,6 +131,9 @@ class ActionSpace:
 
 
 class ObservationSpace:
+    # MultiDiscrete spaces are stateless, so they are shared between observation spaces
+    multi_discrete_cache = dict()
+
     def __init__(self, num_levers, append_solutions_remaining=False):
         self.append_solutions_remaining = append_solutions_remaining
         self.solutions_found = [0, 0, 0]
@@ -119,12 +151,30 @@ class ObservationSpace:
         self.external_to_role_mapping = None
         self.role_to_external_mapping = None
 
+        # per-trial tables, built by _init_tables from the env's action map
+        self._tables_action_map = None
+        # internal (role) lever names, in observation (position index) order
+        self._lever_names = None
+        # active flag of each lever, in observation order
+        self._lever_active = None
+        self._internal_labels = None
+        self._external_labels = None
+
     @property
     def shape(self):
         return self.multi_discrete.shape
 
     @staticmethod
     def create_observation_space(num_levers, num_solutions=0):
+        key = (num_levers, num_solutions)
+        if key not in ObservationSpace.multi_discrete_cache:
+            ObservationSpace.multi_discrete_cache[
+                key
+            ] = ObservationSpace._create_multi_discrete(num_levers, num_solutions)
+        return ObservationSpace.multi_discrete_cache[key]
+
+    @staticmethod
+    def _create_multi_discrete(num_levers, num_solutions):
         discrete_space = []
         num_lever_states = 2
         num_lever_colors = 2
@@ -168,137 +218,160 @@ class ObservationSpace:
             external_state_internal_state_mapping,
         )
 
-    def create_discrete_observation(self, env):
-        # create mapping from internal simulator state to external state
-        if self.role_to_external_mapping or self.external_to_role_mapping is None:
-            (
-                self.role_to_external_mapping,
-                self.external_to_role_mapping,
-            ) = self.create_internal_state_external_state_mappings(env)
-        if env.use_physics:
-            (
-                discrete_state,
-                discrete_labels,
-            ) = self.create_discrete_observation_from_simulator(env)
-        else:
-            discrete_state, discrete_labels = self.create_discrete_observation_from_fsm(
-                env
-            )
-        # convert internal state labels to external labels
-        # TODO(mjedmonds): refactor this, this is a very brittle way of doing this mapping
-        for i, label in enumerate(discrete_labels):
-            if label in self.role_to_external_mapping.keys():
-                discrete_labels[i] = self.role_to_external_mapping[label]
-            # active indicates color (grey = active. white = inactive) see ENTITY_STATES for values
-            if discrete_labels[i].endswith("_active"):
-                base_label = "_".join(discrete_labels[i].split("_")[:-1])
-                if base_label in self.role_to_external_mapping.keys():
-                    base_label = self.role_to_external_mapping[base_label]
-                discrete_labels[i] = base_label + "_active"
-        return discrete_state, discrete_labels
-
-    def create_discrete_observation_from_simulator(self, env):
+    def _init_tables(self, env, levers):
         """
-        Constructs a discrete observation from the physics simulator
-        :param world_def:
-        :return:
+        Precomputes the lever order, active flags and labels of the observations of the current
+        trial.
+
+        :param env: env, used for config_to_idx and the role/external action mappings
+        :param levers: levers of the trial
+        :return: Nothing
         """
-        levers = env.world_def.get_levers()
+        (
+            self.role_to_external_mapping,
+            self.external_to_role_mapping,
+        ) = self.create_internal_state_external_state_mappings(env)
         self.num_levers = len(levers)
-        world_state = env.world_def.get_state()
-
-        # need one element for state and color of each lock, need two addition for door lock status and door status
-        state = [None] * (self.num_levers * 2 + 2)
-        state_labels = [None] * (self.num_levers * 2 + 2)
 
+        lever_names = [None] * self.num_levers
+        lever_active = np.empty(self.num_levers, dtype=np.int8)
         for lever in levers:
-            # convert to index based on lever position
             lever_idx = env.config_to_idx[lever.position.config]
+            lever_names[lever_idx] = lever.name
+            # inactive lever, state is constant
+            if re.search(common.INACTIVE_LOCK_REGEX_STR, lever.name):
+                lever_active[lever_idx] = common.ENTITY_STATES["LEVER_INACTIVE"]
+            else:
+                lever_active[lever_idx] = common.ENTITY_STATES["LEVER_ACTIVE"]
+        self._lever_names = lever_names
+        self._lever_active = lever_active
+
+        self._internal_labels = (
+            lever_names
+            + [name + "_active" for name in lever_names]
+            + ["door_lock", "door"]
+        )
+        # convert internal state labels to external labels
+        # active indicates color (grey = active. white = inactive) see ENTITY_STATES for values
+        self._external_labels = (
+            [self.role_to_external_mapping.get(name, name) for name in lever_names]
+            + [
+                self.role_to_external_mapping.get(name, name) + "_active"
+                for name in lever_names
+            ]
+            + [
+                self.role_to_external_mapping.get(name, name)
+                for name in ("door_lock", "door")
+            ]
+        )
+        if self.append_solutions_remaining:
+            self._internal_labels += self.labels
+            self._external_labels += self.labels
+        self._tables_action_map = env.action_map_external_role
+
+    def _check_tables(self, env, levers):
+        # the tables only change with the trial, which always comes with a new action map
+        if (
+            self._tables_action_map is not env.action_map_external_role
+            or self.num_levers != len(levers)
+        ):
+            self._init_tables(env, levers)
 
-            lever_state = np.int8(world_state["OBJ_STATES"][lever.name])
-            lever_active = np.int8(lever.determine_active())
+    def _get_out(self, out):
+        size = len(self._internal_labels)
+        if out is None:
+            return np.empty(size, dtype=np.int8)
+        if out.shape != (size,):
+            raise ValueError(
+                "Expected observation buffer of shape {}, got {}".format(
+                    (size,), out.shape
+                )
+            )
+        return out
 
-            state_labels[lever_idx] = lever.name
-            state[lever_idx] = lever_state
-            state_labels[lever_idx + self.num_levers] = lever.name + "_active"
-            state[lever_idx + self.num_levers] = lever_active
+    def create_discrete_observation(self, env, out=None):
+        """
+        Constructs a discrete observation with external (position based) labels.
 
-        state_labels[-1] = "door"
-        state[-1] = np.int8(world_state["OBJ_STATES"]["door"])
-        state_labels[-2] = "door_lock"
-        state[-2] = np.int8(world_state["OBJ_STATES"]["door_lock"])
+        :param env: env to observe
+        :param out: optional int8 buffer to write the observation into
+        :return: observation array, list of external labels. The label list is shared between
+        calls and must not be mutated.
+        """
+        if env.use_physics:
+            discrete_state, _ = self.create_discrete_observation_from_simulator(
+                env, out=out
+            )
+        else:
+            discrete_state, _ = self.create_discrete_observation_from_fsm(env, out=out)
+        return discrete_state, self._external_labels
 
-        if self.append_solutions_remaining:
-            slns_found, sln_labels = self.determine_solutions_remaining(env)
-            state.extend(slns_found)
-            state_labels.extend(sln_labels)
+    def _write_observation(self, env, obj_states, out):
+        for i, lever_name in enumerate(self._lever_names):
+            out[i] = obj_states[lever_name]
+        out[-2] = obj_states["door_lock"]
+        out[-1] = obj_states["door"]
 
-        return state, state_labels
+        if self.append_solutions_remaining:
+            slns_found, _ = self.determine_solutions_remaining(env)
+            out[2 * self.num_levers + 2 :] = slns_found
 
-    def create_discrete_observation_from_fsm(self, env):
+    def create_discrete_observation_from_simulator(self, env, out=None):
         """
-        constructs a discrete observation from the underlying FSM
-        Used when the physics simulator is being bypassed
-        :param fsmm:
-        :return:
+        Constructs a discrete observation from the physics simulator
+        :param env: env to observe
+        :param out: optional int8 buffer to write the observation into
+        :return: observation array, list of internal labels
         """
-        levers = env.scenario.levers
-        self.num_levers = len(levers)
-        scenario_state = env.scenario.get_state()
+        levers = env.world_def.get_levers()
+        self._check_tables(env, levers)
+        out = self._get_out(out)
+        world_state = env.world_def.get_state()
 
         # need one element for state and color of each lock, need two addition for door lock status and door status
-        state = [None] * (self.num_levers * 2 + 2)
-        state_labels = [None] * (self.num_levers * 2 + 2)
-
-        # lever states
         for lever in levers:
             lever_idx = env.config_to_idx[lever.position.config]
+            out[lever_idx + self.num_levers] = lever.determine_active()
+        self._write_observation(env, world_state["OBJ_STATES"], out)
 
-            # inactive lever, state is constant
-            if re.search(common.INACTIVE_LOCK_REGEX_STR, lever.name):
-                lever_active = np.int8(common.ENTITY_STATES["LEVER_INACTIVE"])
-            else:
-                lever_active = np.int8(common.ENTITY_STATES["LEVER_ACTIVE"])
-
-            lever_state = np.int8(scenario_state["OBJ_STATES"][lever.name])
-
-            state_labels[lever_idx] = lever.name
-            state[lever_idx] = lever_state
+        return out, self._internal_labels
 
-            state_labels[lever_idx + self.num_levers] = lever.name + "_active"
-            state[lever_idx + self.num_levers] = lever_active
-
-        # update door state
-        door_lock_name = "door_lock"
-        door_lock_state = np.int8(scenario_state["OBJ_STATES"][door_lock_name])
-
-        # TODO(mjedmonds): this is a hack to get whether or not the door is actually open; it should be part of the FSM
-        door_name = "door"
-        door_state = np.int8(scenario_state["OBJ_STATES"][door_name])
-
-        state_labels[-1] = door_name
-        state[-1] = door_state
-        state_labels[-2] = door_lock_name
-        state[-2] = door_lock_state
+    def create_discrete_observation_from_fsm(self, env, out=None):
+        """
+        constructs a discrete observation from the underlying FSM
+        Used when the physics simulator is being bypassed
+        :param env: env to observe
+        :param out: optional int8 buffer to write the observation into
+        :return: observation array, list of internal labels
+        """
+        levers = env.scenario.levers
+        self._check_tables(env, levers)
+        out = self._get_out(out)
 
-        if self.append_solutions_remaining:
-            slns_found, sln_labels = self.determine_solutions_remaining(env)
-            state.extend(slns_found)
-            state_labels.extend(sln_labels)
+        # need one element for state and color of each lock, need two addition for door lock status and door status
+        out[self.num_levers : 2 * self.num_levers] = self._lever_active
+        self._write_observation(env, env.scenario.get_obj_state(), out)
 
-        return state, state_labels
+        return out, self._internal_labels
 
 
 class OpenLockEnv(gym.Env):
     # Set this in SOME subclasses
-    metadata = {"render.modes": ["human"]}
+    metadata = {"render.modes": ["human", "rgb_array"]}
 
     def __init__(self):
         self.viewer = None
+        # headless Box2DRenderer for rgb_array rendering, created on first use
+        self.offscreen_renderer = None
 
         # handle to the scenario, defined by the scenario
         self.scenario = None
 
+        # trial selection draws and effect probability draws, see _seed
+        self.np_random: Optional[np.random.Generator] = None
+        self.random_blocks: Optional[common.UniformBlocks] = None
+        self._seed()
+
         self.i = 0
         self.clock = 0
         self.save_path = "../OpenLockResults/"
@@ -306,6 +379,13 @@ class OpenLockEnv(gym.Env):
         self.col_label = []
         self.index_map = None
         self.results = None
+        # streams every result row to a file, see start_results_stream
+        self.results_writer: Optional[ResultsWriter] = None
+
+        # incremental solution matching state of the current attempt, see get_solution_matches
+        self._solution_matches_seq = None
+        self._solution_matches_len = 0
+        self._solution_matches = 0
 
         self.attempt_count = 0  # keeps track of the number of attempts
         self.action_count = 0  # keeps track of the number of actions executed
@@ -318,7 +398,16 @@ class OpenLockEnv(gym.Env):
         self.pausing = False
 
         self.human_agent = True
+        # source of time for the env and its logs, see get_time_source
+        self.time_source: Optional[Clock] = None
+        # clocks of human and other agents when no time_source is set
+        self._real_clock = RealClock()
+        self._virtual_clock = VirtualClock()
         self.reward_mode = "basic"
+        # look the rewards of FSM-only actions up in a RewardTable of the trial, see
+        # _determine_table_reward
+        self.use_reward_tables = False
+        self.reward_table: Optional[RewardTable] = None
 
         self.lever_index_mode = "role"  # controls whether or not to build action_map based on lever role or position
         self.observation_space = None
@@ -336,9 +425,16 @@ class OpenLockEnv(gym.Env):
         )
 
         self.use_physics = True
+        # how the physics simulator moves the arm, one of PHYSICS_MODES
+        self.physics_mode = "dynamic"
+        # joint-space trajectories of kinematic moves, see get_trajectory_library
+        self.trajectory_library: Optional[TrajectoryLibrary] = None
         self.effect_probabilities = None
 
         self.world_def: Optional[ArmLockDef] = None
+        # trial the world was built for; reset restores the world instead of rebuilding it
+        # during that trial
+        self.world_def_trial: Optional[TrialLog] = None
 
         self.states = []
         self.config_to_idx = dict()
@@ -361,7 +457,7 @@ class OpenLockEnv(gym.Env):
     def initialize_for_scenario(self, scenario_name):
         self._set_scenario(scenario_name)
 
-        _, lever_configs = get_trial(scenario_name)
+        _, lever_configs = get_trial(scenario_name, random_state=self.np_random)
 
         self._set_lever_configs(lever_configs)
 
@@ -388,22 +484,36 @@ class OpenLockEnv(gym.Env):
             logging.warning("Resetting environment with no scenario")
 
         self.clock = 0
-        self._seed()
+        # human_agent may have been set since setup_trial
+        self.cur_trial.clock = self.get_time_source()
 
         if self.use_physics:
-            # setup Box2D world
-            self.world_def = self.init_world_def()
+            if self._can_restore_world_def():
+                # return the world of this trial to its initial state instead of rebuilding it
+                self.init_inverse_kine()
+                self.world_def.chain = self.invkine.kinematic_chain
+                self.world_def.reset_world()
+            else:
+                # setup Box2D world
+                self.world_def = self.init_world_def()
+                self.world_def_trial = self.cur_trial
         else:
             # initialize obj_map for scenario
             self.scenario.init_scenario_env()
 
+        # the action and observation spaces only depend on the trial, which is fixed by setup_trial
         (
             self.action_space,
             self.action_map,
             self.action_map_external_role,
             self.action_map_role_external,
-        ) = ActionSpace.create_action_space(self, self.obj_map)
-        self.observation_space = ObservationSpace(len(self.levers))
+        ) = ActionSpace.get_action_space(
+            self, self.obj_map, self.cur_trial.scenario_name, self.cur_trial.name
+        )
+        if self.observation_space is None or self.observation_space.num_levers != len(
+            self.levers
+        ):
+            self.observation_space = ObservationSpace(len(self.levers))
 
         # reset results (must be after world_def exists and action space has been created)
         self._reset_results()
@@ -414,9 +524,11 @@ class OpenLockEnv(gym.Env):
                 # self.viewer = Box2DRenderer(self._action_grasp)
                 pass
 
-            self.viewer.reset()
+            # without a viewer the physics world runs headless
+            if self.viewer is not None:
+                self.viewer.reset()
 
-            self._create_clickable_regions()
+                self._create_clickable_regions()
 
         # reset the finite state machine
         self.scenario.reset()
@@ -434,11 +546,8 @@ class OpenLockEnv(gym.Env):
         self.update_state_machine()
 
         if self.observation_space is not None:
-            (
-                discrete_state,
-                discrete_labels,
-            ) = self.observation_space.create_discrete_observation(self)
-            return np.array(discrete_state)
+            discrete_state, _ = self.get_discrete_state()
+            return discrete_state
         else:
             raise ValueError(
                 "Attempting to reset environment with no observation space. Cannot return state."
@@ -461,11 +570,7 @@ class OpenLockEnv(gym.Env):
 
         # rendering step
         if not action:
-            self.world_def.step(
-                1.0 / BOX2D_SETTINGS["FPS"],
-                BOX2D_SETTINGS["VEL_ITERS"],
-                BOX2D_SETTINGS["POS_ITERS"],
-            )
+            self._step_world()
 
             # self._render_world_at_frame_rate()
 
@@ -489,7 +594,9 @@ class OpenLockEnv(gym.Env):
                 # ack is used by manager to determine if the action needs to be logged in the agent's logger
                 if self.cur_trial.cur_attempt is None:
                     logging.warning("No current attempt")
-                self.cur_trial.cur_attempt.add_action(str(action))
+                self.cur_trial.cur_attempt.add_action(
+                    str(action), self.get_time_source().time()
+                )
 
             # convert external action to internal action
             if str(action) in self.action_map_external_role.keys():
@@ -498,6 +605,9 @@ class OpenLockEnv(gym.Env):
                 action_role = action
             # execute action
             action_success = self.execute_action(action_role)
+            if not self.use_physics:
+                # an FSM action is a single tick, physics actions tick with every world step
+                self.get_time_source().tick()
 
             self.i += 1
 
@@ -522,7 +632,8 @@ class OpenLockEnv(gym.Env):
                 {
                     "action_success": action_success,
                     "attempt_success": attempt_success,
-                    "results": self.results,
+                    # read-only view, overwritten by the next attempt unless snapshot() is taken
+                    "results": self.results.view(),
                     "state_labels": discrete_labels,
                 },
             )
@@ -532,7 +643,7 @@ class OpenLockEnv(gym.Env):
             return None
             # return self.state, 0, False, {}
 
-    def render(self, mode="human", close=False):
+    def render(self, mode="human", close=False, out=None):
         """Renders the environment.
 
         The set of supported modes varies per environment. (And some
@@ -556,6 +667,7 @@ class OpenLockEnv(gym.Env):
         Args:
                 mode (str): the mode to render with
                 close (bool): close all open renderings
+                out (np.ndarray): optional preallocated frame for rgb_array mode
 
         Example:
 
@@ -577,19 +689,44 @@ class OpenLockEnv(gym.Env):
                 self.viewer = None
                 return
 
+        if mode == "rgb_array":
+            # rendered in software, so frames can be produced without a display
+            if self.world_def is None:
+                raise ValueError("rgb_array rendering needs the physics simulator")
+            if self.offscreen_renderer is None:
+                from openlock.box2d_renderer import Box2DRenderer
+
+                self.offscreen_renderer = Box2DRenderer(None, headless=True)
+            return self.offscreen_renderer.render_multiple_worlds(
+                [self.world_def.background, self.world_def.world],
+                mode="rgb_array",
+                out=out,
+            )
+
         if self.viewer is not None:
             self.viewer.render_multiple_worlds(
                 [self.world_def.background, self.world_def.world], mode="human"
             )
 
+    def seed(self, seed=None):
+        return self._seed(seed)
+
     def _seed(self, seed=None):
         """Sets the seed for this env's random number generator(s).
 
+            Trials are drawn from np_random. Action failures and the effects of scenarios that
+            draw their own are drawn from random_blocks, a second generator spawned from the same
+            seed, so the effect draws after seeding do not depend on the trials selected. Both are
+            independent of the global NumPy RNG and of envs with other seeds.
+
             Note:
                     Some environments use multiple pseudorandom number generators.
                     We want to capture all such seeds used in order to ensure that
                     there aren't accidental correlations between multiple generators.
 
+            :param seed: int, sequence of ints or np.random.SeedSequence. If None, fresh entropy
+                    from the OS is used, so unseeded envs in different processes are independent.
+
             Returns:
                     list<bigint>: Returns the list of seeds used in this env's random
                         number generators. The first value in the list should be the
@@ -597,7 +734,18 @@ class OpenLockEnv(gym.Env):
                         'seed'. Often, the main seed equals the provided 'seed', but
                         this won't be true if seed=None, for example.
             """
-        pass
+        if isinstance(seed, np.random.SeedSequence):
+            seed_sequence = seed
+        else:
+            seed_sequence = np.random.SeedSequence(seed)
+        trial_sequence, effect_sequence = seed_sequence.spawn(2)
+        self.np_random = np.random.default_rng(trial_sequence)
+        self.random_blocks = common.UniformBlocks(
+            np.random.default_rng(effect_sequence)
+        )
+        if self.scenario is not None:
+            self.scenario.random_blocks = self.random_blocks
+        return [seed_sequence.entropy]
 
     @property
     def obj_map(self):
@@ -645,7 +793,7 @@ class OpenLockEnv(gym.Env):
         # select trial
         if specified_trial is None:
             trial_selected, lever_configs = get_trial(
-                scenario_name, self.completed_trials
+                scenario_name, self.completed_trials, self.np_random
             )
             if trial_selected is None:
                 if not multiproc:
@@ -654,7 +802,7 @@ class OpenLockEnv(gym.Env):
                     )
                 self.completed_trials = []
                 trial_selected, lever_configs = get_trial(
-                    scenario_name, self.completed_trials
+                    scenario_name, self.completed_trials, self.np_random
                 )
         else:
             trial_selected, lever_configs = select_trial(specified_trial)
@@ -675,7 +823,7 @@ class OpenLockEnv(gym.Env):
             action_map,
             action_map_external_role,
             action_map_role_external,
-        ) = ActionSpace.create_action_space(self, obj_map)
+        ) = ActionSpace.get_action_space(self, obj_map, scenario_name, trial_selected)
 
         external_solutions = [
             [
@@ -687,8 +835,13 @@ class OpenLockEnv(gym.Env):
             for solution in self.scenario.SOLUTIONS
         ]
 
+        time_source = self.get_time_source()
         self.cur_trial = TrialLog(
-            trial_selected, scenario_name, external_solutions, time.time()
+            trial_selected,
+            scenario_name,
+            external_solutions,
+            time_source.time(),
+            clock=time_source,
         )
 
         if not multiproc:
@@ -715,9 +868,7 @@ class OpenLockEnv(gym.Env):
         # pauses if the human user unlocked the door but didn't push on the door
         if self.use_physics and self.human_agent and self.pausing:
             # pause for 4 sec to allow user to view lock
-            t_end = time.time() + 4
-            while time.time() < t_end:
-                self.render()
+            self.get_time_source().pause(4, self.render)
             self.update_state_machine()
 
         self.cur_trial.add_attempt()
@@ -730,19 +881,61 @@ class OpenLockEnv(gym.Env):
         self._append_result(self._create_state_entry())
 
         # must finish action before computing reward
-        self.cur_trial.cur_attempt.finish_action(self.results)
-
-        reward, _ = self.reward_strategy.determine_reward(
-            self, action, self.reward_mode
+        self.cur_trial.cur_attempt.finish_action(
+            self.results, self.get_time_source().time()
         )
 
+        if self.use_reward_tables and not self.use_physics:
+            reward = self._determine_table_reward(action)
+        else:
+            reward, _ = self.reward_strategy.determine_reward(
+                self, action, self.reward_mode
+            )
+
         # add reward to current attempt
         self.cur_trial.cur_attempt.add_reward(reward)
 
         return reward
 
+    def _determine_table_reward(self, action):
+        """
+        Looks up the reward RewardStrategy.determine_reward gives the action, compiling the
+        RewardTable of the trial and reward mode on first use.
+
+        :param action: external action
+        :return: reward of the action
+        """
+        automaton = self.cur_trial.solution_automaton
+        table = self.reward_table
+        if (
+            table is None
+            or table.automaton is not automaton
+            or table.reward_mode != self.reward_mode
+            or table.action_limit != self.action_limit
+        ):
+            table = self.reward_table = RewardTable(
+                self.reward_mode,
+                automaton,
+                self.action_space,
+                self.action_limit,
+                self.attempt_limit,
+            )
+        solution_matches = self.get_solution_matches()
+        state = table.state_features(
+            self.prev_state["OBJ_STATES"],
+            self.cur_state["OBJ_STATES"],
+            table.reads_repeated_action and self.determine_repeated_action(),
+        )
+        return table.reward(
+            solution_matches,
+            self._solution_matches_len,
+            self.cur_trial.completed_solutions_mask,
+            state,
+            str(action),
+        )
+
     def execute_action(self, action_role):
-        failure_probability = np.random.sample()
+        failure_probability = self.random_blocks.sample()
         if self.use_physics:
             action_success = self._execute_physics_action(
                 action_role, failure_probability=failure_probability
@@ -753,6 +946,29 @@ class OpenLockEnv(gym.Env):
             )
         return action_success
 
+    def get_time_source(self) -> Clock:
+        """
+        Get the clock the env and its logs take time from. Unless one has been set, human agents
+        get a RealClock and other agents a VirtualClock, which never blocks. The choice follows
+        human_agent, which callers may set after setup_trial.
+
+        :return: The clock.
+        """
+        if self.time_source is not None:
+            return self.time_source
+        return self._real_clock if self.human_agent else self._virtual_clock
+
+    def get_trajectory_library(self) -> TrajectoryLibrary:
+        """
+        Get the library of trajectories reused by kinematic moves. Unless one has been set, an
+        empty in-memory library is created, which fills as the arm moves.
+
+        :return: The library.
+        """
+        if self.trajectory_library is None:
+            self.trajectory_library = TrajectoryLibrary()
+        return self.trajectory_library
+
     def set_effect_probabilities(self, effect_probabilities):
         self.effect_probabilities = effect_probabilities
 
@@ -760,6 +976,7 @@ class OpenLockEnv(gym.Env):
         # update scenario if needed
         if self.scenario is None or scenario_name is not self.scenario.NAME:
             scenario = select_scenario(scenario_name, use_physics=self.use_physics)
+            scenario.random_blocks = self.random_blocks
             self.scenario = scenario
 
     def _set_lever_configs(self, lever_configs):
@@ -779,47 +996,64 @@ class OpenLockEnv(gym.Env):
 
     def _reset_results(self):
         # setup .csv headers
-        self.col_label = []
-        self.col_label.append("frame")
+        col_label = ["frame"]
         _, discrete_labels = self.get_discrete_state()
-        for col_name in discrete_labels:
-            self.col_label.append(col_name)
-        self.col_label.append("agent")
-        for col_name in self.action_space:
-            self.col_label.append(col_name)
-
-        self.index_map = {name: idx for idx, name in enumerate(self.col_label)}
+        col_label.extend(discrete_labels)
+        col_label.append("agent")
+        col_label.extend(self.action_space)
 
-        self.results = [self.col_label]
+        # the table is reused between attempts; attempt logs keep their own copy of the results
+        if self.results is not None and self.results.col_label == col_label:
+            self.results.clear()
+        else:
+            self.results = ResultsTable(col_label)
+        self.col_label = self.results.col_label
+        self.index_map = self.results.index_map
+        if (
+            self.results_writer is not None
+            and self.results_writer.col_label != self.col_label
+        ):
+            # a file has a single header, continue the stream in a new file
+            self.results_writer.close(wait=False)
+            self.results_writer = ResultsWriter(
+                self.col_label, self.results_writer.save_path
+            )
+        # scratch row used to build entries before they are appended
+        self._result_entry = np.zeros(len(self.col_label), dtype=np.int32)
+        self._obs_buffer = np.empty(len(discrete_labels), dtype=np.int8)
+        # columns of the discrete state, in the order of get_discrete_state()
+        self._state_cols = np.array(
+            [self.index_map[name] for name in discrete_labels], dtype=np.intp
+        )
 
     def get_actions(self):
         return list(self.action_map.keys())
 
-    def get_discrete_state(self):
-        (
-            discrete_state,
-            discrete_labels,
-        ) = self.observation_space.create_discrete_observation(self)
-        return np.array(discrete_state), discrete_labels
+    def get_discrete_state(self, out=None):
+        """
+        :param out: optional int8 buffer to write the observation into
+        :return: observation array, list of external labels
+        """
+        return self.observation_space.create_discrete_observation(self, out=out)
 
     def _create_state_entry(self):
         frame = self.action_count
-        discrete_state, discrete_labels = self.get_discrete_state()
-        entry = [0] * len(self.col_label)
+        discrete_state, _ = self.get_discrete_state(out=self._obs_buffer)
+        entry = self._result_entry
+        entry[:] = 0
         entry[0] = frame
-        for name, val in zip(discrete_labels, discrete_state):
-            entry[self.index_map[name]] = int(val)
+        entry[self._state_cols] = discrete_state
 
         return entry
 
     def _create_pre_obs_entry(self, action):
         # create pre-observation entry
-        entry = [0] * len(self.col_label)
+        entry = self._result_entry
+        entry[:] = 0
         entry[0] = self.action_count
         # copy over previous state
-        entry[1 : self.index_map["agent"] + 1] = copy.copy(
-            self.results[-1][1 : self.index_map["agent"] + 1]
-        )
+        agent_col = self.index_map["agent"]
+        entry[1 : agent_col + 1] = self.results[-1][1 : agent_col + 1]
 
         # mark action idx
         if type(action.obj) is str:
@@ -839,8 +1073,8 @@ class OpenLockEnv(gym.Env):
     def __update_and_converge_controllers(self, new_theta):
         self.world_def.set_controllers(new_theta)
         b = 0
-        theta_err = sum([e ** 2 for e in self.world_def.pos_controller.error])
-        vel_err = sum([e ** 2 for e in self.world_def.vel_controller.error])
+        theta_err = np.square(self.world_def.pos_controller.error).sum()
+        vel_err = np.square(self.world_def.vel_controller.error).sum()
         while (
             theta_err > ENV_SETTINGS["PID_POS_CONV_TOL"]
             or vel_err > ENV_SETTINGS["PID_VEL_CONV_TOL"]
@@ -850,21 +1084,25 @@ class OpenLockEnv(gym.Env):
                 return False
 
             b += 1
-            self.world_def.step(
-                1.0 / BOX2D_SETTINGS["FPS"],
-                BOX2D_SETTINGS["VEL_ITERS"],
-                BOX2D_SETTINGS["POS_ITERS"],
-            )
+            self._step_world()
 
             # this needs to render to update the arm on the screen
             if self.human_agent:
                 self._render_world_at_frame_rate()
 
             # update error values
-            theta_err = sum([e ** 2 for e in self.world_def.pos_controller.error])
-            vel_err = sum([e ** 2 for e in self.world_def.vel_controller.error])
+            theta_err = np.square(self.world_def.pos_controller.error).sum()
+            vel_err = np.square(self.world_def.vel_controller.error).sum()
         return True
 
+    def _step_world(self):
+        self.world_def.step(
+            1.0 / BOX2D_SETTINGS["FPS"],
+            BOX2D_SETTINGS["VEL_ITERS"],
+            BOX2D_SETTINGS["POS_ITERS"],
+        )
+        self.get_time_source().tick()
+
     def _render_world_at_frame_rate(self):
         """
         render at desired frame rate
@@ -880,7 +1118,16 @@ class OpenLockEnv(gym.Env):
     def update_state_machine(self, action=None):
         self.scenario.update_state_machine(action)
 
+    def _can_restore_world_def(self) -> bool:
+        return (
+            self.world_def is not None
+            and self.world_def_trial is self.cur_trial
+            and self.world_def.effect_probabilities == self.effect_probabilities
+        )
+
     def init_world_def(self) -> ArmLockDef:
+        from openlock.envs.world_defs.openlock_def import ArmLockDef
+
         self.init_inverse_kine()
         return ArmLockDef(
             self.invkine.kinematic_chain,
@@ -904,7 +1151,7 @@ class OpenLockEnv(gym.Env):
         self.base = TwoDKinematicTransform(
             x=self.base0.x, y=self.base0.y, theta=self.base0.theta
         )
-        self.invkine = InverseKinematics(
+        self.invkine = PlanarInverseKinematics(
             KinematicChain(self.base, initial_config),
             KinematicChain(self.base, initial_config),
         )
@@ -915,6 +1162,36 @@ class OpenLockEnv(gym.Env):
 
     def _append_result(self, cur_result):
         self.results.append(cur_result)
+        if self.results_writer is not None:
+            self.results_writer.append(cur_result)
+
+    def start_results_stream(self, save_path: Optional[str] = None) -> ResultsWriter:
+        """
+        Write every result row to a new results file from now on, starting with the rows of the
+        current attempt. The file is written in the background; a new file is started when the
+        columns change with the trial.
+
+        :param save_path: Directory prefix of the files, self.save_path if None.
+        :return: The writer of the current file.
+        """
+        if self.results is None:
+            raise ValueError("Results can only be streamed once the env has been reset")
+        self.stop_results_stream()
+        if save_path is None:
+            save_path = self.save_path
+        self.results_writer = ResultsWriter(self.col_label, save_path)
+        self.results_writer.extend(self.results.rows)
+        return self.results_writer
+
+    def stop_results_stream(self, wait: bool = True) -> None:
+        """
+        Write the remaining rows of the stream and close its file.
+
+        :param wait: Whether to wait until the file is written.
+        """
+        if self.results_writer is not None:
+            self.results_writer.close(wait=wait)
+            self.results_writer = None
 
     def _create_clickable_regions(self):
         # register clickable regions
@@ -1136,45 +1413,76 @@ class OpenLockEnv(gym.Env):
                 return -1
         return 0
 
+    def get_solution_matches(self):
+        """
+        Returns the solutions the current action sequence agrees with on their common length, as a
+        bitset of solution indices. The bitset is advanced incrementally as actions are added to the
+        current attempt.
+        :return: bitset of solution indices
+        """
+        action_seq = self.cur_trial.cur_attempt.action_seq
+        automaton = self.cur_trial.solution_automaton
+        if (
+            self._solution_matches_seq is not action_seq
+            or self._solution_matches_len > len(action_seq)
+        ):
+            self._solution_matches_seq = action_seq
+            self._solution_matches_len = 0
+            self._solution_matches = automaton.start()
+        while self._solution_matches_len < len(action_seq):
+            self._solution_matches = automaton.advance(
+                self._solution_matches,
+                self._solution_matches_len,
+                action_seq[self._solution_matches_len],
+            )
+            self._solution_matches_len += 1
+        return self._solution_matches
+
+    def get_solution_index(self, action_seq=None):
+        """
+        :param action_seq: action sequence. Defaults to the current action sequence
+        :return: index of the first solution that agrees with action_seq on their common length, -1 if none
+        """
+        if action_seq is None:
+            solution_matches = self.get_solution_matches()
+        else:
+            solution_matches = self.cur_trial.solution_automaton.run(action_seq)
+        return SolutionAutomaton.first(solution_matches)
+
     # this function also determines if the action sequence is a duplicate to unlock the door, not just open the door
     def determine_unique_solution(self):
-        cur_action_seq = self.get_current_action_seq(convert_to_str=True)
-        solutions = self.get_solutions(convert_to_str=True)
-        # TODO(mjedmonds): need more robust way - assumes solutions are all the same length
-        if len(cur_action_seq) != len(solutions[0]):
-            return False
-
-        completed_solutions = self.get_completed_solutions(convert_to_str=True)
-        # if this is a complete action sequence and it is not a solution, return false
-        # full action sequence
+        """
+        Determines if the current action sequence is a solution that has not been completed
+        :return: True if the current action sequence is an uncompleted solution, False otherwise
+        """
+        automaton = self.cur_trial.solution_automaton
+        solutions = automaton.complete(
+            self.get_solution_matches(), self._solution_matches_len
+        )
         # solution is unique if it is in the list of solutions and not in the solutions found
-        if cur_action_seq in solutions and cur_action_seq not in completed_solutions:
-            return True
-        else:
-            return False
+        return (
+            bool(solutions) and not solutions & self.cur_trial.completed_solutions_mask
+        )
 
     def determine_partial_solution(self):
         """
         Determines if the current action sequence is part of a solution
         :return: True if the current action sequence is part of a solution, False otherwise
         """
-        cur_action_seq = self.get_current_action_seq(convert_to_str=True)
-        if cur_action_seq in [
-            x[: len(cur_action_seq)] for x in self.get_solutions(convert_to_str=True)
-        ]:
-            return True
-        else:
-            return False
+        automaton = self.cur_trial.solution_automaton
+        return bool(
+            automaton.partial(self.get_solution_matches(), self._solution_matches_len)
+        )
 
     def determine_unique_partial_solution(self):
-        cur_action_seq = self.get_current_action_seq(convert_to_str=True)
-        completed_solutions = self.get_completed_solutions(convert_to_str=True)
-        for completed_solution in completed_solutions:
-            if cur_action_seq == completed_solution[: len(cur_action_seq)]:
-                return False
-        # if the partial sequence is not in the completed solutions, just check if the partial sequence is
-        # part of the solutions at all
-        return self.determine_partial_solution()
+        automaton = self.cur_trial.solution_automaton
+        partial = automaton.partial(
+            self.get_solution_matches(), self._solution_matches_len
+        )
+        # the partial sequence is not unique if it is part of a completed solution
+        if partial & self.cur_trial.completed_solutions_mask:
+            return False
+        return bool(partial)
 
     def determine_fluent_change(self):
         prev_fluent_state = self.prev_state["OBJ_STATES"]
@@ -1240,14 +1548,21 @@ class OpenLockEnv(gym.Env):
     def get_effect_probability(self, obj):
         return self.obj_map[obj].effect_probability
 
-    def _export_results(self):
-        save_count = len(glob(self.save_path + "results[0-9]*.csv"))
-        np.savetxt(
-            self.save_path + "results{}.csv".format(save_count),
-            self.results,
-            delimiter=",",
-            fmt="%s",
-        )
+    def _export_results(self) -> ResultsWriter:
+        """
+        Write the results of the current attempt to a new results file in the background, or
+        flush the results stream if there is one.
+
+        :return: The writer of the file; its close method waits until the file is written.
+        """
+        if self.results_writer is not None:
+            # the rows are already streamed to a file
+            self.results_writer.flush(wait=False)
+            return self.results_writer
+        writer = ResultsWriter(self.col_label, self.save_path)
+        writer.extend(self.results.rows)
+        writer.close(wait=False)
+        return writer
 
     def _execute_fsm_action(self, action, failure_probability):
         action_failed_probabilistically = (
@@ -1266,6 +1581,8 @@ class OpenLockEnv(gym.Env):
         :param action: action to execute
         :return: action_success: whether or not the action executed successfully
         """
+        if self.physics_mode not in PHYSICS_MODES:
+            raise ValueError(f"Unknown physics mode {self.physics_mode}")
         initially_locked = self.determine_obj_locked(action.obj)
         # action fails if the failure probability is greater than the effect probability
         action_failed_probabilistically = (
@@ -1308,13 +1625,150 @@ class OpenLockEnv(gym.Env):
 
         return action_success
 
-    def _action_go_to(self, twod_config):
+    def _solve_inverse_kinematics(self):
+        """
+        Step the inverse kinematics model along the damped least squares convergence path until
+        its end effector reaches self.invkine.target.
+
+        :return: Whether the model converged, and the new relative configuration (None if the model
+        was already at the target).
+        """
+        a = 0
+        err = self.invkine.get_error()
+        new_config = None
+        while err > ENV_SETTINGS["INVK_CONV_TOL"]:
+
+            if a > ENV_SETTINGS["INVK_CONV_MAX_STEPS"]:
+                return False, new_config
+            a = a + 1
+
+            # get delta theta
+            d_theta = self.invkine.get_delta_theta_dls(
+                lam=ENV_SETTINGS["INVK_DLS_LAMBDA"]
+            )
+
+            # current theta along convergence path
+            cur_config = (
+                self.invkine.kinematic_chain.get_rel_config()
+            )  # ignore virtual base link
+
+            # new theta along convergence path
+
+            # TODO(mjedmonds): this is messy
+            new_config = [cur_config[0]] + [
+                common.TwoDConfig(cur.x, cur.y, cur.theta + delta)
+                for cur, delta in zip(cur_config[1:], d_theta)
+            ]
+
+            # update inverse kinematics model to reflect step along convergence path
+            self.invkine.kinematic_chain.update_chain(new_config)
+
+            err = self.invkine.get_error()
+        return True, new_config
+
+    def _plan_kinematic_trajectory(self, waypoints):
+        """
+        Solve inverse kinematics along waypoints, starting from the current config of the
+        kinematic chain. The chain is left at the final config.
+
+        :param waypoints: Waypoints of the end effector, waypoint 0 is the current config.
+        :return: The joint angles at each waypoint where the arm moved, shape (num_moves,
+        num_joints), or None if inverse kinematics did not converge.
+        """
+        self.invkine.set_current_config(self.invkine.kinematic_chain)
+        trajectory = []
+        for waypoint in waypoints[1:]:
+            self.invkine.target = waypoint
+            converged, new_config = self._solve_inverse_kinematics()
+            if not converged:
+                return None
+            if new_config:
+                trajectory.append([c.theta for c in new_config[1:]])
+        return np.array(trajectory, dtype=float).reshape(
+            len(trajectory), len(self.invkine.kinematic_chain.chain)
+        )
+
+    def _get_kinematic_trajectory(self, waypoints):
+        """
+        Get the trajectory along waypoints from the trajectory library, planning and adding it if
+        the move has not been made before. Either way, the kinematic chain is left at the final
+        config.
+
+        :param waypoints: Waypoints of the end effector, waypoint 0 is the current config.
+        :return: The trajectory, see _plan_kinematic_trajectory.
+        """
+        library = self.get_trajectory_library()
+        start_config = self.invkine.kinematic_chain.get_rel_config()
+        target = waypoints[-1]
+        key = library.make_key(
+            [*start_config[0], *[c.theta for c in start_config[1:]]],
+            [target.x, target.y, target.theta],
+        )
+        trajectory = library.get(key)
+        if trajectory is None:
+            trajectory = self._plan_kinematic_trajectory(waypoints)
+            if trajectory is not None:
+                library.add(key, trajectory)
+        elif len(trajectory) > 0:
+            self.invkine.kinematic_chain.update_chain(
+                [start_config[0]]
+                + [
+                    common.TwoDConfig(cur.x, cur.y, theta)
+                    for cur, theta in zip(start_config[1:], trajectory[-1])
+                ]
+            )
+            self.invkine.target = waypoints[-1]
+        return trajectory
+
+    def _follow_waypoints_kinematically(self, waypoints):
+        """
+        Solve inverse kinematics along waypoints without simulating the motion, then place the arm
+        at the final configuration and step the world once to update contacts. Moves made before
+        reuse their trajectory from the trajectory library.
+
+        :param waypoints: Waypoints of the end effector, waypoint 0 is the current config.
+        :return: Whether inverse kinematics converged.
+        """
+        if len(waypoints) < 2:
+            # already within a step of the target
+            return True
+        trajectory = self._get_kinematic_trajectory(waypoints)
+        if trajectory is None:
+            return False
+        if len(trajectory) > 0:
+            self.world_def.set_arm_config(trajectory[-1].tolist())
+            self._step_world()
+        return True
+
+    def precompute_trajectories(self):
+        """
+        Fill the trajectory library with the approach to every object from the current arm
+        config, by default the rest pose after reset. The arm is not moved.
+
+        :return: Nothing.
+        """
+        for obj_name in self.world_def.obj_map.keys():
+            self.invkine.kinematic_chain.update_chain(self.world_def.get_rel_config())
+            desired_config = self._get_approach_config(obj_name)
+            if desired_config is None:
+                continue
+            waypoints = discretize_path(
+                self.invkine.kinematic_chain.get_total_delta_config(),
+                desired_config,
+                ENV_SETTINGS["PATH_INTERP_STEP_DELTA"],
+            )
+            if len(waypoints) > 1:
+                self._get_kinematic_trajectory(waypoints)
+        self.invkine.kinematic_chain.update_chain(self.world_def.get_rel_config())
+
+    def _action_go_to(self, twod_config, kinematic=False):
         # get configuatin of end effector
         targ_x, targ_y, targ_theta = twod_config
 
         # draw arrow to show target location
         args = (targ_x, targ_y, targ_theta, 0.5, 1, common.Color(0.8, 0.8, 0.8))
-        self.viewer.markers["targ_arrow"] = ("arrow", args)
+        if self.viewer is not None:
+            self.viewer.markers["targ_arrow"] = ("arrow", args)
 
         # update current config
         self.invkine.kinematic_chain.update_chain(self.world_def.get_rel_config())
@@ -1330,60 +1784,38 @@ class OpenLockEnv(gym.Env):
             # already at the target config
             return True
 
-        for i in range(1, len(waypoints)):  # waypoint 0 is current config
-
-            # update kinematics model to reflect current world config
-            self.invkine.kinematic_chain.update_chain(self.world_def.get_rel_config())
-
-            # update inverse kinematics
-            self.invkine.set_current_config(self.invkine.kinematic_chain)
-            self.invkine.target = waypoints[i]
-
-            # find inverse kinematics solution
-            a = 0
-            err = self.invkine.get_error()
-            new_config = None
-            while err > ENV_SETTINGS["INVK_CONV_TOL"]:
-
-                if a > ENV_SETTINGS["INVK_CONV_MAX_STEPS"]:
-                    return False
-                a = a + 1
+        if kinematic:
+            if not self._follow_waypoints_kinematically(waypoints):
+                return False
+        else:
+            for i in range(1, len(waypoints)):  # waypoint 0 is current config
 
-                # get delta theta
-                d_theta = self.invkine.get_delta_theta_dls(
-                    lam=ENV_SETTINGS["INVK_DLS_LAMBDA"]
+                # update kinematics model to reflect current world config
+                self.invkine.kinematic_chain.update_chain(
+                    self.world_def.get_rel_config()
                 )
 
-                # current theta along convergence path
-                cur_config = (
-                    self.invkine.kinematic_chain.get_rel_config()
-                )  # ignore virtual base link
-
-                # new theta along convergence path
-
-                # TODO(mjedmonds): this is messy
-                new_config = [cur_config[0]] + [
-                    common.TwoDConfig(cur.x, cur.y, cur.theta + delta)
-                    for cur, delta in zip(cur_config[1:], d_theta)
-                ]
-
-                # update inverse kinematics model to reflect step along convergence path
-                self.invkine.kinematic_chain.update_chain(new_config)
-
-                err = self.invkine.get_error()
+                # update inverse kinematics
+                self.invkine.set_current_config(self.invkine.kinematic_chain)
+                self.invkine.target = waypoints[i]
 
-            # theta found, update controllers and wait until controllers converge and stop
-            if new_config:
-                if not self.__update_and_converge_controllers(
-                    [c.theta for c in new_config[1:]]
-                ):
-                    # could not converge
+                # find inverse kinematics solution
+                converged, new_config = self._solve_inverse_kinematics()
+                if not converged:
                     return False
 
+                # theta found, update controllers and wait until controllers converge and stop
+                if new_config:
+                    if not self.__update_and_converge_controllers(
+                        [c.theta for c in new_config[1:]]
+                    ):
+                        # could not converge
+                        return False
+
         # succesfully reached target config
 
         # delete target arrow
-        if "targ_arrow" in list(self.viewer.markers.keys()):
+        if self.viewer is not None and "targ_arrow" in self.viewer.markers:
             del self.viewer.markers["targ_arrow"]
 
         return True
@@ -1396,6 +1828,32 @@ class OpenLockEnv(gym.Env):
 
         Returns:
 
+        """
+        desired_config = self._get_approach_config(obj_name)
+        if desired_config is not None:
+            # the approach does not touch obj, so it can be done kinematically
+            self._action_go_to(
+                desired_config, kinematic=self.physics_mode == "kinematic"
+            )
+
+            # we way have gotten close to obj, but lets move forward until we graze
+            # TODO(mjedmonds): selective tolerance of INVK/PID controllers for rough/fine movement
+            i = 0
+            while len(self.world_def.arm_bodies[-1].contacts) == 0 and i < 5:
+                i += 1
+                self._action_move_end_frame(common.TwoDConfig(0.5, 0, 0))
+            return True if len(self.world_def.arm_bodies[-1].contacts) > 0 else False
+        else:
+            # path is blocked
+            return False
+
+    def _get_approach_config(self, obj_name):
+        """
+        Find the end effector config touching the face of an object that faces the end effector,
+        by raycasting from the end effector to the center of the object.
+
+        :param obj_name: Name of the object in obj_map.
+        :return: The config, or None if the path is blocked.
         """
         obj = self.world_def.obj_map[obj_name].fixture
 
@@ -1408,38 +1866,28 @@ class OpenLockEnv(gym.Env):
         obj_center = obj.body.GetWorldPoint(obj_mass_data.center)
         end_effector_center = end_eff.body.GetWorldPoint(end_eff_mass_data.center)
 
+        from Box2D import b2RayCastInput, b2RayCastOutput
+
         input = b2RayCastInput(p1=end_effector_center, p2=obj_center, maxFraction=200)
         output = b2RayCastOutput()
 
         hit = obj.RayCast(output, input, 0)
-        if hit:
-            hit_point = input.p1 + output.fraction * (input.p2 - input.p1)
-            normal = output.normal
-
-            angle = np.arctan2(-normal[1], -normal[0])
-
-            end_effector_offset = (
-                end_eff_shape.radius * normal
-            )  # TODO(mjedmonds): is this the right offset?
+        if not hit:
+            return None
+        hit_point = input.p1 + output.fraction * (input.p2 - input.p1)
+        normal = output.normal
 
-            desired_config = common.TwoDConfig(
-                hit_point[0] + end_effector_offset[0],
-                hit_point[1] + end_effector_offset[1],
-                common.wrapToMinusPiToPi(angle),
-            )
+        angle = np.arctan2(-normal[1], -normal[0])
 
-            self._action_go_to(desired_config)
+        end_effector_offset = (
+            end_eff_shape.radius * normal
+        )  # TODO(mjedmonds): is this the right offset?
 
-            # we way have gotten close to obj, but lets move forward until we graze
-            # TODO(mjedmonds): selective tolerance of INVK/PID controllers for rough/fine movement
-            i = 0
-            while len(self.world_def.arm_bodies[-1].contacts) == 0 and i < 5:
-                i += 1
-                self._action_move_end_frame(common.TwoDConfig(0.5, 0, 0))
-            return True if len(self.world_def.arm_bodies[-1].contacts) > 0 else False
-        else:
-            # path is blocked
-            return False
+        return common.TwoDConfig(
+            hit_point[0] + end_effector_offset[0],
+            hit_point[1] + end_effector_offset[1],
+            common.wrapToMinusPiToPi(angle),
+        )
 
     def _action_rest(self):
         # discretize path
@@ -1458,6 +1906,11 @@ class OpenLockEnv(gym.Env):
             # we're already within step_delta of our desired config in all dimensions
             return True
 
+        if self.physics_mode == "kinematic":
+            self.world_def.set_arm_config(self.theta0)
+            self._step_world()
+            return True
+
         # TODO(mjedmonds): refactor
 
         # generate discretized path
@@ -1537,6 +1990,7 @@ class OpenLockEnv(gym.Env):
         # touching, instead, we compute the shortest distance between the two
         # shapes once the bounding boxes start to overlap. This let's us grab
         # objects which are close. See: http://www.iforce2d.net/b2dtut/collision-anatomy
+        from Box2D import b2Distance
 
         if len(self.world_def.grasped_list) > 0:
             # we are already holding something
@@ -1644,6 +2098,33 @@ class OpenLockEnv(gym.Env):
         return self.world_def.scenario.actions
 
 
+def make_env(
+    scenario_name: str,
+    use_physics: bool,
+    physics_mode: str,
+    reward_mode: str,
+    effect_probabilities: Optional[Dict[str, float]],
+) -> OpenLockEnv:
+    """
+    Builds an env for a non-human agent, initialized for a scenario.
+
+    :param scenario_name: name of the scenario (e.g. CE3)
+    :param use_physics: whether the env runs the Box2D simulator
+    :param physics_mode: how the simulator moves the arm, one of PHYSICS_MODES
+    :param reward_mode: reward mode of the env, see RewardStrategy
+    :param effect_probabilities: optional per-object effect probabilities
+    :return: the env
+    """
+    env = OpenLockEnv()
+    env.use_physics = use_physics
+    env.physics_mode = physics_mode
+    env.human_agent = False
+    env.reward_mode = reward_mode
+    env.effect_probabilities = effect_probabilities
+    env.initialize_for_scenario(scenario_name)
+    return env
+
+
 def main():
     env = OpenLockEnv()
 
@@ -0,0 +1,276 @@
+import multiprocessing
+import traceback
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from openlock.envs.openlock_env import make_env
+
+
+def _worker(
+    conn,
+    index: int,
+    buffer,
+    shape: Tuple[int, int, int],
+    env_kwargs: Dict[str, Any],
+    trial_kwargs: Dict[str, Any],
+    seed: Optional[int],
+) -> None:
+    """
+    Runs one OpenLockEnv and serves commands from SubprocOpenLockEnv until "close".
+
+    Observations are written into row index of the shared observation buffer; only the
+    remaining step results go through conn.
+    """
+    try:
+        buffers = np.frombuffer(buffer, dtype=np.int8).reshape(shape)
+        observation, terminal_observation = buffers[0, index], buffers[1, index]
+        env = make_env(**env_kwargs)
+        env.seed(seed)
+
+        def start_trial():
+            trial_name = env.setup_trial(multiproc=True, **trial_kwargs)
+            observation[:] = env.reset()
+            return str(trial_name), list(env.action_space)
+
+        while True:
+            cmd, data = conn.recv()
+            if cmd == "step":
+                obs, reward, done, info = env.step(
+                    env.action_map[env.action_space[data]]
+                )
+                observation[:] = obs
+                trial = None
+                if done:
+                    terminal_observation[:] = obs
+                    env.finish_attempt()
+                    if env.attempt_count >= env.attempt_limit:
+                        # get_trial only selects trials that are not completed
+                        env.cur_trial.finish(env.get_time_source().time())
+                        env.finish_trial(env.cur_trial.name)
+                        trial = start_trial()
+                    else:
+                        observation[:] = env.reset()
+                conn.send(
+                    (
+                        reward,
+                        done,
+                        info["action_success"],
+                        info["attempt_success"],
+                        trial,
+                    )
+                )
+            elif cmd == "reset":
+                conn.send(start_trial())
+            elif cmd == "close":
+                conn.close()
+                return
+            else:
+                raise ValueError(f"Unknown command {cmd}")
+    except KeyboardInterrupt:
+        pass
+    except Exception:
+        conn.send(RuntimeError(f"Worker {index} failed:\n{traceback.format_exc()}"))
+        conn.close()
+
+
+class SubprocOpenLockEnv:
+    """
+    Steps N OpenLockEnv instances of a scenario, each in its own worker process. Intended for the
+    physics simulator (use_physics=True), where a single action takes hundreds of Box2D steps.
+
+    The workers write observations into a shared-memory (num_envs, observation size) int8 array, so
+    only action indices, rewards and flags are sent through pipes. step() is step_async() followed by
+    step_wait(); between the two, the parent process is free to do other work.
+
+    Actions are integer indices into action_spaces[i], the action space of the trial environment i
+    is running, trial_names[i]. Attempts auto-reset once action_limit actions have been taken; once
+    attempt_limit attempts have been taken, the environment finishes the trial and sets up a new
+    one, as returned by get_trial unless specified_trial is given.
+    """
+
+    def __init__(
+        self,
+        num_envs: int,
+        scenario_name: str,
+        action_limit: int,
+        attempt_limit: int,
+        specified_trial: Optional[str] = None,
+        use_physics: bool = True,
+        physics_mode: str = "dynamic",
+        reward_mode: str = "basic",
+        effect_probabilities: Optional[Dict[str, float]] = None,
+        seed: Optional[int] = None,
+        start_method: Optional[str] = None,
+    ) -> None:
+        """
+        :param num_envs: number of worker processes
+        :param scenario_name: name of the scenario (e.g. CE3)
+        :param action_limit: number of actions per attempt
+        :param attempt_limit: number of attempts per trial
+        :param specified_trial: optional trial name. If None, each trial is selected by get_trial
+        :param use_physics: whether the envs run the Box2D simulator
+        :param physics_mode: how the simulator moves the arm, one of openlock_env.PHYSICS_MODES
+        :param reward_mode: reward mode of the envs, see RewardStrategy
+        :param effect_probabilities: optional per-object effect probabilities, as in OpenLockEnv
+        :param seed: worker i seeds its env with seed + i. If None, envs are seeded from entropy
+        :param start_method: multiprocessing start method, the platform default if None
+        """
+        self.num_envs = num_envs
+        env_kwargs = dict(
+            scenario_name=scenario_name,
+            use_physics=use_physics,
+            physics_mode=physics_mode,
+            reward_mode=reward_mode,
+            effect_probabilities=effect_probabilities,
+        )
+        trial_kwargs = dict(
+            scenario_name=scenario_name,
+            action_limit=action_limit,
+            attempt_limit=attempt_limit,
+            specified_trial=specified_trial,
+        )
+
+        # the observation size only depends on the scenario, use a cheap FSM-only env to find it
+        env = make_env(**dict(env_kwargs, use_physics=False))
+        env.setup_trial(multiproc=True, **trial_kwargs)
+        obs_size = env.reset().shape[0]
+
+        ctx = multiprocessing.get_context(start_method)
+        shape = (2, num_envs, obs_size)
+        buffer = ctx.RawArray("b", int(np.prod(shape)))
+        buffers = np.frombuffer(buffer, dtype=np.int8).reshape(shape)
+        self._observations, self._terminal_observations = buffers
+
+        self._conns = []
+        self._processes = []
+        for i in range(num_envs):
+            parent_conn, child_conn = ctx.Pipe()
+            process = ctx.Process(
+                target=_worker,
+                args=(
+                    child_conn,
+                    i,
+                    buffer,
+                    shape,
+                    env_kwargs,
+                    trial_kwargs,
+                    None if seed is None else seed + i,
+                ),
+                daemon=True,
+            )
+            process.start()
+            child_conn.close()
+            self._conns.append(parent_conn)
+            self._processes.append(process)
+
+        self.trial_names: List[Optional[str]] = [None] * num_envs
+        self.action_spaces: List[List[str]] = [[] for _ in range(num_envs)]
+        self.waiting = False
+        self.closed = False
+
+    def _recv_all(self) -> List[Any]:
+        """
+        Receives one result from every worker, raising the first error only once every result has
+        been read, so that the pipes of the other workers stay in sync.
+        """
+        results = [conn.recv() for conn in self._conns]
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        return results
+
+    def reset(self) -> np.ndarray:
+        """
+        Sets up a new trial in every environment.
+
+        :return: stacked observations, shape (num_envs, observation size)
+        """
+        for conn in self._conns:
+            conn.send(("reset", None))
+        trials = self._recv_all()
+        self.trial_names = [trial_name for trial_name, _ in trials]
+        self.action_spaces = [action_space for _, action_space in trials]
+        return self._observations.copy()
+
+    def step_async(self, actions: Sequence[int]) -> None:
+        """
+        Sends one action to every environment without waiting for the results.
+
+        :param actions: integer action indices into action_spaces, shape (num_envs,)
+        """
+        if self.waiting:
+            raise RuntimeError("step_async called before step_wait")
+        for conn, action in zip(self._conns, actions):
+            conn.send(("step", int(action)))
+        self.waiting = True
+
+    def step_wait(
+        self,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Waits for the actions sent by step_async.
+
+        :return: observations, rewards, done flags and an info dict. For environments that finished an
+        attempt, the observation is that of the new attempt; the final observation of the finished
+        attempt is in info["terminal_observation"]. info["trial_finished"] flags environments that
+        started a new trial, whose trial_names and action_spaces entries have been updated.
+        """
+        if not self.waiting:
+            raise RuntimeError("step_wait called without step_async")
+        self.waiting = False
+        results = self._recv_all()
+
+        rewards, dones, action_success, attempt_success, trials = zip(*results)
+        trial_finished = np.array([trial is not None for trial in trials])
+        for i in np.flatnonzero(trial_finished):
+            self.trial_names[i], self.action_spaces[i] = trials[i]
+        dones = np.array(dones)
+        return (
+            self._observations.copy(),
+            np.array(rewards, dtype=float),
+            dones,
+            {
+                "action_success": np.array(action_success),
+                "attempt_success": np.array(attempt_success),
+                "trial_finished": trial_finished,
+                "terminal_observation": np.where(
+                    dones[:, None], self._terminal_observations, self._observations
+                ),
+            },
+        )
+
+    def step(
+        self, actions: Sequence[int]
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Executes one action in every environment, see step_wait.
+        """
+        self.step_async(actions)
+        return self.step_wait()
+
+    def close(self, timeout: float = 1.0) -> None:
+        """
+        Stops the worker processes. Workers that failed have closed their pipes already, and
+        workers that do not stop within timeout seconds are terminated.
+
+        :param timeout: seconds to wait for each worker to exit
+        """
+        if self.closed:
+            return
+        for conn in self._conns:
+            try:
+                if self.waiting:
+                    conn.recv()
+                conn.send(("close", None))
+            except (EOFError, BrokenPipeError):
+                pass
+        self.waiting = False
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        for conn in self._conns:
+            conn.close()
+        self.closed = True
@@ -1,8 +1,10 @@
 import re
+from typing import List, NamedTuple, Tuple
 
 import numpy as np
 import openlock.common as common
 from Box2D import (
+    b2Body,
     b2CircleShape,
     b2ContactListener,
     b2Dot,
@@ -10,8 +12,9 @@ from Box2D import (
     b2PolygonShape,
     b2Vec2,
     b2World,
+    b2_dynamicBody,
 )
-from openlock.pid_central import PIDController
+from openlock.pid_central import ArrayPIDController
 from openlock.settings_render import BOX2D_SETTINGS
 
 # TODO(mjedmonds): cleaner interface than indices between bodies and lengths
@@ -53,6 +56,10 @@ class ArmLockContactListener(b2ContactListener):
     def tan_force(self):
         return self.__tan_force_vector
 
+    def reset(self):
+        self.__contacting = False
+        self.__tan_force_vector = self.__norm_force_vector = None
+
     def __filter_contact(self, contact):
         if self.__end_effector_fixture == contact.fixtureA:
             return "A"
@@ -115,11 +122,31 @@ class ArmLockContactListener(b2ContactListener):
             # self.__iterations += 1
 
 
+class WorldSnapshot(NamedTuple):
+    """
+    State of an ArmLockDef recorded by ArmLockDef.snapshot.
+    """
+
+    clock: int
+    # body, position, angle, linear velocity and angular velocity of every dynamic body
+    bodies: List[Tuple[b2Body, Tuple[float, float], float, Tuple[float, float], float]]
+    # lever, locked and max motor force of the lever joint
+    levers: List[Tuple[common.Lever, bool, float]]
+    door_locked: bool
+    pos_controller: Tuple[np.ndarray, np.ndarray]
+    vel_controller: Tuple[np.ndarray, np.ndarray]
+    torque: np.ndarray
+
+
 class ArmLockDef:
     def __init__(self, chain, timestep, world_size, scenario, effect_probabilities):
         super(ArmLockDef, self).__init__()
 
         self.scenario = scenario
+        # copy, so the env can tell whether the world was built with its current probabilities
+        self.effect_probabilities = (
+            dict(effect_probabilities) if effect_probabilities is not None else None
+        )
 
         self.timestep = timestep
         self.chain = chain
@@ -159,6 +186,10 @@ class ArmLockDef:
         # for body in self.world.bodies:
         #     body.bullet = True
 
+        # whether the next step must not warm start from joint and contact impulses
+        self._cold_start = False
+        self.initial_snapshot = self.snapshot()
+
     def __init_arm(self, x0):
         # create arm links
         self.arm_bodies = []
@@ -224,6 +255,7 @@ class ArmLockDef:
             arm_body.gravityScale = 0
 
             self.arm_bodies.append(arm_body)
+        self._link_lengths = np.array(self.arm_lengths[1:])
         self.end_effector_fixture = self.arm_bodies[-1].CreateFixture(
             end_effector_fixture_def
         )
@@ -302,7 +334,7 @@ class ArmLockDef:
 
     def __init_cascade_controller(self):
         pts = [c.theta for c in self.chain.get_rel_config()[1:]]
-        self.pos_controller = PIDController(
+        self.pos_controller = ArrayPIDController(
             [10] * len(self.arm_joints),
             [1] * len(self.arm_joints),
             [0] * len(self.arm_joints),
@@ -313,7 +345,7 @@ class ArmLockDef:
         )
 
         # initialize with zero velocity
-        self.vel_controller = PIDController(
+        self.vel_controller = ArrayPIDController(
             [17000] * len(self.arm_joints),
             [0] * len(self.arm_joints),
             [0] * len(self.arm_joints),
@@ -326,24 +358,56 @@ class ArmLockDef:
 
     def update_cascade_controller(self):
         if self.clock % BOX2D_SETTINGS["POS_PID_CLK_DIV"] == 0:
-            theta = [c.theta for c in self.get_rel_config()[1:]]
-            vel_setpoints = self.pos_controller.update(theta)
+            vel_setpoints = self.pos_controller.update(self.get_joint_angles())
             self.vel_controller.set_setpoint(vel_setpoints)
-        joint_speeds = [joint.speed for joint in self.arm_joints]
-        return self.vel_controller.update(joint_speeds)
+        return self.vel_controller.update(self.get_joint_speeds())
 
     def set_controllers(self, setpoints):
         # make sure that angles are in [-pi, pi]
-        new = [common.wrapToMinusPiToPi(c) for c in setpoints]
+        new = common.wrapToMinusPiToPi(np.asarray(setpoints, dtype=float))
 
         # update position PID
         self.pos_controller.set_setpoint(new)
 
         # update velocity PID instead of waiting until next step
-        theta = [c.theta for c in self.get_rel_config()[1:]]
-        vel_setpoints = self.pos_controller.update(theta)
+        vel_setpoints = self.pos_controller.update(self.get_joint_angles())
         self.vel_controller.set_setpoint(vel_setpoints)
 
+    def get_joint_angles(self):
+        """
+        :return: array of the relative angle of each arm joint, the thetas of get_rel_config()[1:]
+        """
+        angles = common.wrapToMinusPiToPi(
+            np.array([body.transform.angle for body in self.arm_bodies])
+        )
+        return common.wrapToMinusPiToPi(np.diff(angles))
+
+    def get_joint_speeds(self):
+        """
+        :return: array of the speed of each arm joint
+        """
+        return np.array([joint.speed for joint in self.arm_joints])
+
+    def set_arm_config(self, setpoints):
+        """
+        Place the arm links at relative joint angles setpoints, at rest, without simulating the
+        motion. The controllers are set to hold the new configuration.
+
+        :param setpoints: relative angle of each arm joint
+        """
+        x, y = self.arm_bodies[0].position
+        angle = self.arm_bodies[0].angle
+        for body, length, theta in zip(
+            self.arm_bodies[1:], self.arm_lengths[1:], setpoints
+        ):
+            angle += theta
+            x += length * np.cos(angle)
+            y += length * np.sin(angle)
+            body.transform = ((x, y), angle)
+            body.linearVelocity = (0, 0)
+            body.angularVelocity = 0
+        self.set_controllers(setpoints)
+
     def get_abs_config(self):
         config = []
 
@@ -424,6 +488,21 @@ class ArmLockDef:
 
         self.arm_bodies[idx].ApplyForce(force=force_vector, point=position, wake=True)
 
+    def apply_torques(self, torques):
+        """
+        Apply torque i to arm joint i, as apply_torque(i + 1, torques[i]) for every joint.
+
+        :param torques: array of the torque of each arm joint
+        """
+        bodies = self.arm_bodies[1:]
+        angles = np.array([body.transform.angle for body in bodies])
+        # same float32 arithmetic as b2Vec2 * float in apply_torque
+        forces = (np.asarray(torques) / self._link_lengths).astype(np.float32)
+        force_x = (-np.sin(angles)).astype(np.float32) * forces
+        force_y = np.cos(angles).astype(np.float32) * forces
+        for body, x, y in zip(bodies, force_x.tolist(), force_y.tolist()):
+            body.ApplyForce(force=(x, y), point=body.position, wake=True)
+
     def step(self, timestep, vel_iterations, pos_iterations):
         self.clock += 1
 
@@ -432,21 +511,150 @@ class ArmLockDef:
         self._update_torques()
         # self._update_torques_at_frame_rate()
 
-        self.world.Step(timestep, vel_iterations, pos_iterations)
+        self._step_world(timestep, vel_iterations, pos_iterations)
+
+    def _step_world(self, timestep, vel_iterations, pos_iterations):
+        if self._cold_start:
+            # like a newly built world, start from zero joint and contact impulses
+            self.world.warmStarting = False
+            self.world.Step(timestep, vel_iterations, pos_iterations)
+            self.world.warmStarting = True
+            self._cold_start = False
+        else:
+            self.world.Step(timestep, vel_iterations, pos_iterations)
 
     def _update_torques(self):
         # update torques
         if self.clock % BOX2D_SETTINGS["VEL_PID_CLK_DIV"] == 0:
             self.torque = self.update_cascade_controller()
-        for i in range(0, len(self.torque)):
-            self.apply_torque(i + 1, self.torque[i])
+        self.apply_torques(self.torque)
 
     # def _update_state_machine_at_frame_rate(self):
     #     ''''''
     #     if self.clock % BOX2D_SETTINGS['STATE_MACHINE_CLK_DIV'] == 0:
     #         self.scenario.update_state_machine()
 
-    # TODO(mjedmonds): implement
+    def snapshot(self) -> WorldSnapshot:
+        """
+        Record the state of the world: the pose and velocity of every dynamic body, the lock state
+        of the levers and the door, and the state of the arm controllers. Grasps are not recorded.
+
+        :return: the snapshot
+        """
+        return WorldSnapshot(
+            clock=self.clock,
+            bodies=[
+                (
+                    body,
+                    tuple(body.position),
+                    body.angle,
+                    tuple(body.linearVelocity),
+                    body.angularVelocity,
+                )
+                for body in self.world.bodies
+                if body.type == b2_dynamicBody
+            ],
+            levers=[
+                (obj, obj.locked, obj.joint.maxMotorForce)
+                for obj in self.obj_map.values()
+                if isinstance(obj, common.Lever) and obj.in_physics_simulator
+            ],
+            door_locked=self.door.locked,
+            pos_controller=self.pos_controller.get_state(),
+            vel_controller=self.vel_controller.get_state(),
+            torque=np.array(self.torque, dtype=float),
+        )
+
+    def restore(self, snapshot: WorldSnapshot) -> None:
+        """
+        Return the world to a snapshot taken by this ArmLockDef, in place. Grasps are released and
+        the next step does not warm start, as in a newly built world.
+
+        :param snapshot: the snapshot
+        """
+        for joint in self.grasped_list:
+            self.world.DestroyJoint(joint)
+        self.grasped_list = []
+
+        for body, position, angle, linear_velocity, angular_velocity in snapshot.bodies:
+            body.transform = (position, angle)
+            body.linearVelocity = linear_velocity
+            body.angularVelocity = angular_velocity
+            body.awake = True
+
+        for lever, locked, max_motor_force in snapshot.levers:
+            lever.locked = locked
+            lever.joint.maxMotorForce = max_motor_force
+        # the door lock is a weld joint at the door's pose, so this must follow the bodies
+        if snapshot.door_locked and not self.door.locked:
+            self.door.lock()
+        elif not snapshot.door_locked and self.door.locked:
+            self.door.unlock()
+
+        self.pos_controller.set_state(snapshot.pos_controller)
+        self.vel_controller.set_state(snapshot.vel_controller)
+        self.torque = snapshot.torque.copy()
+        self.clock = snapshot.clock
+        self.contact_listener.reset()
+        self._cold_start = True
+
     def reset_world(self):
         """Returns the world to its intial state"""
-        pass
+        self.restore(self.initial_snapshot)
+
+
+class ArmLockDefBatch:
+    """
+    Steps several ArmLockDefs with their cascade controllers updated as one batch. The controllers
+    of each ArmLockDef become views of a row of the batch controllers, so set_controllers and the
+    other per-world methods keep working.
+    """
+
+    def __init__(self, world_defs):
+        """
+        :param world_defs: ArmLockDefs with the same clock
+        """
+        if len({world_def.clock for world_def in world_defs}) > 1:
+            raise ValueError("Batched ArmLockDefs must have the same clock")
+        self.world_defs = list(world_defs)
+        self.pos_controller = ArrayPIDController.stack(
+            [world_def.pos_controller for world_def in self.world_defs]
+        )
+        self.vel_controller = ArrayPIDController.stack(
+            [world_def.vel_controller for world_def in self.world_defs]
+        )
+
+    @property
+    def clock(self):
+        return self.world_defs[0].clock
+
+    def update_cascade_controller(self):
+        """
+        Same as ArmLockDef.update_cascade_controller for every world.
+
+        :return: (num_worlds, num_joints) array of torques
+        """
+        if self.clock % BOX2D_SETTINGS["POS_PID_CLK_DIV"] == 0:
+            theta = np.array(
+                [world_def.get_joint_angles() for world_def in self.world_defs]
+            )
+            vel_setpoints = self.pos_controller.update(theta)
+            self.vel_controller.set_setpoint(vel_setpoints)
+        joint_speeds = np.array(
+            [world_def.get_joint_speeds() for world_def in self.world_defs]
+        )
+        return self.vel_controller.update(joint_speeds)
+
+    def step(self, timestep, vel_iterations, pos_iterations):
+        """
+        Same as ArmLockDef.step for every world.
+        """
+        for world_def in self.world_defs:
+            world_def.clock += 1
+        if self.clock % BOX2D_SETTINGS["VEL_PID_CLK_DIV"] == 0:
+            torques = self.update_cascade_controller()
+            for world_def, torque in zip(self.world_defs, torques):
+                world_def.torque = torque
+        for world_def in self.world_defs:
+            world_def.apply_torques(world_def.torque)
+            world_def._step_world(timestep, vel_iterations, pos_iterations)
@@ -1,8 +1,17 @@
+import itertools
 import re
 import numpy as np
 
 # from transitions.extensions import GraphMachine as Machine
-from transitions import Machine
+import transitions
+
+import openlock.fsm_engine as fsm_engine
+
+# state machine implementations FiniteStateMachine can be backed by. "internal" is the integer
+# dispatch engine in openlock.fsm_engine, "transitions" is transitions.Machine.
+MACHINE_ENGINES = {"internal": fsm_engine.Machine, "transitions": transitions.Machine}
+# engine used by FiniteStateMachines that do not specify one
+DEFAULT_ENGINE = "internal"
 
 
 def cartesian_product(*lists):
@@ -13,14 +22,46 @@ def cartesian_product(*lists):
 
 
 class FiniteStateMachine:
-    def __init__(self, fsm_manager, name, vars, states, initial_state):
+    def __init__(self, fsm_manager, name, vars, states, initial_state, engine=None):
         self.fsm_manager = fsm_manager
         self.name = name
         self.vars = vars
         self.state_permutations = self._permutate_states(states)
         self.initial_state = initial_state
 
-        self.machine = Machine(
+        # integer encoding of states: each variable occupies bits_per_var bits, starting at
+        # var_shift[var], holding the index of the variable's value in self.values. The current
+        # state is held as its code, the state strings are only a view of the codes for logging
+        # and for the state machine engines.
+        self.values = list(states)
+        self.value_to_idx = {value: i for i, value in enumerate(self.values)}
+        self.bits_per_var = max(1, (len(self.values) - 1).bit_length())
+        self.value_mask = (1 << self.bits_per_var) - 1
+        self.var_shift = {var: i * self.bits_per_var for i, var in enumerate(self.vars)}
+        self.state_to_code = dict()
+        self.code_to_state = dict()
+        # same ordering as _permutate_states: the first variable varies slowest
+        for value_idxs in itertools.product(
+            range(len(self.values)), repeat=len(self.vars)
+        ):
+            state = "".join(
+                var + self.values[value_idx]
+                for var, value_idx in zip(self.vars, value_idxs)
+            )
+            code = sum(
+                value_idx << self.var_shift[var]
+                for var, value_idx in zip(self.vars, value_idxs)
+            )
+            self.state_to_code[state] = code
+            self.code_to_state[code] = state
+        # integer encoding of the current state, set by the engine through the state setter
+        self.code = self.state_to_code[self.initial_state]
+
+        if engine is None:
+            engine = DEFAULT_ENGINE
+        if engine not in MACHINE_ENGINES:
+            raise ValueError("unknown state machine engine '{}'".format(engine))
+        self.machine = MACHINE_ENGINES[engine](
             model=self,
             states=self.state_permutations,
             initial=self.initial_state,
@@ -43,6 +84,72 @@ class FiniteStateMachine:
     def reset(self):
         self.machine.set_state(self.initial_state)
 
+    @property
+    def state(self):
+        """
+        :return: state string of the current state, e.g. 'l0:pulled,l1:pushed,'
+        """
+        return self.code_to_state[self.code]
+
+    @state.setter
+    def state(self, state):
+        # the engines set the state string on every transition
+        self.code = self.state_to_code[state]
+
+    def encode(self, state):
+        """
+        :param state: state string, e.g. 'l0:pulled,l1:pushed,'
+        :return: integer encoding of state
+        """
+        return self.state_to_code[state]
+
+    def decode(self, code):
+        """
+        :param code: integer encoding of a state
+        :return: state string of code
+        """
+        return self.code_to_state[code]
+
+    def get_value_idx(self, var, code=None):
+        """
+        :param var: variable name, e.g. 'l0:'
+        :param code: integer encoding of a state. Defaults to the current state
+        :return: index into self.values of the value of var
+        """
+        if code is None:
+            code = self.code
+        return (code >> self.var_shift[var]) & self.value_mask
+
+    def get_value(self, var, code=None):
+        """
+        :param var: variable name, e.g. 'l0:'
+        :param code: integer encoding of a state. Defaults to the current state
+        :return: value of var, e.g. 'pulled,'
+        """
+        return self.values[self.get_value_idx(var, code)]
+
+    def var_is(self, var, value, code=None):
+        """
+        :param var: variable name, e.g. 'l0:'
+        :param value: value name, e.g. 'pushed,'
+        :param code: integer encoding of a state. Defaults to the current state
+        :return: True if var has value in the state
+        """
+        return self.get_value_idx(var, code) == self.value_to_idx[value]
+
+    def states_to_bitset(self, states):
+        """
+        Encodes a collection of states as a set of codes, where bit c is set if the state with code c
+        is in states.
+
+        :param states: iterable of state strings
+        :return: integer bitset of state codes
+        """
+        bitset = 0
+        for state in states:
+            bitset |= 1 << self.state_to_code[state]
+        return bitset
+
     def update_manager(self):
         """
         tells FSM manager to update the other FSM (latent/observable) based on the changes this FSM (obserable/latent) made
@@ -69,6 +176,7 @@ class FiniteStateMachineManager:
         l_vars,
         l_initial,
         actions,
+        engine=None,
     ):
         self.scenario = scenario
         self.observable_states = o_states
@@ -80,6 +188,7 @@ class FiniteStateMachineManager:
         self.latent_initial_state = l_initial
 
         self.actions = actions
+        self._action_set = set(actions)
 
         self.observable_fsm = FiniteStateMachine(
             fsm_manager=self,
@@ -87,6 +196,7 @@ class FiniteStateMachineManager:
             vars=self.observable_vars,
             states=self.observable_states,
             initial_state=self.observable_initial_state,
+            engine=engine,
         )
 
         self.latent_fsm = FiniteStateMachine(
@@ -95,6 +205,7 @@ class FiniteStateMachineManager:
             vars=self.latent_vars,
             states=self.latent_states,
             initial_state=self.latent_initial_state,
+            engine=engine,
         )
 
     def reset(self):
@@ -110,11 +221,10 @@ class FiniteStateMachineManager:
         extracts latent variables and their state into a dictonary. key: variable. value: variable state
         :return: dictionary of variables to their corresponding variable state
         """
+        code = self.latent_fsm.code
         latent_states = dict()
         for latent_var in self.latent_vars:
-            latent_states[latent_var] = self.extract_entity_state(
-                self.latent_fsm.state, latent_var
-            )
+            latent_states[latent_var] = self.latent_fsm.get_value(latent_var, code)
         return latent_states
 
         # parses out the state of a specified object from a full state string
@@ -124,16 +234,23 @@ class FiniteStateMachineManager:
         extracts observable variables and their state into a dictonary. key: variable. value: variable state
         :return: dictionary of variables to their corresponding variable state
         """
+        code = self.observable_fsm.code
         observable_states = dict()
         for observable_var in self.observable_vars:
-            observable_states[observable_var] = self.extract_entity_state(
-                self.observable_fsm.state, observable_var
+            observable_states[observable_var] = self.observable_fsm.get_value(
+                observable_var, code
             )
         return observable_states
 
     def get_internal_state(self):
         return self.observable_fsm.state + self.latent_fsm.state
 
+    def get_internal_code(self):
+        """
+        :return: (observable, latent) integer encodings of the current states
+        """
+        return self.observable_fsm.code, self.latent_fsm.code
+
     def update_latent(self):
         """
         updates the latent state space according to the scenario
@@ -149,7 +266,7 @@ class FiniteStateMachineManager:
         self.scenario.update_observable()
 
     def execute_action(self, action):
-        if action in self.actions:
+        if action in self._action_set:
             # changes in observable FSM will trigger a callback to update the latent FSM if needed
             self.observable_fsm.trigger(action)
         else:
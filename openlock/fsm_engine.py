@@ -0,0 +1,161 @@
+"""
+Lightweight finite state machine engine.
+
+Implements the subset of transitions.Machine used by the scenarios (add_transition, trigger, after
+callbacks, set_state) with integer dispatch tables: every state and trigger is assigned an integer
+index when it is added, and each trigger owns a list mapping a source state index to the
+destination state index and the callbacks to run.
+"""
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+Callback = Union[str, Callable[[], None]]
+
+# marks a (trigger, source state) pair without a transition
+NO_TRANSITION = -1
+
+
+class Machine:
+    def __init__(
+        self,
+        model,
+        states: Sequence[str],
+        initial: str,
+        ignore_invalid_triggers: bool = False,
+        auto_transitions: bool = False,
+    ) -> None:
+        """
+        Create a state machine and attach it to model. Like transitions.Machine, this sets
+        model.state and model.trigger.
+
+        :param model: object whose state is managed by this machine
+        :param states: names of all states
+        :param initial: name of the initial state
+        :param ignore_invalid_triggers: if False, triggering an unknown event raises
+        :param auto_transitions: unsupported, must be False
+        """
+        if auto_transitions:
+            raise ValueError("auto_transitions are not supported")
+        self.model = model
+        self.ignore_invalid_triggers = ignore_invalid_triggers
+
+        self.states: List[str] = list(states)
+        self.state_to_idx: Dict[str, int] = {
+            state: idx for idx, state in enumerate(self.states)
+        }
+
+        self.triggers: List[str] = []
+        self.trigger_to_idx: Dict[str, int] = dict()
+        # _dest[trigger_idx][source_idx] -> dest_idx or NO_TRANSITION
+        self._dest: List[List[int]] = []
+        # _after[trigger_idx][source_idx] -> callbacks run after the transition
+        self._after: List[List[Sequence[Callable[[], None]]]] = []
+
+        self.state_idx = self.state_to_idx[initial]
+        model.state = initial
+        model.trigger = self.trigger
+
+    def add_transition(
+        self,
+        trigger: str,
+        source: Union[str, Sequence[str]],
+        dest: str,
+        after: Optional[Union[Callback, Sequence[Callback]]] = None,
+    ) -> None:
+        """
+        Add a transition from source to dest on trigger. As in transitions.Machine, if several
+        transitions share a trigger and source state, the first one added is used.
+
+        :param trigger: name of the event
+        :param source: source state name, list of state names or '*' for every state
+        :param dest: destination state name
+        :param after: callback(s) run after the transition. Strings name methods of the model.
+        :return: Nothing
+        """
+        trigger_idx = self.add_trigger(trigger)
+        if source == "*":
+            sources = self.states
+        elif isinstance(source, str):
+            sources = [source]
+        else:
+            sources = source
+        callbacks = tuple(self._resolve_callbacks(after))
+        dest_idx = self.state_to_idx[dest]
+        dests = self._dest[trigger_idx]
+        afters = self._after[trigger_idx]
+        for source_state in sources:
+            source_idx = self.state_to_idx[source_state]
+            if dests[source_idx] == NO_TRANSITION:
+                dests[source_idx] = dest_idx
+                afters[source_idx] = callbacks
+
+    def add_trigger(self, trigger: str) -> int:
+        """
+        Register trigger if needed.
+
+        :param trigger: name of the event
+        :return: integer index of the trigger
+        """
+        if trigger not in self.trigger_to_idx:
+            self.trigger_to_idx[trigger] = len(self.triggers)
+            self.triggers.append(trigger)
+            self._dest.append([NO_TRANSITION] * len(self.states))
+            self._after.append([()] * len(self.states))
+        return self.trigger_to_idx[trigger]
+
+    def _resolve_callbacks(
+        self, callbacks: Optional[Union[Callback, Sequence[Callback]]]
+    ) -> List[Callable[[], None]]:
+        if callbacks is None:
+            return []
+        if isinstance(callbacks, str) or callable(callbacks):
+            callbacks = [callbacks]
+        return [
+            getattr(self.model, callback) if isinstance(callback, str) else callback
+            for callback in callbacks
+        ]
+
+    def trigger(self, trigger: str) -> bool:
+        """
+        Fire an event by name.
+
+        :param trigger: name of the event
+        :return: True if a transition was executed, False otherwise
+        """
+        trigger_idx = self.trigger_to_idx.get(trigger)
+        if trigger_idx is None:
+            if not self.ignore_invalid_triggers:
+                raise AttributeError(f"Do not know event named '{trigger}'.")
+            return False
+        return self.trigger_idx(trigger_idx)
+
+    def trigger_idx(self, trigger_idx: int) -> bool:
+        """
+        Fire an event by its integer index.
+
+        :param trigger_idx: index of the event, as returned by add_trigger
+        :return: True if a transition was executed, False otherwise
+        """
+        source_idx = self.state_idx
+        dest_idx = self._dest[trigger_idx][source_idx]
+        if dest_idx == NO_TRANSITION:
+            if not self.ignore_invalid_triggers:
+                raise RuntimeError(
+                    f"Can't trigger event {self.triggers[trigger_idx]} from state "
+                    f"{self.states[source_idx]}!"
+                )
+            return False
+        self.state_idx = dest_idx
+        self.model.state = self.states[dest_idx]
+        for callback in self._after[trigger_idx][source_idx]:
+            callback()
+        return True
+
+    def set_state(self, state: str) -> None:
+        """
+        Set the current state without running any callbacks.
+
+        :param state: name of the new state
+        :return: Nothing
+        """
+        self.state_idx = self.state_to_idx[state]
+        self.model.state = state
@@ -1,3 +1,5 @@
+import math
+
 import numpy as np
 
 # defined named tuples
@@ -59,6 +61,95 @@ def get_adjoint(transform):
     return res
 
 
+def _rotate(angles, offsets):
+    cos, sin = np.cos(angles), np.sin(angles)
+    return np.stack(
+        [
+            cos * offsets[..., 0] - sin * offsets[..., 1],
+            sin * offsets[..., 0] + cos * offsets[..., 1],
+        ],
+        axis=-1,
+    )
+
+
+def planar_forward_kinematics(base, thetas, geometry):
+    """
+    Forward kinematics of a planar chain of revolute joints, from cumulative sums of the joint
+    angles instead of products of homogeneous transforms. Leading dimensions of base and thetas are
+    batch dimensions.
+
+    :param base: base x, y, theta, shape (..., 3)
+    :param thetas: joint angles, shape (..., num_joints)
+    :param geometry: offsets of the links, see KinematicChain.get_planar_geometry
+    :return: positions of the joints, shape (..., num_joints, 2), and x, y, theta of the end of
+    the chain, shape (..., 3). theta is not wrapped.
+    """
+    base = np.asarray(base, dtype=float)
+    thetas = np.asarray(thetas, dtype=float)
+    minus_offsets, plus_offsets, plus_thetas = geometry
+    # frame angle at each joint, after its rotation
+    angles = base[..., 2:3] + np.cumsum(thetas + plus_thetas, axis=-1) - plus_thetas
+    minus = _rotate(angles - thetas, minus_offsets)
+    plus = _rotate(angles, plus_offsets)
+    ends = base[..., None, :2] + np.cumsum(minus + plus, axis=-2)
+    end_pose = np.concatenate(
+        [ends[..., -1, :], angles[..., -1:] + plus_thetas[-1]], axis=-1
+    )
+    return ends - plus, end_pose
+
+
+def planar_jacobian(joint_positions):
+    """
+    Analytic Jacobian of a planar chain of revolute joints. Rows are the x and y velocity and the
+    angular velocity about z, i.e. rows 0, 1 and 5 of KinematicChain.get_jacobian; its other rows
+    are zero for planar chains.
+
+    :param joint_positions: positions of the joints, shape (..., num_joints, 2)
+    :return: Jacobian, shape (..., 3, num_joints)
+    """
+    joint_positions = np.asarray(joint_positions)
+    jacobian = np.ones(joint_positions.shape[:-2] + (3, joint_positions.shape[-2]))
+    jacobian[..., 0, :] = joint_positions[..., 1]
+    jacobian[..., 1, :] = -joint_positions[..., 0]
+    return jacobian
+
+
+def planar_error_vec(current, target):
+    """
+    Error between two planar poses, equal to InverseKinematics.get_error_vec.
+
+    :param current: x, y, theta of the current pose, shape (..., 3)
+    :param target: x, y, theta of the target pose, shape (..., 3)
+    :return: error vector, shape (..., 6)
+    """
+    current = np.asarray(current, dtype=float)
+    target = np.asarray(target, dtype=float)
+    delta = target[..., 2] - current[..., 2]
+    cos, sin = np.cos(delta), np.sin(delta)
+    err_vec = np.zeros(np.broadcast(current, target).shape[:-1] + (6,))
+    # translation of target * inv(current)
+    err_vec[..., :2] = target[..., :2] - _rotate(delta, current[..., :2])
+    err_vec[..., 3] = err_vec[..., 4] = cos - 1
+    err_vec[..., 5] = 2 * (cos - 1) + sin
+    return err_vec
+
+
+def planar_delta_theta_dls(jacobian, err_vec, lam):
+    """
+    Damped least squares step, (J^T J + lam^2 I)^-1 J^T e computed as J^T (J J^T + lam^2 I)^-1 e,
+    which only solves a 3x3 system.
+
+    :param jacobian: Jacobian from planar_jacobian, shape (..., 3, num_joints)
+    :param err_vec: error from planar_error_vec, shape (..., 6)
+    :param lam: damping
+    :return: joint angle step, shape (..., num_joints)
+    """
+    err = np.asarray(err_vec)[..., [0, 1, 5], None]
+    jac_t = np.swapaxes(jacobian, -1, -2)
+    damped = jacobian @ jac_t + (lam ** 2) * np.eye(3)
+    return (jac_t @ np.linalg.solve(damped, err))[..., 0]
+
+
 def discretize_path(cur, targ, step_delta):
     # calculate number of discretized steps
     delta = [t - c for t, c in zip(targ, cur)]
@@ -148,6 +239,60 @@ class InverseKinematics(object):
         return dtheta
 
 
+class PlanarInverseKinematics(InverseKinematics):
+    """
+    InverseKinematics for planar chains of revolute joints and planar targets, using the closed
+    form kinematics above instead of homogeneous transforms. Results match InverseKinematics up to
+    floating point error.
+
+    The target needs a get_planar_pose method, like TwoDKinematicTransform and KinematicChain.
+    """
+
+    def get_error_vec(self, clamp=False):
+        cur_x, cur_y, cur_theta = self.kinematic_chain.get_planar_pose()
+        targ_x, targ_y, targ_theta = self.target.get_planar_pose()
+        delta = targ_theta - cur_theta
+        cos, sin = math.cos(delta), math.sin(delta)
+        # translation of target * inv(current)
+        err_vec = np.array(
+            [
+                targ_x - (cos * cur_x - sin * cur_y),
+                targ_y - (sin * cur_x + cos * cur_y),
+                0,
+                cos - 1,
+                cos - 1,
+                2 * (cos - 1) + sin,
+            ]
+        )
+        if clamp:
+            err_vec = clamp_mag(err_vec, clamp)
+
+        return err_vec
+
+    def get_delta_theta_dls(self, lam=3, clamp_err=False, clamp_theta=False):
+        err = self.get_error_vec(clamp=clamp_err)
+        jac = self.kinematic_chain.get_planar_jacobian()
+        jac_t = jac.transpose()
+        # (J^T J + lam^2 I)^-1 J^T = J^T (J J^T + lam^2 I)^-1, a 3x3 system
+        dtheta = jac_t.dot(
+            np.linalg.solve(jac.dot(jac_t) + (lam ** 2) * np.eye(3), err[[0, 1, 5]])
+        )
+        if clamp_theta:
+            dtheta = clamp_mag(dtheta, clamp_theta)
+
+        return dtheta
+
+    def get_delta_theta_trans(self, alpha=0.01, clamp_err=False, clamp_theta=False):
+        err = self.get_error_vec(clamp=clamp_err)
+        jacob = self.kinematic_chain.get_planar_jacobian()
+        dtheta = alpha * jacob.transpose().dot(err[[0, 1, 5]])
+
+        if clamp_theta:
+            dtheta = clamp_mag(dtheta, clamp_theta)
+
+        return dtheta
+
+
 class KinematicChain(object):
     def __init__(self, base, chain):
         self.chain = chain
@@ -245,6 +390,59 @@ class KinematicChain(object):
 
         return res
 
+    def get_planar_geometry(self):
+        """
+        Offsets of the links for planar_forward_kinematics.
+
+        :return: x, y of the minus transforms, shape (num_joints, 2), x, y of the plus transforms,
+        shape (num_joints, 2), and theta of the plus transforms, shape (num_joints,)
+        """
+        return (
+            np.array([[link.minus.x, link.minus.y] for link in self.chain], float),
+            np.array([[link.plus.x, link.plus.y] for link in self.chain], float),
+            np.array([link.plus.theta for link in self.chain], float),
+        )
+
+    def get_planar_forward_kinematics(self):
+        """
+        Scalar version of planar_forward_kinematics for the current config; for a single short
+        chain, Python floats are faster than NumPy arrays.
+
+        :return: positions of the joints, a list of (x, y), and x, y, theta of the end of the
+        chain, theta not wrapped
+        """
+        x, y, angle = self.base.x, self.base.y, self.base.theta
+        joint_positions = []
+        for link in self.chain:
+            minus, plus = link.minus, link.plus
+            cos, sin = math.cos(angle), math.sin(angle)
+            x, y = x + cos * minus.x - sin * minus.y, y + sin * minus.x + cos * minus.y
+            joint_positions.append((x, y))
+            angle += minus.theta
+            cos, sin = math.cos(angle), math.sin(angle)
+            x, y = x + cos * plus.x - sin * plus.y, y + sin * plus.x + cos * plus.y
+            angle += plus.theta
+        return joint_positions, (x, y, angle)
+
+    def get_planar_pose(self):
+        """
+        :return: x, y, theta of the end of the chain, theta not wrapped
+        """
+        return self.get_planar_forward_kinematics()[1]
+
+    def get_planar_jacobian(self):
+        """
+        :return: rows 0, 1 and 5 of get_jacobian, see planar_jacobian
+        """
+        joint_positions = self.get_planar_forward_kinematics()[0]
+        return np.array(
+            [
+                [y for _, y in joint_positions],
+                [-x for x, _ in joint_positions],
+                [1.0] * len(joint_positions),
+            ]
+        )
+
     def get_inertia_matrix(self):
         # one jacobian for every link in chain
         jacobians = [np.zeros((6, len(self.chain))) for i in range(0, len(self.chain))]
@@ -366,6 +564,9 @@ class TwoDKinematicTransform(object):
     def get_transform(self):
         return self.transform
 
+    def get_planar_pose(self):
+        return self.x, self.y, self.theta
+
 
 def main():
     import openlock
@@ -1,10 +1,18 @@
+import atexit
 import copy
+import os
+import queue
+import threading
 import time
-from typing import Sequence
+import weakref
+from typing import Dict, Optional, Sequence, Tuple
 
+import numpy as np
 import texttable
 
+from openlock.clock import Clock, RealClock
 from openlock.common import Action
+from openlock.solution_automaton import SolutionAutomaton
 
 
 class ActionLog(object):
@@ -12,10 +20,7 @@ class ActionLog(object):
     Represents an action for the purpose of logging. Actions have a name, start time, and end time.
     """
 
-    start_time = None
-    end_time = None
-    name = None
-    reward = 0
+    __slots__ = ("name", "start_time", "end_time", "reward")
 
     def __init__(self, name, start_time):
         """
@@ -26,6 +31,8 @@ class ActionLog(object):
         """
         self.name = name
         self.start_time = start_time
+        self.end_time = None
+        self.reward = 0
 
     def __eq__(self, other):
         """
@@ -65,19 +72,310 @@ class ActionLog(object):
         self.end_time = end_time
 
 
+class ResultsTable(object):
+    """
+    Growable table of integer environment results with a header of column labels.
+
+    Rows are stored in a preallocated NumPy array that doubles in size when full. Indexing follows
+    the list of rows the table replaces: table[0] is the header (col_label), table[i] is row i - 1
+    and table[-1] is the last row. Slices return lists of Python int rows, prefixed by the header if
+    the slice includes index 0.
+    """
+
+    def __init__(self, col_label, capacity=16, dtype=np.int32):
+        """
+        Create an empty table.
+
+        :param col_label: Column labels.
+        :param capacity: Initial number of rows to preallocate.
+        :param dtype: Integer dtype of the entries.
+        """
+        self.col_label = list(col_label)
+        self.index_map = {name: idx for idx, name in enumerate(self.col_label)}
+        self._data = np.zeros((max(capacity, 1), len(self.col_label)), dtype=dtype)
+        self.num_rows = 0
+
+    def __len__(self):
+        """
+        :return: Number of rows, including the header.
+        """
+        return self.num_rows + 1
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return self.to_list()[idx]
+        if idx < 0:
+            idx += len(self)
+        if idx == 0:
+            return self.col_label
+        if not 0 < idx < len(self):
+            raise IndexError("results index out of range")
+        return self._data[idx - 1]
+
+    def __iter__(self):
+        return iter(self.to_list())
+
+    def __deepcopy__(self, memo):
+        table = ResultsTable(self.col_label, self.num_rows, self._data.dtype)
+        table._data[: self.num_rows] = self.rows
+        table.num_rows = self.num_rows
+        return table
+
+    @property
+    def rows(self):
+        """
+        :return: View of the data rows, without the header.
+        """
+        return self._data[: self.num_rows]
+
+    def append(self, row):
+        """
+        Copy row into the table, growing the preallocated array if needed.
+
+        :param row: Sequence of len(col_label) integers.
+        :return: View of the appended row.
+        """
+        if self.num_rows == self._data.shape[0]:
+            data = np.zeros(
+                (2 * self._data.shape[0], self._data.shape[1]), self._data.dtype
+            )
+            data[: self.num_rows] = self._data
+            self._data = data
+        self._data[self.num_rows] = row
+        self.num_rows += 1
+        return self._data[self.num_rows - 1]
+
+    def clear(self):
+        """
+        Remove all rows, keeping the allocated array.
+
+        :return: Nothing.
+        """
+        self.num_rows = 0
+
+    def to_list(self):
+        """
+        :return: List of the header followed by each row as a list of Python ints.
+        """
+        return [self.col_label] + self.rows.tolist()
+
+    def view(self):
+        """
+        Read-only table of the current rows, sharing their data with this table. Rows appended
+        later are not part of the view, but clear() followed by append overwrites its rows; use
+        snapshot() for results that must outlive that.
+
+        :return: The view.
+        """
+        return self._read_only(self.rows.view())
+
+    def snapshot(self):
+        """
+        Copy the rows into a read-only table of exactly num_rows rows. The header and index map
+        are shared with this table.
+
+        :return: The snapshot.
+        """
+        return self._read_only(self.rows.copy())
+
+    def _read_only(self, rows):
+        table = ResultsTable.__new__(ResultsTable)
+        table.col_label = self.col_label
+        table.index_map = self.index_map
+        table._data = rows
+        table._data.flags.writeable = False
+        table.num_rows = self.num_rows
+        return table
+
+
+# last index assigned by reserve_results_path in each (directory, prefix, suffix)
+_results_indices: Dict[Tuple[str, str, str], int] = dict()
+
+
+def reserve_results_path(
+    save_path: str, prefix: str = "results", suffix: str = ".csv"
+) -> str:
+    """
+    Create an empty results file with the lowest free index, e.g. save_path + "results3.csv".
+
+    Files are created exclusively, so processes sharing save_path never get the same file. Each
+    process remembers the last index it took, so it only probes the files created since.
+
+    :param save_path: directory prefix of the file
+    :param prefix: file name before the index
+    :param suffix: file name after the index
+    :return: path of the created file
+    """
+    key = (save_path, prefix, suffix)
+    index = _results_indices.get(key, -1) + 1
+    while True:
+        path = "{}{}{}{}".format(save_path, prefix, index, suffix)
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            index += 1
+            continue
+        _results_indices[key] = index
+        return path
+
+
+# writers whose files may still be open, closed at exit so background writes are not lost
+_open_writers: "weakref.WeakSet[ResultsWriter]" = weakref.WeakSet()
+
+
+@atexit.register
+def _close_writers() -> None:
+    for writer in list(_open_writers):
+        writer.close()
+
+
+class ResultsWriter(object):
+    """
+    Appends result rows to a CSV file with a header of column labels, as _export_results wrote them.
+
+    Rows are copied into a chunk of chunk_size rows. Full chunks are written to the file by a
+    background thread, so append only blocks on the copy. An error in the background thread is
+    raised by the next call to append, flush or close.
+    """
+
+    def __init__(
+        self,
+        col_label: Sequence[str],
+        save_path: str,
+        chunk_size: int = 256,
+        dtype=np.int32,
+    ):
+        """
+        Create the next free results file in save_path and write the header.
+
+        :param col_label: Column labels.
+        :param save_path: Directory prefix of the file, see reserve_results_path.
+        :param chunk_size: Number of rows written at once.
+        :param dtype: Integer dtype of the entries.
+        """
+        self.col_label = list(col_label)
+        self.save_path = save_path
+        self.path = reserve_results_path(save_path)
+        self.num_rows = 0
+        self._chunk = np.zeros((chunk_size, len(self.col_label)), dtype=dtype)
+        self._chunk_rows = 0
+        self._error: Optional[BaseException] = None
+        # chunks to write, None closes the file
+        self._chunks: "queue.Queue[Optional[np.ndarray]]" = queue.Queue()
+        self._file = open(self.path, "w")
+        self._file.write(",".join(str(label) for label in self.col_label) + "\n")
+        self._thread = threading.Thread(target=self._write_chunks, daemon=True)
+        self._thread.start()
+        self.closed = False
+        _open_writers.add(self)
+
+    def _write_chunks(self) -> None:
+        while True:
+            chunk = self._chunks.get()
+            try:
+                if chunk is None:
+                    self._file.close()
+                    return
+                if self._error is None:
+                    np.savetxt(self._file, chunk, fmt="%d", delimiter=",")
+                    self._file.flush()
+            except BaseException as e:
+                self._error = e
+            finally:
+                self._chunks.task_done()
+
+    def _check_error(self) -> None:
+        if self._error is not None:
+            raise RuntimeError(
+                "Writing results to {} failed".format(self.path)
+            ) from self._error
+
+    def _submit_chunk(self) -> None:
+        if self._chunk_rows > 0:
+            self._chunks.put(self._chunk[: self._chunk_rows].copy())
+            self._chunk_rows = 0
+
+    def append(self, row) -> None:
+        """
+        :param row: Sequence of len(col_label) integers, copied.
+        """
+        if self.closed:
+            raise ValueError("append to a closed ResultsWriter")
+        self._check_error()
+        self._chunk[self._chunk_rows] = row
+        self._chunk_rows += 1
+        self.num_rows += 1
+        if self._chunk_rows == self._chunk.shape[0]:
+            self._submit_chunk()
+
+    def extend(self, rows) -> None:
+        """
+        :param rows: Rows to append.
+        """
+        for row in rows:
+            self.append(row)
+
+    def flush(self, wait: bool = True) -> None:
+        """
+        Write the rows appended so far.
+
+        :param wait: Whether to wait until they are in the file.
+        """
+        self._check_error()
+        self._submit_chunk()
+        if wait:
+            self._chunks.join()
+            self._check_error()
+
+    def close(self, wait: bool = True) -> None:
+        """
+        Write the remaining rows and close the file.
+
+        :param wait: Whether to wait until the file is closed. Otherwise the background thread
+        finishes writing on its own.
+        """
+        if not self.closed:
+            self._submit_chunk()
+            self._chunks.put(None)
+            self.closed = True
+        if wait:
+            self._thread.join()
+            _open_writers.discard(self)
+            self._check_error()
+
+
+def read_results(path: str) -> ResultsTable:
+    """
+    :param path: CSV file written by ResultsWriter or _export_results.
+    :return: Table of the rows in the file.
+    """
+    with open(path) as f:
+        col_label = f.readline().rstrip("\n").split(",")
+        rows = np.loadtxt(f, delimiter=",", dtype=np.int64, ndmin=2)
+    table = ResultsTable(col_label, capacity=len(rows))
+    for row in rows:
+        table.append(row)
+    return table
+
+
 class AttemptLog(object):
     """
     Represents an attempt for the purpose of logging.
+
+    Finished actions are appended to action_seq as they are, not copied; they must not be modified
+    once the attempt is finished.
     """
 
-    attempt_num = None
-    action_seq = []
-    start_time = None
-    success = False
-    end_time = None
-    cur_action = None
-    results = None
-    reward = None
+    __slots__ = (
+        "attempt_num",
+        "action_seq",
+        "start_time",
+        "success",
+        "end_time",
+        "cur_action",
+        "results",
+        "reward",
+    )
 
     def __init__(self, attempt_num, start_time):
         """
@@ -87,7 +385,12 @@ class AttemptLog(object):
         :param start_time: Start time of this attempt.
         """
         self.attempt_num = attempt_num
+        self.action_seq = []
         self.start_time = start_time
+        self.success = False
+        self.end_time = None
+        self.cur_action = None
+        self.results = None
         self.reward = 0
 
     def __eq__(self, other):
@@ -113,12 +416,12 @@ class AttemptLog(object):
 
         :param name: Name of the action.
         :param t: Start time of the action.
-        :return: Nothing.
+        :return: The current action.
         """
         if t is None:
             t = time.time()
         self.cur_action = ActionLog(name, t)
-        return copy.copy(self.cur_action)
+        return self.cur_action
 
     def finish_action(self, results, t=None):
         """
@@ -126,16 +429,15 @@ class AttemptLog(object):
 
         :param results: Environment results.
         :param t: Finish time of the action.
-        :return: Nothing
+        :return: The finished action, as appended to action_seq.
         """
         if t is None:
             t = time.time()
-        self.cur_action.finish(t)
+        action = self.cur_action
+        action.finish(t)
         self.results = results
 
-        self.action_seq.append(copy.deepcopy(self.cur_action))
-        action = copy.copy(self.cur_action)
-
+        self.action_seq.append(action)
         self.cur_action = None
         return action
 
@@ -197,7 +499,7 @@ class TrialLog(object):
     solution_found = []
     random_seed = None
 
-    def __init__(self, name, scenario_name, solutions, start_time):
+    def __init__(self, name, scenario_name, solutions, start_time, clock: Clock = None):
         """
         Create the trial.
 
@@ -205,14 +507,18 @@ class TrialLog(object):
         :param scenario_name: Name of the scenario.
         :param solutions:
         :param start_time: Start time of the trial.
-        :param random_seed:
+        :param clock: Clock attempts are timed with, a RealClock if None.
         """
         self.name = name
+        self.clock = RealClock() if clock is None else clock
         self.start_time = start_time
         self.scenario_name = scenario_name
         self.solutions = solutions
+        self.solution_automaton = SolutionAutomaton(solutions)
         self.success = False
         self.completed_solutions = []
+        # bitset of the indices of completed_solutions in solutions
+        self.completed_solutions_mask = 0
         self.attempt_seq = []
         self.solution_found = []
         self.trial_reward = None
@@ -223,8 +529,7 @@ class TrialLog(object):
 
         :return: Nothing
         """
-        self.cur_attempt = AttemptLog(len(self.attempt_seq), time.time())
-        self.cur_attempt.action_seq = []
+        self.cur_attempt = AttemptLog(len(self.attempt_seq), self.clock.time())
         self.cur_attempt.results = []
 
     @staticmethod
@@ -247,31 +552,24 @@ class TrialLog(object):
         """
         if action_seq is None:
             action_seq = self.cur_attempt.action_seq
-        # TODO(mjedmonds): refactor this; hacky way to deal
-        action_seq_str = [str(x) for x in action_seq]
-        solutions_str = [[str(x) for x in solution] for solution in self.solutions]
-        completed_solutions_str = [
-            [str(x) for x in solution] for solution in self.completed_solutions
-        ]
-
-        solution_matches = [
-            self.compare_action_sequence_strings(action_seq_str, solution)
-            for solution in solutions_str
-        ]
-        completed_matches = [
-            self.compare_action_sequence_strings(action_seq_str, solution)
-            for solution in completed_solutions_str
-        ]
+        solution_matches = self.solution_automaton.run(action_seq)
         # check to see if this attempt is a solution that has not been completed already
-        if any(solution_matches) and not any(completed_matches):
+        if solution_matches and not solution_matches & self.completed_solutions_mask:
             attempt_success = True
-            solution = self.solutions[solution_matches.index(True)]
-            self.completed_solutions.append(solution)
+            solution_idx = SolutionAutomaton.first(solution_matches)
+            self.completed_solutions_mask |= 1 << solution_idx
+            self.completed_solutions.append(self.solutions[solution_idx])
         else:
             attempt_success = False
         self.solution_found.append(attempt_success)
-        self.cur_attempt.finish(attempt_success, results, time.time())
-        self.attempt_seq.append(copy.deepcopy(self.cur_attempt))
+        # the attempt is recorded as is; only the results, which the environment reuses across
+        # attempts, are copied
+        if isinstance(results, ResultsTable):
+            results = results.snapshot()
+        else:
+            results = copy.deepcopy(results)
+        self.cur_attempt.finish(attempt_success, results, self.clock.time())
+        self.attempt_seq.append(self.cur_attempt)
         self.success = len(self.solutions) == len(self.completed_solutions)
         self.cur_attempt = None
         return attempt_success
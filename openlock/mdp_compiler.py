@@ -0,0 +1,453 @@
+"""
+Compiles a trial into a Markov decision process and solves it.
+
+The states of the MDP are the reachable states of a trial of an FSM-only OpenLockEnv: the scenario
+state (the observable and latent FSM states of a Scenario, or the pushed, locked and timer state of a
+NoFsmScenario), the solutions the actions of the current attempt match, the number of actions taken
+in the attempt and the bitset of completed solutions. Reward modes that punish repeated actions also
+keep the last action. An attempt ends after action_limit actions, and the trial once every solution
+is completed, in an absorbing state without rewards.
+
+Transitions follow OpenLockEnv.step: an action fails with the effect probability of its object, and a
+NoFsmScenario moves an unlocked object with its own effect probability. Rewards are those of
+RewardStrategy for one reward mode. The transitions and rewards are stored sparsely, as the outcomes
+of every (state, action) pair, and TrialMDP solves them with vectorized value or policy iteration.
+"""
+from typing import Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from openlock.envs.openlock_env import OpenLockEnv
+from openlock.rewards import (
+    REPEATED_ACTION_REWARD_MODES,
+    RewardContext,
+    RewardStrategy,
+)
+from openlock.settings_trial import ACTION_LIMIT, ATTEMPT_LIMIT
+
+
+class MDPState(NamedTuple):
+    # Scenario.snapshot or NoFsmScenario.snapshot of the scenario
+    scenario_state: Hashable
+    # bitset of the solutions the actions of the attempt match
+    solution_matches: int
+    num_actions: int
+    # only kept for REPEATED_ACTION_REWARD_MODES
+    last_action: Optional[str]
+    # bitset of the completed solutions
+    completed_solutions: int
+
+
+class _FixedDraws(object):
+    """
+    Replaces the random_blocks of a scenario, to run one branch of its effect probability draws.
+    """
+
+    def __init__(self, value: float):
+        self.value = value
+        self.num_draws = 0
+
+    def sample(self) -> float:
+        self.num_draws += 1
+        return self.value
+
+
+class TrialMDP(object):
+    def __init__(
+        self,
+        states: List[MDPState],
+        action_space: List[str],
+        offsets: np.ndarray,
+        next_states: np.ndarray,
+        probabilities: np.ndarray,
+        rewards: np.ndarray,
+    ):
+        """
+        :param states: states, the first being the start of the trial
+        :param action_space: action names, in the order of OpenLockEnv.action_space
+        :param offsets: the outcomes of action a in state s are offsets[r]:offsets[r + 1], where
+        r = s * len(action_space) + a
+        :param next_states: next state of every outcome
+        :param probabilities: probability of every outcome
+        :param rewards: reward of every outcome
+        """
+        self.states = states
+        self.state_index: Dict[MDPState, int] = {
+            state: i for i, state in enumerate(states)
+        }
+        self.action_space = action_space
+        self.offsets = offsets
+        self.next_states = next_states
+        self.probabilities = probabilities
+        self.rewards = rewards
+
+        self.num_states = len(states)
+        self.num_actions = len(action_space)
+        # (state, action) row of every outcome
+        self._rows = np.repeat(
+            np.arange(self.num_states * self.num_actions), np.diff(offsets)
+        )
+        self._row_states = self._rows // self.num_actions
+        self._row_actions = self._rows % self.num_actions
+        # rows without outcomes are those of the absorbing end of the trial
+        self.terminal = (
+            np.diff(offsets).reshape(self.num_states, self.num_actions).sum(axis=1) == 0
+        )
+
+    @classmethod
+    def compile(
+        cls,
+        env: OpenLockEnv,
+        reward_mode: str = "basic",
+        action_limit: Optional[int] = None,
+    ) -> "TrialMDP":
+        """
+        :param env: FSM-only env, reset after setup_trial. Its scenario is returned to its state
+        :param reward_mode: reward mode of the rewards, see RewardStrategy
+        :param action_limit: number of actions per attempt, env.action_limit if None
+        :return: the MDP of the env's trial
+        """
+        if env.use_physics:
+            raise ValueError("Only FSM-only envs can be compiled")
+        if action_limit is None:
+            action_limit = env.action_limit
+        return _Compiler(env, reward_mode, action_limit).compile()
+
+    def expected_rewards(self) -> np.ndarray:
+        """
+        :return: expected reward of every (state, action), shape (num_states, num_actions)
+        """
+        return np.bincount(
+            self._rows,
+            weights=self.probabilities * self.rewards,
+            minlength=self.num_states * self.num_actions,
+        ).reshape(self.num_states, self.num_actions)
+
+    def q_values(self, values: np.ndarray, gamma: float) -> np.ndarray:
+        """
+        :param values: value of every state
+        :param gamma: discount factor
+        :return: action values, shape (num_states, num_actions)
+        """
+        backups = self.probabilities * (self.rewards + gamma * values[self.next_states])
+        return np.bincount(
+            self._rows, weights=backups, minlength=self.num_states * self.num_actions
+        ).reshape(self.num_states, self.num_actions)
+
+    def value_iteration(
+        self, gamma: float = 0.99, tol: float = 1e-6, max_iterations: int = 100000
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        :param gamma: discount factor
+        :param tol: stop once no value changes by more than tol
+        :param max_iterations: maximum number of sweeps over every state
+        :return: optimal values and a greedy policy, the action index of every state
+        """
+        values = np.zeros(self.num_states)
+        for _ in range(max_iterations):
+            q_values = self.q_values(values, gamma)
+            new_values = q_values.max(axis=1)
+            converged = np.abs(new_values - values).max(initial=0.0) <= tol
+            values = new_values
+            if converged:
+                return values, q_values.argmax(axis=1)
+        raise RuntimeError(
+            f"Value iteration did not converge in {max_iterations} iterations"
+        )
+
+    def evaluate_policy(
+        self,
+        policy: np.ndarray,
+        gamma: float = 0.99,
+        tol: float = 1e-6,
+        max_iterations: int = 100000,
+        values: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        :param policy: action index of every state
+        :param gamma: discount factor
+        :param tol: stop once no value changes by more than tol
+        :param max_iterations: maximum number of sweeps over every state
+        :param values: initial values, zeros if None
+        :return: values of the policy
+        """
+        chosen = self._row_actions == policy[self._row_states]
+        rows = self._row_states[chosen]
+        next_states = self.next_states[chosen]
+        probabilities = self.probabilities[chosen]
+        rewards = probabilities * self.rewards[chosen]
+        values = np.zeros(self.num_states) if values is None else values
+        for _ in range(max_iterations):
+            new_values = np.bincount(
+                rows,
+                weights=rewards + gamma * probabilities * values[next_states],
+                minlength=self.num_states,
+            )
+            converged = np.abs(new_values - values).max(initial=0.0) <= tol
+            values = new_values
+            if converged:
+                return values
+        raise RuntimeError(
+            f"Policy evaluation did not converge in {max_iterations} iterations"
+        )
+
+    def policy_iteration(
+        self, gamma: float = 0.99, tol: float = 1e-6, max_iterations: int = 1000
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Policy iteration with iterative policy evaluation.
+
+        :param gamma: discount factor
+        :param tol: tolerance of the policy evaluation and of policy improvements
+        :param max_iterations: maximum number of policy improvements
+        :return: optimal values and an optimal policy, the action index of every state
+        """
+        states = np.arange(self.num_states)
+        policy = np.zeros(self.num_states, dtype=np.int64)
+        values = None
+        for _ in range(max_iterations):
+            values = self.evaluate_policy(policy, gamma, tol, values=values)
+            q_values = self.q_values(values, gamma)
+            greedy = q_values.argmax(axis=1)
+            # only switch actions that are better by more than the evaluation error
+            improved = q_values[states, greedy] > q_values[states, policy] + tol
+            if not improved.any():
+                return values, policy
+            policy = np.where(improved, greedy, policy)
+        raise RuntimeError(
+            f"Policy iteration did not converge in {max_iterations} iterations"
+        )
+
+
+class _Compiler(object):
+    def __init__(self, env: OpenLockEnv, reward_mode: str, action_limit: int):
+        self.env = env
+        self.scenario = env.scenario
+        self.reward_mode = reward_mode
+        self.action_limit = action_limit
+        self.keep_last_action = reward_mode in REPEATED_ACTION_REWARD_MODES
+
+        self.automaton = env.cur_trial.solution_automaton
+        self.action_space: List[str] = list(env.action_space)
+        # (action name, external action, role action, effect probability of OpenLockEnv.step)
+        self.actions = []
+        for action_name in self.action_space:
+            action_role = env.action_map_external_role[action_name]
+            self.actions.append(
+                (
+                    action_name,
+                    env.action_map[action_name],
+                    action_role,
+                    env.get_effect_probability(action_role.obj),
+                )
+            )
+        self.reward_strategy = RewardStrategy()
+        self.context = RewardContext(
+            self.automaton,
+            env.get_solutions(),
+            ATTEMPT_LIMIT if env.attempt_limit is None else env.attempt_limit,
+        )
+
+        # scenario transitions and object states are shared by every solution progress
+        self._transitions: Dict[
+            Tuple[Hashable, int], List[Tuple[float, Hashable]]
+        ] = dict()
+        self._obj_states: Dict[Hashable, Dict[str, np.int8]] = dict()
+
+        self.states: List[MDPState] = []
+        self.state_index: Dict[MDPState, int] = dict()
+
+    def _add_state(self, state: MDPState) -> int:
+        index = self.state_index.get(state)
+        if index is None:
+            index = len(self.states)
+            self.state_index[state] = index
+            self.states.append(state)
+        return index
+
+    def _obj_state(self, scenario_state: Hashable) -> Dict[str, np.int8]:
+        obj_state = self._obj_states.get(scenario_state)
+        if obj_state is None:
+            self.scenario.restore(scenario_state)
+            obj_state = self.scenario.get_obj_state()
+            self._obj_states[scenario_state] = obj_state
+        return obj_state
+
+    def _execute(self, scenario_state: Hashable, action_role, draw: float):
+        """
+        :return: the scenario state after executing the action with every effect draw of the
+        scenario equal to draw, and whether the scenario drew
+        """
+        self.scenario.restore(scenario_state)
+        draws = _FixedDraws(draw)
+        self.scenario.random_blocks = draws
+        self.scenario.execute_fsm_action(action_role)
+        return self.scenario.snapshot(), draws.num_draws > 0
+
+    def _scenario_transitions(
+        self, scenario_state: Hashable, action_idx: int
+    ) -> List[Tuple[float, Hashable]]:
+        """
+        :return: (probability, next scenario state) of every outcome of an action
+        """
+        key = (scenario_state, action_idx)
+        transitions = self._transitions.get(key)
+        if transitions is not None:
+            return transitions
+
+        _, _, action_role, effect_probability = self.actions[action_idx]
+        transitions = []
+        # the action fails as in OpenLockEnv._execute_fsm_action, and the scenario does not run
+        if effect_probability < 1.0:
+            transitions.append((1.0 - effect_probability, scenario_state))
+        if effect_probability > 0.0:
+            # a draw of 0 has an effect unless the probability is 0, which has no weight below
+            moved_state, drew = self._execute(scenario_state, action_role, 0.0)
+            if not drew:
+                transitions.append((effect_probability, moved_state))
+            else:
+                scenario_probability = self.scenario.get_effect_probability(
+                    action_role.obj
+                )
+                if scenario_probability > 0.0:
+                    transitions.append(
+                        (effect_probability * scenario_probability, moved_state)
+                    )
+                if scenario_probability < 1.0:
+                    unmoved_state, _ = self._execute(
+                        scenario_state, action_role, np.inf
+                    )
+                    transitions.append(
+                        (
+                            effect_probability * (1.0 - scenario_probability),
+                            unmoved_state,
+                        )
+                    )
+        self._transitions[key] = transitions
+        return transitions
+
+    def compile(self) -> TrialMDP:
+        scenario = self.scenario
+        saved_state = scenario.snapshot()
+        saved_draws = scenario.random_blocks
+        try:
+            scenario.reset()
+            initial_state = scenario.snapshot()
+            all_solutions = self.automaton.all_solutions
+            self._add_state(MDPState(initial_state, self.automaton.start(), 0, None, 0))
+
+            offsets = [0]
+            next_states: List[int] = []
+            probabilities: List[float] = []
+            rewards: List[float] = []
+            i = 0
+            while i < len(self.states):
+                state = self.states[i]
+                i += 1
+                if all_solutions and state.completed_solutions == all_solutions:
+                    # absorbing end of the trial
+                    offsets.extend([len(next_states)] * len(self.actions))
+                    continue
+                for action_idx in range(len(self.actions)):
+                    outcomes = self._outcomes(state, action_idx, initial_state)
+                    for (next_state, reward), probability in outcomes.items():
+                        next_states.append(self._add_state(next_state))
+                        probabilities.append(probability)
+                        rewards.append(reward)
+                    offsets.append(len(next_states))
+        finally:
+            scenario.restore(saved_state)
+            scenario.random_blocks = saved_draws
+
+        return TrialMDP(
+            self.states,
+            self.action_space,
+            np.array(offsets, dtype=np.int64),
+            np.array(next_states, dtype=np.int64),
+            np.array(probabilities, dtype=float),
+            np.array(rewards, dtype=float),
+        )
+
+    def _outcomes(
+        self, state: MDPState, action_idx: int, initial_state: Hashable
+    ) -> Dict[Tuple[MDPState, float], float]:
+        """
+        :return: probability of every (next state, reward) of an action
+        """
+        action_name, action, _, _ = self.actions[action_idx]
+        solution_matches = self.automaton.advance(
+            state.solution_matches, state.num_actions, action_name
+        )
+        num_actions = state.num_actions + 1
+        prev_obj_state = self._obj_state(state.scenario_state)
+
+        context = self.context
+        context.completed_solutions_mask = state.completed_solutions
+        context.solution_matches = solution_matches
+        context.num_actions = num_actions
+        context.last_actions = (state.last_action, action_name)
+        context.prev_state = {"OBJ_STATES": prev_obj_state}
+
+        attempt_finished = num_actions >= self.action_limit
+        if attempt_finished:
+            context.finish_attempt()
+            # the next attempt starts from the reset scenario
+            finished_state = MDPState(
+                initial_state,
+                self.automaton.start(),
+                0,
+                None,
+                context.completed_solutions_mask,
+            )
+            context.completed_solutions_mask = state.completed_solutions
+
+        outcomes: Dict[Tuple[MDPState, float], float] = dict()
+        for probability, scenario_state in self._scenario_transitions(
+            state.scenario_state, action_idx
+        ):
+            context.cur_state = {"OBJ_STATES": self._obj_state(scenario_state)}
+            reward, _ = self.reward_strategy.determine_reward(
+                context, action, self.reward_mode
+            )
+            if attempt_finished:
+                next_state = finished_state
+            else:
+                next_state = MDPState(
+                    scenario_state,
+                    solution_matches,
+                    num_actions,
+                    action_name if self.keep_last_action else None,
+                    state.completed_solutions,
+                )
+            key = (next_state, float(reward))
+            outcomes[key] = outcomes.get(key, 0.0) + probability
+        return outcomes
+
+
+def compile_trial(
+    scenario_name: str,
+    trial_name: Optional[str] = None,
+    reward_mode: str = "basic",
+    action_limit: int = ACTION_LIMIT,
+    attempt_limit: int = ATTEMPT_LIMIT,
+) -> TrialMDP:
+    """
+    :param scenario_name: name of the scenario
+    :param trial_name: name of the trial. If None, a random trial is selected, as in setup_trial
+    :param reward_mode: reward mode of the rewards, see RewardStrategy
+    :param action_limit: number of actions per attempt
+    :param attempt_limit: number of attempts, which only the solution multiplier depends on
+    :return: the MDP of the trial
+    """
+    env = OpenLockEnv()
+    env.use_physics = False
+    env.initialize_for_scenario(scenario_name)
+    env.setup_trial(
+        scenario_name=scenario_name,
+        action_limit=action_limit,
+        attempt_limit=attempt_limit,
+        specified_trial=trial_name,
+        multiproc=True,
+    )
+    env.reset()
+    return TrialMDP.compile(env, reward_mode)
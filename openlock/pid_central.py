@@ -1,5 +1,9 @@
 # TODO prepend terms _
 
+import numpy as np
+
+from openlock.common import wrapToMinusPiToPi
+
 
 class PIDController(object):
     def __init__(
@@ -74,3 +78,133 @@ class PIDController(object):
 
     def set_max_out(self, max_out):
         self.max_out = max_out
+
+
+class ArrayPIDController(object):
+    """
+    PIDController with the gains, setpoints and state held in NumPy arrays of shape
+    (..., num_joints), so one update covers every joint and, with leading batch dimensions, many
+    controllers. Updates give the same outputs as PIDController.
+
+    The integral and differential are only tracked if some ki, respectively kd, gain is nonzero.
+    State arrays are only ever written in place, so controllers created by stack keep sharing their
+    rows with the batch.
+    """
+
+    def __init__(
+        self, kp, ki, kd, setpoint, dt, max_out=None, max_int=500, err_wrap_func=None
+    ):
+        setpoint = np.asarray(setpoint, dtype=float)
+        shape = setpoint.shape
+        # gains and setpoint, then error, previous_error, integral and differential
+        self._gains = np.array(
+            [np.broadcast_to(k, shape) for k in (kp, ki, kd)] + [setpoint]
+        )
+        self._state = np.zeros((4,) + shape)
+        self._set_views()
+        self.dt = dt
+        self.max_out = max_out
+        self.max_int = max_int
+        self.err_wrap_func = err_wrap_func
+        self.steps = 0
+
+    def _set_views(self):
+        self.kp, self.ki, self.kd, self.setpoint = self._gains
+        self.error, self.previous_error, self.integral, self.differential = self._state
+        self._integrate = bool(self.ki.any())
+        self._differentiate = bool(self.kd.any())
+
+    @classmethod
+    def stack(cls, controllers):
+        """
+        Stack controllers with the same dt, max_out and err_wrap_func into a batch controller. The
+        gains and state of controller i become views of row i of the batch, so updating the batch
+        updates every controller.
+
+        :param controllers: ArrayPIDControllers with the same shape.
+        :return: Controller of shape (len(controllers), ...).
+        """
+        first = controllers[0]
+        for controller in controllers[1:]:
+            if (
+                controller.dt != first.dt
+                or controller.max_out != first.max_out
+                or controller.err_wrap_func is not first.err_wrap_func
+            ):
+                raise ValueError(
+                    "Stacked controllers must have the same dt, max_out and err_wrap_func"
+                )
+        batch = cls(
+            [c.kp for c in controllers],
+            [c.ki for c in controllers],
+            [c.kd for c in controllers],
+            [c.setpoint for c in controllers],
+            first.dt,
+            max_out=first.max_out,
+            max_int=first.max_int,
+            err_wrap_func=first.err_wrap_func,
+        )
+        for i, controller in enumerate(controllers):
+            batch._state[:, i] = controller._state
+            controller._gains = batch._gains[:, i]
+            controller._state = batch._state[:, i]
+            controller._set_views()
+        # a controller may only track terms that another one uses
+        batch._integrate = any(c._integrate for c in controllers)
+        batch._differentiate = any(c._differentiate for c in controllers)
+        for controller in controllers:
+            controller._integrate = batch._integrate
+            controller._differentiate = batch._differentiate
+        return batch
+
+    def update(self, current_value):
+        """
+        :param current_value: Current values, broadcastable to the setpoint shape.
+        :return: Controller outputs, a new array of the setpoint shape.
+        """
+        error = self.error
+        np.subtract(self.setpoint, current_value, out=error)
+        if self.err_wrap_func is wrapToMinusPiToPi:
+            # in place wrapToMinusPiToPi
+            error += np.pi
+            np.remainder(error, 2 * np.pi, out=error)
+            error -= np.pi
+        elif self.err_wrap_func:
+            error[...] = self.err_wrap_func(error)
+
+        out = self.kp * error
+        if self._integrate:
+            self.integral += error
+            self.integral *= self.dt
+            out += self.ki * self.integral
+        if self._differentiate:
+            np.subtract(error, self.previous_error, out=self.differential)
+            self.differential /= self.dt
+            out += self.kd * self.differential
+            self.previous_error[...] = error
+
+        # TODO(mjedmonds): incorporate dynamics?
+        if self.max_out:
+            np.minimum(out, self.max_out, out=out)
+            np.maximum(out, -self.max_out, out=out)
+
+        return out
+
+    def set_setpoint(self, setpoint):
+        self._state.fill(0)
+        self.setpoint[...] = setpoint
+
+    def get_state(self):
+        """
+        :return: copies of the gains and setpoint, and of the error, previous_error, integral and
+        differential
+        """
+        return self._gains.copy(), self._state.copy()
+
+    def set_state(self, state):
+        """
+        Restore gains, setpoint and state returned by get_state, in place.
+
+        :param state: (gains, state) as returned by get_state
+        """
+        self._gains[...], self._state[...] = state
@@ -92,7 +92,7 @@ class Viewer(object):
     def add_onetime(self, geom):
         self.onetime_geoms.append(geom)
 
-    def render(self, return_rgb_array=False):
+    def render(self, return_rgb_array=False, out=None):
         # call pre-render callbacks
         for callback in self.pre_render_callbacks:
             callback()
@@ -121,6 +121,9 @@ class Viewer(object):
             # than the requested one.
             arr = arr.reshape(buffer.height, buffer.width, 4)
             arr = arr[::-1, :, 0:3]
+            if out is not None:
+                out[...] = arr
+                arr = out
 
         self.window.flip()
         self.onetime_geoms = []
@@ -0,0 +1,264 @@
+"""
+Replays recorded action sequences through the state machine of their trial.
+
+A ReplayRecord holds the external action names of every attempt of one trial, and the seed the env
+was given with OpenLockEnv.seed before the trial. TrialReplayer drives the trial's Scenario or
+NoFsmScenario directly, drawing effect probabilities in the same order as OpenLockEnv.step, and
+recomputes the observation, reward and action success of every step for a reward mode, looking the
+rewards up in a RewardTable. Nothing is logged, so replaying a trial is much cheaper than stepping an
+env through it.
+
+replay_records replays many records in a pool of worker processes, each of which keeps one
+TrialReplayer per trial.
+"""
+import multiprocessing
+import os
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from openlock.envs.openlock_env import OpenLockEnv
+from openlock.rewards import RewardContext, RewardTable
+from openlock.settings_trial import ACTION_LIMIT, ATTEMPT_LIMIT
+
+
+class ReplayRecord(NamedTuple):
+    scenario_name: str
+    trial_name: str
+    # external action names of every attempt
+    attempts: Tuple[Tuple[str, ...], ...]
+    # seed of the env before the trial, see OpenLockEnv.seed. None continues the previous draws
+    seed: Optional[int] = None
+    action_limit: int = ACTION_LIMIT
+    attempt_limit: int = ATTEMPT_LIMIT
+
+    @classmethod
+    def from_trial_log(
+        cls,
+        trial: Any,
+        seed: Optional[int] = None,
+        action_limit: int = ACTION_LIMIT,
+        attempt_limit: int = ATTEMPT_LIMIT,
+    ) -> "ReplayRecord":
+        """
+        :param trial: a finished TrialLog, or a TrialLogView of a trial log file
+        :param seed: seed of the trial, trial.random_seed if None
+        :return: record of the finished attempts of trial
+        """
+        return cls(
+            trial.scenario_name,
+            str(trial.name),
+            tuple(
+                tuple(str(action) for action in attempt.action_seq)
+                for attempt in trial.attempt_seq
+            ),
+            trial.random_seed if seed is None else seed,
+            action_limit,
+            attempt_limit,
+        )
+
+
+class ReplayResult(NamedTuple):
+    # observation after every action, shape (number of actions, observation size)
+    observations: np.ndarray
+    rewards: np.ndarray
+    action_success: np.ndarray
+    # the actions of attempt i are attempt_offsets[i]:attempt_offsets[i + 1]
+    attempt_offsets: np.ndarray
+    # whether each attempt completed a solution not completed before, as in TrialLog.finish_attempt
+    attempt_success: np.ndarray
+
+
+class TrialReplayer(object):
+    def __init__(self, scenario_name: str, trial_name: Optional[str]):
+        """
+        Sets up the trial in an FSM-only env, whose scenario, action maps and observation space the
+        replays use.
+
+        :param scenario_name: name of the scenario
+        :param trial_name: name of the trial. If None, a random trial is selected, as in setup_trial
+        """
+        self.scenario_name = scenario_name
+
+        self.env = OpenLockEnv()
+        self.env.use_physics = False
+        self.env.initialize_for_scenario(scenario_name)
+        self.trial_name = self.env.setup_trial(
+            scenario_name=scenario_name,
+            action_limit=ACTION_LIMIT,
+            attempt_limit=ATTEMPT_LIMIT,
+            specified_trial=trial_name,
+            multiproc=True,
+        )
+        self.env.reset()
+        self.scenario = self.env.scenario
+        self.action_space: List[str] = list(self.env.action_space)
+        self.state_labels: List[str] = list(self.env.get_discrete_state()[1])
+        # external action name -> role action, which the scenario executes as in OpenLockEnv.step
+        self._actions = {
+            action_name: self.env.action_map_external_role[action_name]
+            for action_name in self.action_space
+        }
+        # (reward mode, action limit, attempt limit) -> reward table of the trial
+        self._reward_tables: Dict[Tuple[str, int, int], RewardTable] = dict()
+
+    def get_reward_table(
+        self, reward_mode: str, action_limit: int, attempt_limit: int
+    ) -> RewardTable:
+        """
+        :return: the reward table of the trial, compiled on first use
+        """
+        key = (reward_mode, action_limit, attempt_limit)
+        if key not in self._reward_tables:
+            self._reward_tables[key] = RewardTable(
+                reward_mode,
+                self.env.cur_trial.solution_automaton,
+                self.action_space,
+                action_limit,
+                attempt_limit,
+            )
+        return self._reward_tables[key]
+
+    def replay(self, record: ReplayRecord, reward_mode: str = "basic") -> ReplayResult:
+        """
+        Replays every attempt of a record, reseeding the replayer's env with its seed.
+
+        :param record: record of this replayer's trial
+        :param reward_mode: reward mode of the rewards, see RewardStrategy
+        :return: the observations, rewards and successes of the record's actions
+        """
+        if (record.scenario_name, record.trial_name) != (
+            self.scenario_name,
+            self.trial_name,
+        ):
+            raise ValueError(
+                f"Record of {record.scenario_name}/{record.trial_name} replayed on "
+                f"{self.scenario_name}/{self.trial_name}"
+            )
+        attempt_offsets = np.zeros(len(record.attempts) + 1, dtype=np.int64)
+        np.cumsum(
+            [len(attempt) for attempt in record.attempts], out=attempt_offsets[1:]
+        )
+        num_actions = int(attempt_offsets[-1])
+        observations = np.empty((num_actions, len(self.state_labels)), dtype=np.int8)
+        rewards = np.empty(num_actions, dtype=float)
+        action_success = np.empty(num_actions, dtype=bool)
+        attempt_success = np.empty(len(record.attempts), dtype=bool)
+
+        env = self.env
+        scenario = self.scenario
+        observation_space = env.observation_space
+        reward_table = self.get_reward_table(
+            reward_mode, record.action_limit, record.attempt_limit
+        )
+        context = RewardContext(
+            env.cur_trial.solution_automaton, env.get_solutions(), record.attempt_limit,
+        )
+        if record.seed is not None:
+            env.seed(record.seed)
+        random_blocks = env.random_blocks
+
+        i = 0
+        for attempt_idx, attempt in enumerate(record.attempts):
+            if len(attempt) > record.action_limit:
+                raise ValueError(
+                    f"Attempt {attempt_idx} has {len(attempt)} actions, more than the action "
+                    f"limit of {record.action_limit}"
+                )
+            scenario.reset()
+            context.start_attempt(scenario.get_obj_state())
+            for action_name in attempt:
+                if action_name not in self._actions:
+                    raise ValueError(
+                        f"Action {action_name} not in the action space of "
+                        f"{self.scenario_name}/{self.trial_name}"
+                    )
+                action_role = self._actions[action_name]
+                # same draw as OpenLockEnv.execute_action, before any draw of the scenario
+                failure_probability = random_blocks.sample()
+                success = not failure_probability > env.get_effect_probability(
+                    action_role.obj
+                )
+                if success:
+                    scenario.execute_fsm_action(action_role)
+                action_success[i] = success
+                prev_obj_state = context.cur_state["OBJ_STATES"]
+                context.take_action(action_name, scenario.get_obj_state())
+                observation_space.create_discrete_observation_from_fsm(
+                    env, out=observations[i]
+                )
+                state = reward_table.state_features(
+                    prev_obj_state,
+                    context.cur_state["OBJ_STATES"],
+                    reward_table.reads_repeated_action
+                    and context.determine_repeated_action(),
+                )
+                rewards[i] = reward_table.reward(
+                    context.solution_matches,
+                    context.num_actions,
+                    context.completed_solutions_mask,
+                    state,
+                    action_name,
+                )
+                i += 1
+            attempt_success[attempt_idx] = context.finish_attempt()
+
+        return ReplayResult(
+            observations, rewards, action_success, attempt_offsets, attempt_success
+        )
+
+
+def _get_replayer(
+    replayers: Dict[Tuple[str, str], TrialReplayer], record: ReplayRecord
+) -> TrialReplayer:
+    key = (record.scenario_name, record.trial_name)
+    if key not in replayers:
+        replayers[key] = TrialReplayer(record.scenario_name, record.trial_name)
+    return replayers[key]
+
+
+# set in each worker by _init_worker
+_worker_state: Dict[str, Any] = dict()
+
+
+def _init_worker(reward_mode: str) -> None:
+    _worker_state.update(reward_mode=reward_mode, replayers=dict())
+
+
+def _worker(record: ReplayRecord) -> ReplayResult:
+    replayer = _get_replayer(_worker_state["replayers"], record)
+    return replayer.replay(record, _worker_state["reward_mode"])
+
+
+def replay_records(
+    records: Iterable[ReplayRecord],
+    reward_mode: str = "basic",
+    num_workers: int = os.cpu_count() or 1,
+    chunksize: int = 16,
+    start_method: Optional[str] = None,
+) -> List[ReplayResult]:
+    """
+    Replays records in a pool of worker processes.
+
+    :param records: records to replay. Records without a seed are not reproducible
+    :param reward_mode: reward mode of the rewards, see RewardStrategy
+    :param num_workers: number of worker processes. If 0, records are replayed in this process
+    :param chunksize: number of records sent to a worker at once
+    :param start_method: multiprocessing start method, the platform default if None
+    :return: the result of every record, in the order of records
+    """
+    records = list(records)
+    if num_workers == 0 or not records:
+        replayers: Dict[Tuple[str, str], TrialReplayer] = dict()
+        return [
+            _get_replayer(replayers, record).replay(record, reward_mode)
+            for record in records
+        ]
+
+    ctx = multiprocessing.get_context(start_method)
+    with ctx.Pool(
+        min(num_workers, len(records)),
+        initializer=_init_worker,
+        initargs=(reward_mode,),
+    ) as pool:
+        return pool.map(_worker, records, chunksize=chunksize)
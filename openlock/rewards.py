@@ -1,7 +1,127 @@
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
 import numpy as np
 from typing_extensions import Final
 
 from openlock.common import ENTITY_STATES
+from openlock.solution_automaton import SolutionAutomaton
+
+# reward modes that depend on whether the last two actions of the attempt are the same
+REPEATED_ACTION_REWARD_MODES = {"negative_immovable_negative_repeat"}
+
+# bits of the object state features the rewards read, see RewardTable
+STATE_DOOR_UNLOCKED = 1
+STATE_FLUENT_CHANGE = 2
+STATE_REPEATED_ACTION = 4
+NUM_STATE_FEATURES = 8
+
+
+class RewardContext(object):
+    """
+    Stands in for OpenLockEnv in RewardStrategy, without any logging. Holds what the reward
+    functions read: the object states before and after the action, the solutions the actions of
+    the attempt match, the completed solutions and the last two actions of the attempt.
+    """
+
+    def __init__(
+        self,
+        automaton: SolutionAutomaton,
+        solutions: Sequence[Sequence],
+        attempt_limit: int,
+    ):
+        """
+        :param automaton: solution automaton of the trial
+        :param solutions: solutions of the trial, in the order of the automaton
+        :param attempt_limit: number of attempts of the trial
+        """
+        self.automaton = automaton
+        self.solutions = solutions
+        self.attempt_limit = attempt_limit
+        # bitset of the completed solutions
+        self.completed_solutions_mask = 0
+        self.solution_matches = automaton.start()
+        self.num_actions = 0
+        # the last two action names of the attempt, the most recent last
+        self.last_actions: Tuple[Optional[str], Optional[str]] = (None, None)
+        self.prev_state: Optional[Dict] = None
+        self.cur_state: Optional[Dict] = None
+
+    def start_attempt(self, obj_state: Dict[str, np.int8]) -> None:
+        self.solution_matches = self.automaton.start()
+        self.num_actions = 0
+        self.last_actions = (None, None)
+        self.cur_state = {"OBJ_STATES": obj_state}
+
+    def take_action(self, action_name: str, obj_state: Dict[str, np.int8]) -> None:
+        self.solution_matches = self.automaton.advance(
+            self.solution_matches, self.num_actions, action_name
+        )
+        self.num_actions += 1
+        self.last_actions = (self.last_actions[1], action_name)
+        self.prev_state = self.cur_state
+        self.cur_state = {"OBJ_STATES": obj_state}
+
+    def finish_attempt(self) -> bool:
+        """
+        Completes the first solution the attempt matches, as TrialLog.finish_attempt.
+
+        :return: whether the attempt completed a solution not completed before
+        """
+        if (
+            self.solution_matches
+            and not self.solution_matches & self.completed_solutions_mask
+        ):
+            solution_idx = SolutionAutomaton.first(self.solution_matches)
+            self.completed_solutions_mask |= 1 << solution_idx
+            return True
+        return False
+
+    # the OpenLockEnv interface used by RewardStrategy
+
+    def get_state(self) -> Dict[str, Dict[str, np.int8]]:
+        return self.cur_state
+
+    def get_completed_solutions(self) -> List[Sequence]:
+        # in the order of the solutions rather than the order they were completed in, which only
+        # the cooling counter of determine_multiplier depends on
+        return [
+            self.solutions[i]
+            for i in SolutionAutomaton.indices(self.completed_solutions_mask)
+        ]
+
+    def get_solutions(self) -> Sequence[Sequence]:
+        return self.solutions
+
+    def get_solution_index(self, action_seq: Optional[Sequence] = None) -> int:
+        if action_seq is None:
+            solution_matches = self.solution_matches
+        else:
+            solution_matches = self.automaton.run(action_seq)
+        return SolutionAutomaton.first(solution_matches)
+
+    def determine_unique_solution(self) -> bool:
+        solutions = self.automaton.complete(self.solution_matches, self.num_actions)
+        return bool(solutions) and not solutions & self.completed_solutions_mask
+
+    def determine_partial_solution(self) -> bool:
+        return bool(self.automaton.partial(self.solution_matches, self.num_actions))
+
+    def determine_unique_partial_solution(self) -> bool:
+        partial = self.automaton.partial(self.solution_matches, self.num_actions)
+        if partial & self.completed_solutions_mask:
+            return False
+        return bool(partial)
+
+    def determine_fluent_change(self) -> bool:
+        return self.prev_state["OBJ_STATES"] != self.cur_state["OBJ_STATES"]
+
+    def determine_repeated_action(self) -> bool:
+        return self.num_actions >= 2 and self.last_actions[0] == self.last_actions[1]
+
+    def determine_door_seq(self) -> int:
+        if self.num_actions == 3:
+            return 1 if self.last_actions[1] == "push_door" else -1
+        return 0
 
 
 class RewardStrategy(object):
@@ -19,32 +139,20 @@ class RewardStrategy(object):
         self.attempt_count = 0
 
     def determine_multiplier(self, env, action):
-        def get_solution_index(solutions, action_seq):
-            # get the index of cur_action_seq in solutions, if none, return -1
-            for ind in range(len(solutions)):
-                comparison = [
-                    solutions[ind][i] == action_seq[i]
-                    for i in range(min(len(solutions[ind]), len(action_seq)))
-                ]
-                if all(comparison):
-                    return ind
-            return -1
-
         self.solution_multiplier = 1.0
 
         completed_solutions = env.get_completed_solutions()
-        solutions = env.get_solutions()
-        cur_action_seq = env.get_current_action_seq()
 
         num_solutions_found = len(completed_solutions)
         unique_seq = (
             env.determine_unique_solution() or env.determine_unique_partial_solution()
         )
-        index = get_solution_index(solutions, cur_action_seq)
+        # get the index of cur_action_seq in solutions, if none, -1
+        index = env.get_solution_index()
         first_solution_index = -1
 
         if num_solutions_found != 0:
-            first_solution_index = get_solution_index(solutions, completed_solutions[0])
+            first_solution_index = env.get_solution_index(completed_solutions[0])
 
         if (
             unique_seq
@@ -120,7 +228,7 @@ class RewardStrategy(object):
         return reward, door_open
 
     def door_open(self, env, action):
-        if self.door_unlocked(env) and action.name is "push" and action.obj is "door":
+        if self.door_unlocked(env) and action.name == "push" and action.obj == "door":
             return True
         else:
             return False
@@ -455,3 +563,186 @@ class RewardStrategy(object):
             # determine if the door_seq is right
             reward += env.determine_door_seq() * self.REWARD_DOOR_SEQ
         return reward
+
+
+class _TableAction(NamedTuple):
+    # the parts of an action the reward functions read
+    name: str
+    obj: str
+    action_name: str
+
+    def __str__(self) -> str:
+        return self.action_name
+
+
+class _TableContext(RewardContext):
+    """
+    RewardContext whose object states are given by the features of RewardTable.
+    """
+
+    def __init__(self, automaton: SolutionAutomaton, attempt_limit: int):
+        super().__init__(automaton, automaton.solutions, attempt_limit)
+        self.state = 0
+
+    def get_state(self) -> Dict[str, Dict[str, np.int8]]:
+        if self.state & STATE_DOOR_UNLOCKED:
+            door_lock = ENTITY_STATES["DOOR_UNLOCKED"]
+        else:
+            door_lock = ENTITY_STATES["DOOR_LOCKED"]
+        return {"OBJ_STATES": {"door_lock": door_lock}}
+
+    def determine_fluent_change(self) -> bool:
+        return bool(self.state & STATE_FLUENT_CHANGE)
+
+    def determine_repeated_action(self) -> bool:
+        return bool(self.state & STATE_REPEATED_ACTION)
+
+
+class RewardTable(object):
+    """
+    The rewards of one reward mode of RewardStrategy for every step of a trial, compiled into a
+    table indexed by (solution progress, completed solutions, object state features, action).
+
+    The reward functions only read the attempt through the solutions it is a prefix of and its
+    length, which are the solution progress, and the object states through whether the door is
+    unlocked after the action, whether the action changed an object state and whether it repeated
+    the previous action, which are the bits of the state features.
+    """
+
+    def __init__(
+        self,
+        reward_mode: str,
+        automaton: SolutionAutomaton,
+        action_space: Sequence[str],
+        action_limit: int,
+        attempt_limit: int,
+    ):
+        """
+        :param reward_mode: reward mode, see RewardStrategy.determine_reward
+        :param automaton: solution automaton of the trial
+        :param action_space: external action names, in the order of the action axis
+        :param action_limit: number of actions per attempt
+        :param attempt_limit: number of attempts of the trial
+        """
+        self.reward_mode = reward_mode
+        self.automaton = automaton
+        self.action_limit = action_limit
+        self.attempt_limit = attempt_limit
+        self.action_index: Dict[str, int] = {
+            action_name: i for i, action_name in enumerate(action_space)
+        }
+        self.reads_repeated_action = reward_mode in REPEATED_ACTION_REWARD_MODES
+
+        # (attempt length, solutions the attempt is a prefix of) -> progress index
+        self.progress_index: Dict[Tuple[int, int], int] = dict()
+        matches = {automaton.start()}
+        for length in range(1, action_limit + 1):
+            matches = {
+                automaton.advance(solution_matches, length - 1, action_name)
+                for solution_matches in matches
+                for action_name in action_space
+            }
+            for solution_matches in sorted(matches):
+                key = (length, automaton.partial(solution_matches, length))
+                self.progress_index.setdefault(key, len(self.progress_index))
+
+        self.rewards = np.empty(
+            (
+                len(self.progress_index),
+                1 << automaton.num_solutions,
+                NUM_STATE_FEATURES,
+                len(action_space),
+            )
+        )
+        # the reward functions only tell pushing the door from the other actions, so the rewards
+        # of one other action are copied to the rest
+        other_actions = [name for name in self.action_index if name != "push_door"]
+        compiled_actions = other_actions[:1]
+        if "push_door" in self.action_index:
+            compiled_actions.append("push_door")
+        for action_name in compiled_actions:
+            self.rewards[..., self.action_index[action_name]] = self._compile_action(
+                action_name
+            )
+        for action_name in other_actions[1:]:
+            self.rewards[..., self.action_index[action_name]] = self.rewards[
+                ..., self.action_index[other_actions[0]]
+            ]
+
+    def _compile_action(self, action_name: str) -> np.ndarray:
+        """
+        :return: rewards of an action, shape (progress, completed solutions, state features)
+        """
+        name, obj = action_name.split("_", 1)
+        action = _TableAction(name, obj, action_name)
+        rewards = np.empty(self.rewards.shape[:-1])
+        reward_strategy = RewardStrategy()
+        context = _TableContext(self.automaton, self.attempt_limit)
+        context.last_actions = (None, action_name)
+        for (length, partial), progress in self.progress_index.items():
+            # a sequence of this length matches the solutions it is a prefix of
+            context.solution_matches = partial
+            context.num_actions = length
+            for completed in range(rewards.shape[1]):
+                context.completed_solutions_mask = completed
+                for state in range(NUM_STATE_FEATURES):
+                    context.state = state
+                    reward, _ = reward_strategy.determine_reward(
+                        context, action, self.reward_mode
+                    )
+                    rewards[progress, completed, state] = reward
+        return rewards
+
+    def progress(self, solution_matches: int, num_actions: int) -> int:
+        """
+        :param solution_matches: solutions the actions of the attempt match, see SolutionAutomaton
+        :param num_actions: number of actions of the attempt, at least 1
+        :return: solution progress index of the attempt
+        """
+        return self.progress_index[
+            (num_actions, self.automaton.partial(solution_matches, num_actions))
+        ]
+
+    @staticmethod
+    def state_features(
+        prev_obj_state: Dict[str, np.int8],
+        cur_obj_state: Dict[str, np.int8],
+        repeated_action: bool = False,
+    ) -> int:
+        """
+        :param prev_obj_state: object states before the action
+        :param cur_obj_state: object states after the action
+        :param repeated_action: whether the action is the same as the previous one of the attempt
+        :return: state features index
+        """
+        state = 0
+        if cur_obj_state["door_lock"] == ENTITY_STATES["DOOR_UNLOCKED"]:
+            state |= STATE_DOOR_UNLOCKED
+        if prev_obj_state != cur_obj_state:
+            state |= STATE_FLUENT_CHANGE
+        if repeated_action:
+            state |= STATE_REPEATED_ACTION
+        return state
+
+    def reward(
+        self,
+        solution_matches: int,
+        num_actions: int,
+        completed_solutions_mask: int,
+        state: int,
+        action_name: str,
+    ) -> float:
+        """
+        :param solution_matches: solutions the actions of the attempt match, including this action
+        :param num_actions: number of actions of the attempt, including this action
+        :param completed_solutions_mask: bitset of the completed solutions
+        :param state: state features index, see state_features
+        :param action_name: external action name
+        :return: reward of the action
+        """
+        return self.rewards[
+            self.progress(solution_matches, num_actions),
+            completed_solutions_mask,
+            state,
+            self.action_index[action_name],
+        ]
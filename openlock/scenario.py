@@ -5,7 +5,16 @@ from __future__ import annotations
 
 import logging
 import re
-from typing import Dict, List, Optional, Sequence, Tuple, Union
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 import numpy as np
 
@@ -20,13 +29,28 @@ from openlock.common import (
     LeverConfig,
     ObjectPositionEnum,
 )
-from openlock.envs.world_defs.openlock_def import ArmLockDef
 from openlock.finite_state_machine import FiniteStateMachineManager
 
+if TYPE_CHECKING:
+    from openlock.envs.world_defs.openlock_def import ArmLockDef
+
+# FSM variable values to the entity states reported by Scenario.get_obj_state
+FSM_LEVER_STATES = {
+    "pulled,": np.int8(common.ENTITY_STATES["LEVER_PULLED"]),
+    "pushed,": np.int8(common.ENTITY_STATES["LEVER_PUSHED"]),
+}
+FSM_DOOR_LOCK_STATES = {
+    "locked,": np.int8(common.ENTITY_STATES["DOOR_LOCKED"]),
+    "unlocked,": np.int8(common.ENTITY_STATES["DOOR_UNLOCKED"]),
+}
+
 
 class ScenarioInterface:
     levers: List[Lever]
     obj_map: Dict
+    # effect probability draws of scenarios that draw their own, set by the env to its draws.
+    # Without one, the global NumPy RNG is used
+    random_blocks: Optional[common.UniformBlocks] = None
 
     def set_lever_configs(self, lever_configs: Sequence[LeverConfig]) -> None:
         """ Populates the levers list from a lever_configs object. """
@@ -44,6 +68,10 @@ class ScenarioInterface:
         """ Returns dictionary containing object and internal states. """
         raise NotImplementedError()
 
+    def get_obj_state(self) -> Dict[str, np.int8]:
+        """ Returns dictionary of lever/door to state. Same as get_state()["OBJ_STATES"]. """
+        raise NotImplementedError()
+
     def reset(self) -> None:
         raise NotImplementedError
 
@@ -54,6 +82,14 @@ class ScenarioInterface:
         """ Executes an action. Name for legacy reasons, even if there isn't an fsm anymore. """
         raise NotImplementedError
 
+    def snapshot(self) -> Hashable:
+        """ Returns a hashable copy of the state actions change, for restore. """
+        raise NotImplementedError
+
+    def restore(self, snapshot: Hashable) -> None:
+        """ Returns to the state of a snapshot. """
+        raise NotImplementedError
+
 
 class NoFsmScenario(ScenarioInterface):
     # TODO(joschnei): It might be better to have one internal object representation
@@ -184,22 +220,44 @@ class NoFsmScenario(ScenarioInterface):
         push = action.name == "push"
 
         if not self._locked[target] and self._pushed[target] != push:
-            fail_prob = (
-                self._effect_probabilities[target]
-                if target in self._effect_probabilities.keys()
-                else self._active_effect_probability
-            )
-            if np.random.random() <= fail_prob:
+            fail_prob = self.get_effect_probability(target)
+            if self.random_blocks is not None:
+                draw = self.random_blocks.sample()
+            else:
+                draw = np.random.random()
+            if draw <= fail_prob:
                 self._pushed[target] = not self._pushed[target]
 
                 if target in self._UNLOCKS.keys():
                     self._add_timers(self._UNLOCKS[target])
 
+    def get_effect_probability(self, target: str) -> float:
+        """ Returns the probability that moving an unlocked target has an effect. """
+        if target in self._effect_probabilities.keys():
+            return self._effect_probabilities[target]
+        return self._active_effect_probability
+
+    def snapshot(self) -> Hashable:
+        return (
+            tuple(sorted(self._locked.items())),
+            tuple(sorted(self._pushed.items())),
+            tuple(sorted(self._timers.items())),
+        )
+
+    def restore(self, snapshot: Hashable) -> None:
+        locked, pushed, timers = snapshot
+        self._locked = dict(locked)
+        self._pushed = dict(pushed)
+        self._timers = dict(timers)
+
     def update_state_machine(self, action: Optional[str] = None) -> None:
         """Does nothing, as we don't use physics"""
         pass
 
     def get_state(self) -> Dict[str, Dict[str, Union[str, np.int8]]]:
+        return {"OBJ_STATES": self.get_obj_state()}
+
+    def get_obj_state(self) -> Dict[str, np.int8]:
         # For backwards compatibility, the observable state is
         # The lever pushed/pulled decisions
         # Door open/closed
@@ -213,7 +271,7 @@ class NoFsmScenario(ScenarioInterface):
         obj_states["door"] = 1 - obj_states["door"]
         obj_states["door_lock"] = np.int8(self._locked["door"])
 
-        return {"OBJ_STATES": obj_states}
+        return obj_states
 
 
 class Scenario(ScenarioInterface):
@@ -236,6 +294,23 @@ class Scenario(ScenarioInterface):
         self.world_def: Optional[ArmLockDef] = None
         self.door_state = common.ENTITY_STATES["DOOR_CLOSED"]
         self.obj_map = dict()
+        # (lever name, observable FSM variable) pairs, the variable is None for inactive levers
+        self._lever_fsm_vars: List[Tuple[str, Optional[str]]] = []
+
+    @property
+    def door_unlock_criteria(self) -> List[str]:
+        """
+        Observable states in which the door is unlocked. Assigning the criteria also encodes them
+        as a bitset over observable state codes, so they must be reassigned rather than mutated.
+        """
+        return self._door_unlock_criteria
+
+    @door_unlock_criteria.setter
+    def door_unlock_criteria(self, door_unlock_criteria: List[str]) -> None:
+        self._door_unlock_criteria = door_unlock_criteria
+        self._door_unlock_bitset = self.fsmm.observable_fsm.states_to_bitset(
+            door_unlock_criteria
+        )
 
     def set_lever_configs(self, lever_configs: Sequence[LeverConfig]) -> None:
         """
@@ -264,6 +339,16 @@ class Scenario(ScenarioInterface):
             lever = common.Lever(role, position, color, opt_params, effect_probability)
             self.levers.append(lever)
 
+        self._lever_fsm_vars = [
+            (
+                lever.name,
+                None
+                if re.search(common.INACTIVE_LOCK_REGEX_STR, lever.name)
+                else lever.name + ":",
+            )
+            for lever in self.levers
+        ]
+
     def add_no_ops(
         self, lock: str, pushed: Sequence[str], pulled: Sequence[str]
     ) -> None:
@@ -360,22 +445,19 @@ class Scenario(ScenarioInterface):
 
         :return: Nothing
         """
-        observable_state = self.fsmm.observable_fsm.state
+        observable_code = self.fsmm.observable_fsm.code
         # TODO(joschnei): The first loop locks all doors, including doors which have already been
         # locked. Attempting to lock a locked door does nothing, so this should be fine. But then
         # why do we check explicitly for if the door is locked when we unlock the door, as the same
         # is true?
-        if observable_state in self.door_unlock_criteria:
+        if (self._door_unlock_bitset >> observable_code) & 1:
             # TODO(mjedmonds): currently this will unlock all doors, need to make it so each door has it's own connection to observable state
             for door in self.LATENT_VARS:
                 self.fsmm.latent_fsm.trigger(f"unlock_{door}")
         else:
             # TODO(mjedmonds): currently this will lock all doors, need to make it so each door has it's own connection to observable state
             for door in self.LATENT_VARS:
-                if (
-                    self.fsmm.extract_entity_state(self.fsmm.latent_fsm.state, door)
-                    != "locked,"
-                ):
+                if not self.fsmm.latent_fsm.var_is(door, "locked,"):
                     self.fsmm.latent_fsm.trigger(f"lock_{door}")
 
     def reset(self) -> None:
@@ -395,26 +477,21 @@ class Scenario(ScenarioInterface):
         """
         state = dict()
 
-        fsm_observable_states = self.fsmm.get_observable_states()
-        fsm_latent_states = self.fsmm.get_latent_states()
+        observable_fsm = self.fsmm.observable_fsm
+        observable_code = observable_fsm.code
 
         # lever states
-        for lever in self.levers:
+        for lever_name, fsm_var in self._lever_fsm_vars:
             # inactive lever, state is constant
-            if re.search(common.INACTIVE_LOCK_REGEX_STR, lever.name):
-                lever_state = np.int8(common.ENTITY_STATES["LEVER_PULLED"])
+            if fsm_var is None:
+                state[lever_name] = FSM_LEVER_STATES["pulled,"]
             else:
-                fsm_name = lever.name + ":"
-                lever_state = fsm_observable_states[fsm_name]
-                lever_state = lever_state[: len(lever_state) - 1].upper()
-                lever_state = np.int8(common.ENTITY_STATES["LEVER_" + lever_state])
-
-            state[lever.name] = lever_state
+                state[lever_name] = FSM_LEVER_STATES[
+                    observable_fsm.get_value(fsm_var, observable_code)
+                ]
 
         # update door state
-        door_lock_state = fsm_latent_states["door:"]
-        door_lock_state = door_lock_state[: len(door_lock_state) - 1].upper()
-        door_lock_state = np.int8(common.ENTITY_STATES["DOOR_" + door_lock_state])
+        door_lock_state = FSM_DOOR_LOCK_STATES[self.fsmm.latent_fsm.get_value("door:")]
 
         # TODO(mjedmonds): this is a hack to get whether or not the door is actually open; it should be part of the FSM
         door_state = np.int8(self.door_state)
@@ -424,6 +501,19 @@ class Scenario(ScenarioInterface):
 
         return state
 
+    def snapshot(self) -> Hashable:
+        return (
+            self.fsmm.observable_fsm.code,
+            self.fsmm.latent_fsm.code,
+            self.door_state,
+        )
+
+    def restore(self, snapshot: Hashable) -> None:
+        observable_code, latent_code, self.door_state = snapshot
+        observable_fsm, latent_fsm = self.fsmm.observable_fsm, self.fsmm.latent_fsm
+        observable_fsm.machine.set_state(observable_fsm.decode(observable_code))
+        latent_fsm.machine.set_state(latent_fsm.decode(latent_code))
+
     def get_state(self) -> Dict[str, Dict[str, Union[str, np.int8]]]:
         """
         Get state of levers and door, and the fsm state.
@@ -465,7 +555,7 @@ class Scenario(ScenarioInterface):
                         self.execute_push(fsm_name)
                     else:
                         self.execute_pull(fsm_name)
-            if action is not None and action.name is "push" and action.obj == "door":
+            if action is not None and action.name == "push" and action.obj == "door":
                 self.push_door()
 
     def execute_fsm_action(self, action: Action) -> None:
@@ -496,9 +586,10 @@ class Scenario(ScenarioInterface):
         :param obj_name: object to push
         :return: Nothing
         """
-        if (
-            self.fsmm.extract_entity_state(self.fsmm.observable_fsm.state, obj_name)
-            != "pushed,"
+        observable_fsm = self.fsmm.observable_fsm
+        # objects outside of the observable FSM (i.e. the door) are handled by fsmm.execute_action
+        if obj_name not in observable_fsm.var_shift or not observable_fsm.var_is(
+            obj_name, "pushed,"
         ):
             # push lever
             action = "push_{}".format(obj_name)
@@ -511,9 +602,10 @@ class Scenario(ScenarioInterface):
         :param obj_name: object to pull
         :return: Nothing
         """
-        if (
-            self.fsmm.extract_entity_state(self.fsmm.observable_fsm.state, obj_name)
-            != "pulled,"
+        observable_fsm = self.fsmm.observable_fsm
+        # objects outside of the observable FSM (i.e. the door) are handled by fsmm.execute_action
+        if obj_name not in observable_fsm.var_shift or not observable_fsm.var_is(
+            obj_name, "pulled,"
         ):
             # push lever
             action = "pull_{}".format(obj_name)
@@ -531,10 +623,7 @@ class Scenario(ScenarioInterface):
 
         :return: Nothing
         """
-        if (
-            self.fsmm.extract_entity_state(self.fsmm.latent_fsm.state, "door:")
-            == "unlocked,"
-        ):
+        if self.fsmm.latent_fsm.var_is("door:", "unlocked,"):
             self.door_state = common.ENTITY_STATES["DOOR_OPENED"]
             self.update_latent()
 
@@ -1,11 +1,15 @@
-from typing import List, Optional
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, List, Optional
 
-from openlock.envs.world_defs.openlock_def import ArmLockDef
 from openlock.finite_state_machine import FiniteStateMachineManager
 from openlock.logger_env import ActionLog
 from openlock.scenario import Scenario
 from typing_extensions import Final
 
+if TYPE_CHECKING:
+    from openlock.envs.world_defs.openlock_def import ArmLockDef
+
 
 class CommonCause3Scenario(Scenario):
 
@@ -183,13 +187,13 @@ class CommonCause3Scenario(Scenario):
             # ---------------------------------------------------------------
             if observable_var == "l2:":
                 # l2 unlocks if l0 is pushed
-                if "l0:pushed," in self.fsmm.observable_fsm.state:
+                if self.fsmm.observable_fsm.var_is("l0:", "pushed,"):
                     self.obj_map["l2"].unlock()
                 else:
                     self.obj_map["l2"].lock()
             if observable_var == "l1:":
                 # l1 unlocks if l0 is pushed
-                if "l0:pushed," in self.fsmm.observable_fsm.state:
+                if self.fsmm.observable_fsm.var_is("l0:", "pushed,"):
                     self.obj_map["l1"].unlock()
                 else:
                     self.obj_map["l1"].lock()
@@ -1,10 +1,14 @@
-from typing import Optional
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Optional
 
-from openlock.envs.world_defs.openlock_def import ArmLockDef
 from openlock.finite_state_machine import FiniteStateMachineManager
 from openlock.logger_env import ActionLog
 from openlock.scenario import Scenario
 
+if TYPE_CHECKING:
+    from openlock.envs.world_defs.openlock_def import ArmLockDef
+
 
 class CommonEffect4Scenario(Scenario):
 
@@ -176,9 +180,9 @@ class CommonEffect4Scenario(Scenario):
             if observable_var == "l0:":
                 # unlock l0 based on status of l1, l3, l3 part of multi-lock FSM
                 if (
-                    "l1:pushed," in self.fsmm.observable_fsm.state
-                    or "l2:pushed," in self.fsmm.observable_fsm.state
-                    or "l3:pushed," in self.fsmm.observable_fsm.state
+                    self.fsmm.observable_fsm.var_is("l1:", "pushed,")
+                    or self.fsmm.observable_fsm.var_is("l2:", "pushed,")
+                    or self.fsmm.observable_fsm.var_is("l3:", "pushed,")
                 ):
                     self.obj_map["l0"].unlock()
                 else:
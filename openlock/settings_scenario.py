@@ -1,46 +1,66 @@
+import importlib
 from random import randint
+from typing import Dict, NamedTuple
 
-from openlock.scenarios.CC3 import CommonCause3Scenario
-from openlock.scenarios.CC3D import CommonCause3DelayScenario
-from openlock.scenarios.CC4 import CommonCause4Scenario
-from openlock.scenarios.CC4D import CommonCause4DelayScenario
-from openlock.scenarios.CE3 import CommonEffect3Scenario
-from openlock.scenarios.CE3D import CommonEffect3DelayScenario
-from openlock.scenarios.CE4 import CommonEffect4Scenario
-from openlock.scenarios.CE4D import CommonEffect4DelayScenario
-from openlock.scenarios.multi_lock import MultiLockScenario
-from openlock.scenarios.two_step_testing_scenario import TwoStepTestingScenario
+# scenario modules are imported the first time their scenario is selected
 
+
+class ScenarioEntry(NamedTuple):
+    module: str
+    class_name: str
+    # whether the scenario constructor takes use_physics
+    physics: bool
+
+
+SCENARIOS: Dict[str, ScenarioEntry] = {
+    "CE3": ScenarioEntry("openlock.scenarios.CE3", "CommonEffect3Scenario", True),
+    "CC3": ScenarioEntry("openlock.scenarios.CC3", "CommonCause3Scenario", True),
+    "CC3D": ScenarioEntry(
+        "openlock.scenarios.CC3D", "CommonCause3DelayScenario", False
+    ),
+    "CC4D": ScenarioEntry(
+        "openlock.scenarios.CC4D", "CommonCause4DelayScenario", False
+    ),
+    "CE3D": ScenarioEntry(
+        "openlock.scenarios.CE3D", "CommonEffect3DelayScenario", False
+    ),
+    "CE4D": ScenarioEntry(
+        "openlock.scenarios.CE4D", "CommonEffect4DelayScenario", False
+    ),
+    "CE4": ScenarioEntry("openlock.scenarios.CE4", "CommonEffect4Scenario", True),
+    "CC4": ScenarioEntry("openlock.scenarios.CC4", "CommonCause4Scenario", True),
+    "multi-lock": ScenarioEntry(
+        "openlock.scenarios.multi_lock", "MultiLockScenario", False
+    ),
+    "TwoStepTestingScenario": ScenarioEntry(
+        "openlock.scenarios.two_step_testing_scenario", "TwoStepTestingScenario", True
+    ),
+}
+SCENARIO_ALIASES = {"CE3_simplified": "CE3", "CC3_simplified": "CC3"}
+
+# names accepted by select_scenario
+SCENARIO_NAMES = list(SCENARIOS.keys())
 TESTING_SCENARIOS = [("CE3", "CE4"), ("CE3", "CC4"), ("CC3", "CE4"), ("CC3", "CC4")]
 
 
-def select_scenario(scenario_name, use_physics=True):
-    scenario_selected = None
-    if scenario_name == "CE3" or scenario_name == "CE3_simplified":
-        scenario_selected = CommonEffect3Scenario(use_physics=use_physics)
-    elif scenario_name == "CC3" or scenario_name == "CC3_simplified":
-        scenario_selected = CommonCause3Scenario(use_physics=use_physics)
-    elif scenario_name == "CC3D":
-        scenario_selected = CommonCause3DelayScenario()
-    elif scenario_name == "CC4D":
-        scenario_selected = CommonCause4DelayScenario()
-    elif scenario_name == "CE3D":
-        scenario_selected = CommonEffect3DelayScenario()
-    elif scenario_name == "CE4D":
-        scenario_selected = CommonEffect4DelayScenario()
-    elif scenario_name == "CE4":
-        scenario_selected = CommonEffect4Scenario(use_physics=use_physics)
-    elif scenario_name == "CC4":
-        scenario_selected = CommonCause4Scenario(use_physics=use_physics)
-    elif scenario_name == "multi-lock":
-        scenario_selected = MultiLockScenario()
-    elif scenario_name == "TwoStepTestingScenario":
-        scenario_selected = TwoStepTestingScenario(use_physics=use_physics)
-    else:
+def get_scenario_class(scenario_name: str) -> type:
+    """
+    :param scenario_name: name in SCENARIO_NAMES or SCENARIO_ALIASES
+    :return: the scenario class, importing its module if this is its first use
+    """
+    entry = SCENARIOS.get(SCENARIO_ALIASES.get(scenario_name, scenario_name))
+    if entry is None:
         raise ValueError(
             "Invalid scenario chosen in settings_scenario.py: %s" % scenario_name
         )
-    return scenario_selected
+    return getattr(importlib.import_module(entry.module), entry.class_name)
+
+
+def select_scenario(scenario_name, use_physics=True):
+    scenario_class = get_scenario_class(scenario_name)
+    if SCENARIOS[SCENARIO_ALIASES.get(scenario_name, scenario_name)].physics:
+        return scenario_class(use_physics=use_physics)
+    return scenario_class()
 
 
 def select_random_scenarios():
@@ -340,13 +340,14 @@ def get_possible_trials(name):
         raise ValueError(f"Invalid trial name {name}")
 
 
-def get_trial(scenario_name, completed_trials=None):
+def get_trial(scenario_name, completed_trials=None, random_state=None):
     """
     Apply specific rules for selecting random trials.
     Namely, For CE4 & CC4, only selects from trials 7-11, otherwise only selects from trials 1-6.
 
     :param scenario_name: Name of trial
     :param completed_trials:
+    :param random_state: np.random.Generator the trial is drawn from, the global NumPy RNG if None
     :return: trial and configs
     """
     if completed_trials is None:
@@ -359,7 +360,9 @@ def get_trial(scenario_name, completed_trials=None):
         or scenario_name == "CE3D"
     ):
         # trials 1-6 have 3 levers for CC3/CE3
-        trial, configs = select_random_trial(completed_trials, THREE_LEVER_TRIALS)
+        trial, configs = select_random_trial(
+            completed_trials, THREE_LEVER_TRIALS, random_state
+        )
     elif (
         scenario_name == "CE4"
         or scenario_name == "CC4"
@@ -367,14 +370,18 @@ def get_trial(scenario_name, completed_trials=None):
         or scenario_name == "CE4D"
     ):
         # trials 7-11 have 4 levers for CC4/CE4
-        trial, configs = select_random_trial(completed_trials, FOUR_LEVER_TRIALS)
+        trial, configs = select_random_trial(
+            completed_trials, FOUR_LEVER_TRIALS, random_state
+        )
     elif scenario_name == "CE3_simplified" or scenario_name == "CC3_simplified":
         # trials 1-6 have 3 levers for CC3/CE3
         trial, configs = select_random_trial(
-            completed_trials, SIMPLIFIED_THREE_LEVER_TRIALS
+            completed_trials, SIMPLIFIED_THREE_LEVER_TRIALS, random_state
         )
     elif scenario_name == "TwoStepTestingScenario":
-        trial, configs = select_random_trial(completed_trials, TWO_STEP_TESTING_TRIALS)
+        trial, configs = select_random_trial(
+            completed_trials, TWO_STEP_TESTING_TRIALS, random_state
+        )
     else:
         error_str = "Invalid scenario name: {}".format(scenario_name)
         raise ValueError(error_str)
@@ -382,11 +389,12 @@ def get_trial(scenario_name, completed_trials=None):
     return trial, configs
 
 
-def select_random_trial(completed_trials, possible_trials):
+def select_random_trial(completed_trials, possible_trials, random_state=None):
     """
     sets a new random trial
     :param completed_trials: list of trials already selected
     :param possible_trials: list of all trials possible
+    :param random_state: np.random.Generator the trial is drawn from, the global NumPy RNG if None
     :return:
     """
     if completed_trials is None:
@@ -395,7 +403,10 @@ def select_random_trial(completed_trials, possible_trials):
         return None, None
 
     incomplete_trials = np.setdiff1d(possible_trials, completed_trials)
-    rand_trial_idx = np.random.randint(0, len(incomplete_trials))
+    if random_state is None:
+        rand_trial_idx = np.random.randint(0, len(incomplete_trials))
+    else:
+        rand_trial_idx = random_state.integers(0, len(incomplete_trials))
     trial = incomplete_trials[rand_trial_idx]
 
     return select_trial(trial)
@@ -0,0 +1,278 @@
+"""
+2D rendering into a NumPy frame buffer, without a window or an OpenGL context.
+
+Viewer has the drawing interface of rendering.Viewer, so Box2DRenderer can use either. Geoms are
+rasterized in the order they were drawn: polygons are filled by testing pixel centers with the
+even-odd rule, and lines are one pixel wide.
+"""
+import math
+from typing import Optional
+
+import numpy as np
+
+
+def _to_uint8(color):
+    return np.array([round(c * 255) for c in color[:3]], dtype=np.uint8)
+
+
+def fill_polygon(frame: np.ndarray, points: np.ndarray, color: np.ndarray) -> None:
+    """
+    Fill a polygon in frame.
+
+    :param frame: (height, width, 3) uint8 frame, row 0 at the top
+    :param points: (num_points, 2) vertices in window coordinates, y pointing up
+    :param color: uint8 RGB color
+    """
+    height, width = frame.shape[:2]
+    x_min = max(int(math.floor(points[:, 0].min())), 0)
+    x_max = min(int(math.ceil(points[:, 0].max())), width)
+    row_min = max(int(math.floor(height - points[:, 1].max())), 0)
+    row_max = min(int(math.ceil(height - points[:, 1].min())), height)
+    if x_min >= x_max or row_min >= row_max:
+        return
+
+    # pixel centers of the bounding box
+    xs = np.arange(x_min, x_max) + 0.5
+    ys = height - (np.arange(row_min, row_max) + 0.5)
+    inside = np.zeros((len(ys), len(xs)), dtype=bool)
+    for (x0, y0), (x1, y1) in zip(points, np.roll(points, -1, axis=0)):
+        crosses = (y0 > ys) != (y1 > ys)
+        if not crosses.any():
+            continue
+        ys_crossing = ys[crosses]
+        x_crossing = x0 + (ys_crossing - y0) * (x1 - x0) / (y1 - y0)
+        inside[crosses] ^= xs[None, :] < x_crossing[:, None]
+    frame[row_min:row_max, x_min:x_max][inside] = color
+
+
+def draw_line(
+    frame: np.ndarray, start: np.ndarray, end: np.ndarray, color: np.ndarray
+) -> None:
+    """
+    Draw a one pixel wide line in frame.
+
+    :param frame: (height, width, 3) uint8 frame, row 0 at the top
+    :param start: start of the line in window coordinates, y pointing up
+    :param end: end of the line in window coordinates
+    :param color: uint8 RGB color
+    """
+    height, width = frame.shape[:2]
+    num_points = int(max(abs(end[0] - start[0]), abs(end[1] - start[1]))) + 2
+    t = np.linspace(0, 1, num_points)
+    cols = np.floor(start[0] + t * (end[0] - start[0])).astype(int)
+    rows = np.floor(height - (start[1] + t * (end[1] - start[1]))).astype(int)
+    visible = (cols >= 0) & (cols < width) & (rows >= 0) & (rows < height)
+    frame[rows[visible], cols[visible]] = color
+
+
+class Viewer(object):
+    def __init__(self, width, height, pre_render_callbacks=[]):
+        self.width = width
+        self.height = height
+        self.geoms = []
+        self.onetime_geoms = []
+        self.transform = Transform()
+        self.pre_render_callbacks = pre_render_callbacks
+        self.background = np.array([255, 255, 255], dtype=np.uint8)
+        self.frame = np.empty((height, width, 3), dtype=np.uint8)
+        self._last_frame = self.frame
+
+    def close(self):
+        pass
+
+    def set_bounds(self, left, right, bottom, top):
+        assert right > left and top > bottom
+        scalex = self.width / (right - left)
+        scaley = self.height / (top - bottom)
+        self.transform = Transform(
+            translation=(-left * scalex, -bottom * scaley), scale=(scalex, scaley)
+        )
+
+    def add_geom(self, geom):
+        self.geoms.append(geom)
+
+    def add_onetime(self, geom):
+        self.onetime_geoms.append(geom)
+
+    def render(
+        self, return_rgb_array=False, out: Optional[np.ndarray] = None
+    ) -> Optional[np.ndarray]:
+        """
+        Rasterize the geoms and clear the one-time geoms.
+
+        :param return_rgb_array: whether to return the frame
+        :param out: optional preallocated (height, width, 3) uint8 frame to render into
+        :return: the frame if return_rgb_array, else None
+        """
+        # call pre-render callbacks
+        for callback in self.pre_render_callbacks:
+            callback()
+
+        frame = self.frame if out is None else out
+        if frame.shape != (self.height, self.width, 3) or frame.dtype != np.uint8:
+            raise ValueError(
+                f"Expected a ({self.height}, {self.width}, 3) uint8 frame, got "
+                f"{frame.shape} {frame.dtype}"
+            )
+        frame[...] = self.background
+        for geom in self.geoms:
+            geom.rasterize(frame, self.transform)
+        for geom in self.onetime_geoms:
+            geom.rasterize(frame, self.transform)
+        self.onetime_geoms = []
+        self._last_frame = frame
+        return frame if return_rgb_array else None
+
+    # Convenience
+    def draw_circle(self, radius=10, res=30, filled=True, **attrs):
+        geom = make_circle(radius=radius, res=res, filled=filled)
+        _add_attrs(geom, attrs)
+        self.add_onetime(geom)
+        return geom
+
+    def draw_polygon(self, v, filled=True, **attrs):
+        geom = make_polygon(v=v, filled=filled)
+        _add_attrs(geom, attrs)
+        self.add_onetime(geom)
+        return geom
+
+    def draw_polyline(self, v, **attrs):
+        geom = make_polyline(v=v)
+        _add_attrs(geom, attrs)
+        self.add_onetime(geom)
+        return geom
+
+    def draw_line(self, start, end, **attrs):
+        geom = Line(start, end)
+        _add_attrs(geom, attrs)
+        self.add_onetime(geom)
+        return geom
+
+    def get_array(self, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        :param out: optional preallocated frame to copy into
+        :return: a copy of the last rendered frame
+        """
+        if out is None:
+            return self._last_frame.copy()
+        out[...] = self._last_frame
+        return out
+
+
+def _add_attrs(geom, attrs):
+    if "color" in attrs:
+        geom.set_color(*attrs["color"])
+    if "linewidth" in attrs:
+        geom.set_linewidth(attrs["linewidth"])
+
+
+class Geom(object):
+    def __init__(self):
+        self.color = _to_uint8((0, 0, 0))
+        self.attrs = []
+
+    def add_attr(self, attr):
+        self.attrs.append(attr)
+
+    def set_color(self, r, g, b):
+        self.color = _to_uint8((r, g, b))
+
+    def set_linewidth(self, x):
+        pass
+
+    def _window_points(self, points, transform):
+        points = np.asarray([tuple(p) for p in points], dtype=float).reshape(-1, 2)
+        for attr in self.attrs:
+            points = attr.apply(points)
+        return transform.apply(points)
+
+    def rasterize(self, frame, transform):
+        raise NotImplementedError
+
+
+class Transform(object):
+    def __init__(self, translation=(0.0, 0.0), rotation=0.0, scale=(1, 1)):
+        self.set_translation(*translation)
+        self.set_rotation(rotation)
+        self.set_scale(*scale)
+
+    def apply(self, points):
+        """
+        :param points: (num_points, 2) points
+        :return: the points scaled, rotated and translated
+        """
+        cos, sin = math.cos(self.rotation), math.sin(self.rotation)
+        x = points[:, 0] * self.scale[0]
+        y = points[:, 1] * self.scale[1]
+        return np.stack(
+            [
+                cos * x - sin * y + self.translation[0],
+                sin * x + cos * y + self.translation[1],
+            ],
+            axis=1,
+        )
+
+    def set_translation(self, newx, newy):
+        self.translation = (float(newx), float(newy))
+
+    def set_rotation(self, new):
+        self.rotation = float(new)
+
+    def set_scale(self, newx, newy):
+        self.scale = (float(newx), float(newy))
+
+
+class FilledPolygon(Geom):
+    def __init__(self, v):
+        Geom.__init__(self)
+        self.v = v
+
+    def rasterize(self, frame, transform):
+        fill_polygon(frame, self._window_points(self.v, transform), self.color)
+
+
+class PolyLine(Geom):
+    def __init__(self, v, close):
+        Geom.__init__(self)
+        self.v = v
+        self.close = close
+
+    def rasterize(self, frame, transform):
+        points = self._window_points(self.v, transform)
+        if self.close:
+            points = np.concatenate([points, points[:1]])
+        for start, end in zip(points[:-1], points[1:]):
+            draw_line(frame, start, end, self.color)
+
+
+class Line(Geom):
+    def __init__(self, start=(0.0, 0.0), end=(0.0, 0.0)):
+        Geom.__init__(self)
+        self.start = start
+        self.end = end
+
+    def rasterize(self, frame, transform):
+        start, end = self._window_points([self.start, self.end], transform)
+        draw_line(frame, start, end, self.color)
+
+
+def make_circle(radius=10, res=30, filled=True):
+    points = []
+    for i in range(res):
+        ang = 2 * math.pi * i / res
+        points.append((math.cos(ang) * radius, math.sin(ang) * radius))
+    if filled:
+        return FilledPolygon(points)
+    else:
+        return PolyLine(points, True)
+
+
+def make_polygon(v, filled=True):
+    if filled:
+        return FilledPolygon(v)
+    else:
+        return PolyLine(v, True)
+
+
+def make_polyline(v):
+    return PolyLine(v, False)
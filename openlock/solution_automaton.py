@@ -0,0 +1,146 @@
+"""
+Incremental matching of action sequences against the solutions of a trial.
+
+Sets of solutions are represented as integer bitsets, bit i standing for solution i. A
+SolutionAutomaton is compiled once per trial; matching an attempt keeps a single bitset of the
+solutions that agree with every action taken so far, which is advanced with one table lookup and
+one AND per action.
+"""
+from typing import Dict, List, Sequence
+
+WILDCARD = "*"
+
+
+class SolutionAutomaton(object):
+    def __init__(self, solutions: Sequence[Sequence]):
+        """
+        Compile solutions into per-position transition tables.
+
+        :param solutions: Solution action sequences. Actions are compared by str(); WILDCARD
+        matches any action.
+        """
+        self.solutions = [
+            [str(action) for action in solution] for solution in solutions
+        ]
+        self.num_solutions = len(self.solutions)
+        self.all_solutions = (1 << self.num_solutions) - 1
+        self.max_length = max((len(solution) for solution in self.solutions), default=0)
+
+        # _accepts[pos][action] is the set of solutions that agree with action at position pos.
+        # _accepts_any[pos] is the set of solutions that agree with any action at pos: those with a
+        # wildcard at pos and those shorter than pos + 1, as in TrialLog sequences are compared on
+        # their common length.
+        self._accepts: List[Dict[str, int]] = []
+        self._accepts_any: List[int] = []
+        for pos in range(self.max_length):
+            accepts_any = 0
+            for i, solution in enumerate(self.solutions):
+                if pos >= len(solution) or solution[pos] == WILDCARD:
+                    accepts_any |= 1 << i
+            accepts = dict()
+            for i, solution in enumerate(self.solutions):
+                if pos < len(solution) and solution[pos] != WILDCARD:
+                    accepts[solution[pos]] = accepts.get(solution[pos], accepts_any) | (
+                        1 << i
+                    )
+            self._accepts.append(accepts)
+            self._accepts_any.append(accepts_any)
+
+        # solutions at least / exactly as long as a sequence of each length
+        self._length_at_least = [
+            self._solutions_where(lambda solution: len(solution) >= length)
+            for length in range(self.max_length + 1)
+        ]
+        self._length_equal = [
+            self._solutions_where(lambda solution: len(solution) == length)
+            for length in range(self.max_length + 1)
+        ]
+
+    def _solutions_where(self, predicate) -> int:
+        solutions = 0
+        for i, solution in enumerate(self.solutions):
+            if predicate(solution):
+                solutions |= 1 << i
+        return solutions
+
+    def start(self) -> int:
+        """
+        :return: matching solutions of an empty action sequence
+        """
+        return self.all_solutions
+
+    def advance(self, matches: int, pos: int, action) -> int:
+        """
+        Take one action.
+
+        :param matches: matching solutions of the sequence before the action
+        :param pos: index of the action in the sequence
+        :param action: action, compared by str()
+        :return: matching solutions of the sequence including the action
+        """
+        if pos >= self.max_length:
+            return matches
+        return matches & self._accepts[pos].get(str(action), self._accepts_any[pos])
+
+    def run(self, action_seq: Sequence) -> int:
+        """
+        :param action_seq: action sequence
+        :return: solutions that agree with action_seq on their common length
+        """
+        matches = self.start()
+        for pos, action in enumerate(action_seq):
+            matches = self.advance(matches, pos, action)
+        return matches
+
+    def length_at_least(self, length: int) -> int:
+        """
+        :return: solutions with at least length actions
+        """
+        if length > self.max_length:
+            return 0
+        return self._length_at_least[length]
+
+    def length_equal(self, length: int) -> int:
+        """
+        :return: solutions with exactly length actions
+        """
+        if length > self.max_length:
+            return 0
+        return self._length_equal[length]
+
+    def partial(self, matches: int, length: int) -> int:
+        """
+        :param matches: matching solutions of a sequence
+        :param length: length of the sequence
+        :return: solutions the sequence is a prefix of
+        """
+        return matches & self.length_at_least(length)
+
+    def complete(self, matches: int, length: int) -> int:
+        """
+        :param matches: matching solutions of a sequence
+        :param length: length of the sequence
+        :return: solutions the sequence is equal to
+        """
+        return matches & self.length_equal(length)
+
+    @staticmethod
+    def first(solutions: int) -> int:
+        """
+        :param solutions: set of solutions
+        :return: lowest solution index in solutions, -1 if there are none
+        """
+        return (solutions & -solutions).bit_length() - 1
+
+    @staticmethod
+    def indices(solutions: int) -> List[int]:
+        """
+        :param solutions: set of solutions
+        :return: solution indices in solutions, in increasing order
+        """
+        indices = []
+        while solutions:
+            lowest = solutions & -solutions
+            indices.append(lowest.bit_length() - 1)
+            solutions ^= lowest
+        return indices
@@ -0,0 +1,100 @@
+"""
+Library of joint-space arm trajectories, so inverse kinematics is solved once per (start pose,
+target) pair.
+
+A trajectory is keyed by the configuration of the kinematic chain it starts from (base x, y and
+theta followed by the joint angles) and the end effector target (x, y, theta). Its value is the
+array of joint angles the inverse kinematics converged to at each waypoint where the arm moved, of
+shape (num_moves, num_joints). Keys are compared exactly: the simulator is deterministic, so the arm
+returns to exactly the same pose every time it is reset, and after the same actions.
+"""
+import os
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+TrajectoryKey = Tuple[float, ...]
+
+
+class TrajectoryLibrary(object):
+    def __init__(self, path: Optional[str] = None):
+        """
+        :param path: File the library is saved to. If it exists, the library is loaded from it.
+        """
+        self.path = path
+        self.trajectories: Dict[TrajectoryKey, np.ndarray] = dict()
+        self.hits = 0
+        self.misses = 0
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    @staticmethod
+    def make_key(start: Sequence[float], target: Sequence[float]) -> TrajectoryKey:
+        """
+        :param start: base x, y, theta and joint angles of the chain at the start of the trajectory
+        :param target: end effector x, y, theta at the end of the trajectory
+        :return: key of the trajectory
+        """
+        return tuple(float(x) for x in start) + tuple(float(x) for x in target)
+
+    def __len__(self) -> int:
+        return len(self.trajectories)
+
+    def __contains__(self, key: TrajectoryKey) -> bool:
+        return key in self.trajectories
+
+    def get(self, key: TrajectoryKey) -> Optional[np.ndarray]:
+        """
+        :return: joint angles at each move of the trajectory, None if it is not in the library
+        """
+        trajectory = self.trajectories.get(key)
+        if trajectory is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return trajectory
+
+    def add(self, key: TrajectoryKey, trajectory: np.ndarray) -> None:
+        """
+        :param key: key of the trajectory, see make_key
+        :param trajectory: (num_moves, num_joints) joint angles at each move
+        """
+        trajectory = np.array(trajectory, dtype=float)
+        trajectory.flags.writeable = False
+        self.trajectories[key] = trajectory
+
+    def save(self, path: Optional[str] = None) -> None:
+        """
+        Save the library as a .npz file.
+
+        :param path: File to save to, self.path if None.
+        """
+        if path is None:
+            path = self.path
+        if path is None:
+            raise ValueError("No path to save the trajectory library to")
+        keys = list(self.trajectories.keys())
+        trajectories = [self.trajectories[key] for key in keys]
+        num_joints = trajectories[0].shape[1] if trajectories else 0
+        # np.savez appends .npz to paths without it, write through a file object to keep path
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                keys=np.array(keys, dtype=float),
+                lengths=np.array([len(t) for t in trajectories], dtype=np.int64),
+                moves=np.concatenate(trajectories)
+                if trajectories
+                else np.zeros((0, num_joints)),
+            )
+
+    def load(self, path: str) -> None:
+        """
+        Add the trajectories saved in path to the library.
+
+        :param path: File written by save.
+        """
+        with np.load(path) as data:
+            keys, lengths, moves = data["keys"], data["lengths"], data["moves"]
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+        for key, start, end in zip(keys.tolist(), offsets[:-1], offsets[1:]):
+            self.add(tuple(key), moves[start:end])
@@ -0,0 +1,538 @@
+"""
+Compact binary file format for TrialLogs, read through memory maps.
+
+A file holds any number of trials, stored column by column: one array per field of the trials,
+attempts and actions of every trial, plus one 2D array of results rows per distinct results header.
+Strings (trial, scenario and action names) are stored once, in a table of the header, and referred to
+by index. The attempts of a trial and the actions of an attempt are contiguous rows, located by offset
+arrays: trial i's attempts are attempt rows attempt_offsets[i]:attempt_offsets[i + 1], and attempt
+row j's actions are action rows action_offsets[j]:action_offsets[j + 1].
+
+Layout: 8 bytes of magic, the length of the JSON header as a little-endian uint64, the header, then
+the arrays, each starting at a multiple of ALIGNMENT bytes. Missing times and rewards are NaN.
+
+TrialLogFile memory-maps a file. Its columns can be used directly for analysis, and indexing it
+returns TrialLogViews, which read a trial's fields from the columns only when they are accessed. Only
+the pages that are read are loaded, so files of thousands of subjects do not need to fit in memory.
+"""
+import json
+import math
+import mmap
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from openlock.logger_env import ActionLog, AttemptLog, ResultsTable, TrialLog
+
+MAGIC = b"OLTRIAL1"
+ALIGNMENT = 64
+RESULTS_DTYPE = np.dtype("<i4")
+
+# dtype of each column of the trial, attempt and action tables
+TRIAL_COLUMNS = {
+    "trial_name": "<i4",
+    "trial_scenario": "<i4",
+    "trial_start_time": "<f8",
+    "trial_end_time": "<f8",
+    "trial_success": "|b1",
+    "trial_reward": "<f8",
+    "trial_solution_set": "<i4",
+}
+ATTEMPT_COLUMNS = {
+    "attempt_num": "<i4",
+    "attempt_start_time": "<f8",
+    "attempt_end_time": "<f8",
+    "attempt_success": "|b1",
+    "attempt_reward": "<f8",
+    # index of the attempt's results header, -1 if the attempt has no results
+    "attempt_results_layout": "<i4",
+    "attempt_results_start": "<i8",
+    "attempt_results_stop": "<i8",
+}
+ACTION_COLUMNS = {
+    "action_name": "<i4",
+    "action_start_time": "<f8",
+    "action_end_time": "<f8",
+    "action_reward": "<f8",
+}
+# offsets of each trial's attempts and completed solutions, and of each attempt's actions
+OFFSET_COLUMNS = ["attempt_offsets", "completed_offsets", "action_offsets"]
+
+
+def _float(x) -> float:
+    return math.nan if x is None else float(x)
+
+
+def _optional(x: float) -> Optional[float]:
+    return None if math.isnan(x) else float(x)
+
+
+def _results_rows(results):
+    """
+    :param results: ResultsTable, or list of the header followed by rows, as recorded in AttemptLog
+    :return: header and 2D array of rows, or None if there are no results
+    """
+    if results is None or len(results) == 0:
+        return None
+    if isinstance(results, ResultsTable):
+        return results.col_label, results.rows
+    return (
+        list(results[0]),
+        np.array(results[1:], dtype=RESULTS_DTYPE).reshape(
+            len(results) - 1, len(results[0])
+        ),
+    )
+
+
+class TrialLogWriter(object):
+    """
+    Writes TrialLogs to a file in the format read by TrialLogFile.
+
+    Trials are converted to columns as they are added; the file is written by close.
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: File to write.
+        """
+        self.path = path
+        self.strings: List[str] = []
+        self._string_ids: Dict[str, int] = dict()
+        self.col_labels: List[List[str]] = []
+        self._layout_ids: Dict[tuple, int] = dict()
+        self.solution_sets: List[List[List[str]]] = []
+        self._solution_set_ids: Dict[str, int] = dict()
+        self.random_seeds: List[Any] = []
+        self.columns: Dict[str, list] = {
+            name: []
+            for name in list(TRIAL_COLUMNS)
+            + list(ATTEMPT_COLUMNS)
+            + list(ACTION_COLUMNS)
+            + ["completed_solutions"]
+        }
+        self.offsets = {name: [0] for name in OFFSET_COLUMNS}
+        self.results: List[List[np.ndarray]] = []
+        self._num_results_rows: List[int] = []
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+
+    def _string_id(self, s: str) -> int:
+        string_id = self._string_ids.get(s)
+        if string_id is None:
+            string_id = self._string_ids[s] = len(self.strings)
+            self.strings.append(s)
+        return string_id
+
+    def _layout_id(self, col_label: Sequence[str]) -> int:
+        key = tuple(col_label)
+        layout_id = self._layout_ids.get(key)
+        if layout_id is None:
+            layout_id = self._layout_ids[key] = len(self.col_labels)
+            self.col_labels.append(list(col_label))
+            self.results.append([])
+            self._num_results_rows.append(0)
+        return layout_id
+
+    def _solution_set_id(self, solutions: Sequence[Sequence[str]]) -> int:
+        solutions = [[str(action) for action in solution] for solution in solutions]
+        key = json.dumps(solutions)
+        set_id = self._solution_set_ids.get(key)
+        if set_id is None:
+            set_id = self._solution_set_ids[key] = len(self.solution_sets)
+            self.solution_sets.append(solutions)
+        return set_id
+
+    def add(self, trial: TrialLog) -> None:
+        """
+        Add a trial. Only its finished attempts are written.
+
+        :param trial: The trial.
+        """
+        if self.closed:
+            raise ValueError("add to a closed TrialLogWriter")
+        columns = self.columns
+        columns["trial_name"].append(self._string_id(str(trial.name)))
+        columns["trial_scenario"].append(self._string_id(str(trial.scenario_name)))
+        columns["trial_start_time"].append(_float(trial.start_time))
+        columns["trial_end_time"].append(_float(trial.end_time))
+        columns["trial_success"].append(bool(trial.success))
+        columns["trial_reward"].append(_float(trial.trial_reward))
+        columns["trial_solution_set"].append(self._solution_set_id(trial.solutions))
+        self.random_seeds.append(trial.random_seed)
+        solutions = [list(map(str, solution)) for solution in trial.solutions]
+        columns["completed_solutions"].extend(
+            solutions.index(list(map(str, solution)))
+            for solution in trial.completed_solutions
+        )
+
+        for attempt in trial.attempt_seq:
+            columns["attempt_num"].append(attempt.attempt_num)
+            columns["attempt_start_time"].append(_float(attempt.start_time))
+            columns["attempt_end_time"].append(_float(attempt.end_time))
+            columns["attempt_success"].append(bool(attempt.success))
+            columns["attempt_reward"].append(_float(attempt.reward))
+            results = _results_rows(attempt.results)
+            if results is None:
+                layout_id, start, stop = -1, 0, 0
+            else:
+                col_label, rows = results
+                layout_id = self._layout_id(col_label)
+                start = self._num_results_rows[layout_id]
+                stop = start + len(rows)
+                self.results[layout_id].append(np.array(rows, dtype=RESULTS_DTYPE))
+                self._num_results_rows[layout_id] = stop
+            columns["attempt_results_layout"].append(layout_id)
+            columns["attempt_results_start"].append(start)
+            columns["attempt_results_stop"].append(stop)
+
+            for action in attempt.action_seq:
+                columns["action_name"].append(self._string_id(str(action)))
+                columns["action_start_time"].append(_float(action.start_time))
+                columns["action_end_time"].append(_float(action.end_time))
+                columns["action_reward"].append(_float(action.reward))
+            self.offsets["action_offsets"].append(len(columns["action_name"]))
+
+        self.offsets["attempt_offsets"].append(len(columns["attempt_num"]))
+        self.offsets["completed_offsets"].append(len(columns["completed_solutions"]))
+
+    def close(self) -> None:
+        """
+        Write the file.
+        """
+        if self.closed:
+            return
+        arrays: Dict[str, np.ndarray] = dict()
+        dtypes = dict(
+            **TRIAL_COLUMNS,
+            **ATTEMPT_COLUMNS,
+            **ACTION_COLUMNS,
+            completed_solutions="<i2",
+        )
+        for name, values in self.columns.items():
+            arrays[name] = np.array(values, dtype=dtypes[name])
+        for name, offsets in self.offsets.items():
+            arrays[name] = np.array(offsets, dtype="<i8")
+        for layout_id, (col_label, chunks) in enumerate(
+            zip(self.col_labels, self.results)
+        ):
+            arrays[f"results{layout_id}"] = (
+                np.concatenate(chunks)
+                if chunks
+                else np.zeros((0, len(col_label)), RESULTS_DTYPE)
+            )
+
+        # the header gives the offset of every array, which depends on the header length: lay the
+        # arrays out after a header long enough for any offset, padded with spaces
+        array_specs = {
+            name: [2 ** 63 - 1, array.dtype.str, list(array.shape)]
+            for name, array in arrays.items()
+        }
+        header = dict(
+            strings=self.strings,
+            col_labels=self.col_labels,
+            solution_sets=self.solution_sets,
+            random_seeds=self.random_seeds,
+            arrays=array_specs,
+        )
+        header_len = len(json.dumps(header).encode())
+        data_start = -(-(len(MAGIC) + 8 + header_len) // ALIGNMENT) * ALIGNMENT
+        offset = data_start
+        for name, array in arrays.items():
+            array_specs[name][0] = offset
+            offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+        header_bytes = json.dumps(header).encode()
+        header_bytes += b" " * (data_start - len(MAGIC) - 8 - len(header_bytes))
+
+        with open(self.path, "wb") as f:
+            f.write(MAGIC)
+            f.write(np.uint64(len(header_bytes)).astype("<u8").tobytes())
+            f.write(header_bytes)
+            for name, array in arrays.items():
+                f.seek(array_specs[name][0])
+                f.write(np.ascontiguousarray(array).tobytes())
+            # pad the last array, so every array lies within the file
+            f.truncate(max(offset, data_start))
+        self.closed = True
+
+
+def write_trial_logs(path: str, trials: Iterable[TrialLog]) -> None:
+    """
+    :param path: File to write.
+    :param trials: Trials to write.
+    """
+    with TrialLogWriter(path) as writer:
+        for trial in trials:
+            writer.add(trial)
+
+
+class ResultsView(ResultsTable):
+    """
+    Read-only ResultsTable over rows of a memory-mapped file.
+    """
+
+    def __init__(self, col_label: List[str], index_map: Dict[str, int], rows):
+        self.col_label = col_label
+        self.index_map = index_map
+        self._data = rows
+        self.num_rows = len(rows)
+
+    def append(self, row):
+        raise ValueError("ResultsView is read-only")
+
+    def clear(self):
+        raise ValueError("ResultsView is read-only")
+
+
+class AttemptLogView(object):
+    """
+    Read-only view of an attempt in a TrialLogFile, with the fields of AttemptLog.
+    """
+
+    def __init__(self, log_file: "TrialLogFile", row: int):
+        self._file = log_file
+        self._row = row
+
+    def _column(self, name: str):
+        return self._file.columns[name][self._row]
+
+    @property
+    def attempt_num(self) -> int:
+        return int(self._column("attempt_num"))
+
+    @property
+    def start_time(self) -> Optional[float]:
+        return _optional(self._column("attempt_start_time"))
+
+    @property
+    def end_time(self) -> Optional[float]:
+        return _optional(self._column("attempt_end_time"))
+
+    @property
+    def success(self) -> bool:
+        return bool(self._column("attempt_success"))
+
+    @property
+    def reward(self) -> Optional[float]:
+        return _optional(self._column("attempt_reward"))
+
+    @property
+    def action_seq(self) -> List[ActionLog]:
+        return self._file.get_actions(self._row)
+
+    @property
+    def results(self) -> Optional[ResultsView]:
+        return self._file.get_results(self._row)
+
+    def __eq__(self, other):
+        return self.action_seq == other.action_seq
+
+    def __str__(self):
+        return self.to_attempt_log().pretty_str_results()
+
+    def to_attempt_log(self) -> AttemptLog:
+        """
+        :return: the attempt loaded into an AttemptLog, with results copied out of the file
+        """
+        attempt = AttemptLog(self.attempt_num, self.start_time)
+        attempt.action_seq = self.action_seq
+        attempt.success = self.success
+        attempt.end_time = self.end_time
+        attempt.reward = self.reward
+        results = self.results
+        attempt.results = None if results is None else results.snapshot()
+        return attempt
+
+
+class TrialLogView(object):
+    """
+    Read-only view of a trial in a TrialLogFile, with the fields of TrialLog. Fields are read from
+    the file when accessed.
+    """
+
+    def __init__(self, log_file: "TrialLogFile", index: int):
+        self._file = log_file
+        self.index = index
+
+    def _column(self, name: str):
+        return self._file.columns[name][self.index]
+
+    def _rows(self, offsets: str) -> range:
+        offsets = self._file.columns[offsets]
+        return range(int(offsets[self.index]), int(offsets[self.index + 1]))
+
+    @property
+    def name(self) -> str:
+        return self._file.strings[self._column("trial_name")]
+
+    @property
+    def scenario_name(self) -> str:
+        return self._file.strings[self._column("trial_scenario")]
+
+    @property
+    def start_time(self) -> Optional[float]:
+        return _optional(self._column("trial_start_time"))
+
+    @property
+    def end_time(self) -> Optional[float]:
+        return _optional(self._column("trial_end_time"))
+
+    @property
+    def success(self) -> bool:
+        return bool(self._column("trial_success"))
+
+    @property
+    def trial_reward(self) -> Optional[float]:
+        return _optional(self._column("trial_reward"))
+
+    @property
+    def random_seed(self):
+        return self._file.header["random_seeds"][self.index]
+
+    @property
+    def solutions(self) -> List[List[str]]:
+        return self._file.header["solution_sets"][self._column("trial_solution_set")]
+
+    @property
+    def completed_solutions(self) -> List[List[str]]:
+        solutions = self.solutions
+        rows = self._rows("completed_offsets")
+        return [
+            solutions[i]
+            for i in self._file.columns["completed_solutions"][rows.start : rows.stop]
+        ]
+
+    @property
+    def solution_found(self) -> List[bool]:
+        rows = self._rows("attempt_offsets")
+        return self._file.columns["attempt_success"][rows.start : rows.stop].tolist()
+
+    @property
+    def attempt_seq(self) -> List[AttemptLogView]:
+        return [
+            AttemptLogView(self._file, row) for row in self._rows("attempt_offsets")
+        ]
+
+    def to_trial_log(self) -> TrialLog:
+        """
+        :return: the trial loaded into a TrialLog, with results copied out of the file
+        """
+        trial = TrialLog(self.name, self.scenario_name, self.solutions, self.start_time)
+        trial.end_time = self.end_time
+        trial.success = self.success
+        trial.trial_reward = self.trial_reward
+        trial.random_seed = self.random_seed
+        for solution in self.completed_solutions:
+            trial.completed_solutions.append(solution)
+            trial.completed_solutions_mask |= 1 << trial.solutions.index(solution)
+        trial.attempt_seq = [attempt.to_attempt_log() for attempt in self.attempt_seq]
+        trial.solution_found = self.solution_found
+        return trial
+
+
+class TrialLogFile(object):
+    """
+    Memory-mapped file written by TrialLogWriter.
+
+    columns maps the name of every column of TRIAL_COLUMNS, ATTEMPT_COLUMNS, ACTION_COLUMNS and
+    OFFSET_COLUMNS, completed_solutions and results{i} to a read-only array backed by the file.
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: File written by TrialLogWriter.
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[: len(MAGIC)] != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a trial log file")
+        header_len = int(
+            np.frombuffer(self._mmap, "<u8", count=1, offset=len(MAGIC))[0]
+        )
+        header_start = len(MAGIC) + 8
+        self.header = json.loads(self._mmap[header_start : header_start + header_len])
+        self.strings: List[str] = self.header["strings"]
+        self.col_labels: List[List[str]] = self.header["col_labels"]
+        self._index_maps = [
+            {name: idx for idx, name in enumerate(col_label)}
+            for col_label in self.col_labels
+        ]
+        self.columns: Dict[str, np.ndarray] = dict()
+        for name, (offset, dtype, shape) in self.header["arrays"].items():
+            self.columns[name] = np.frombuffer(
+                self._mmap, dtype, count=int(np.prod(shape)), offset=offset
+            ).reshape(shape)
+
+    def __len__(self) -> int:
+        return len(self.columns["trial_name"])
+
+    def __getitem__(self, index: int) -> TrialLogView:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("trial index out of range")
+        return TrialLogView(self, index)
+
+    def __iter__(self):
+        return (TrialLogView(self, index) for index in range(len(self)))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self) -> None:
+        """
+        Drop the column arrays and unmap the file. Columns and ResultsViews the caller still holds
+        stay valid, and keep the file mapped until they are garbage collected. TrialLogViews of the
+        file must not be used afterwards.
+        """
+        self.columns = dict()
+        try:
+            self._mmap.close()
+        except BufferError:
+            # arrays exported from the map are alive, which unmap it once they are collected
+            pass
+
+    def get_actions(self, attempt_row: int) -> List[ActionLog]:
+        """
+        :param attempt_row: Row of the attempt in the attempt columns.
+        :return: The actions of the attempt.
+        """
+        columns = self.columns
+        start, stop = columns["action_offsets"][attempt_row : attempt_row + 2]
+        actions = []
+        for row in range(start, stop):
+            action = ActionLog(
+                self.strings[columns["action_name"][row]],
+                _optional(columns["action_start_time"][row]),
+            )
+            action.end_time = _optional(columns["action_end_time"][row])
+            action.reward = _optional(columns["action_reward"][row])
+            actions.append(action)
+        return actions
+
+    def get_results(self, attempt_row: int) -> Optional[ResultsView]:
+        """
+        :param attempt_row: Row of the attempt in the attempt columns.
+        :return: Read-only view of the attempt's results, None if it has none.
+        """
+        columns = self.columns
+        layout = int(columns["attempt_results_layout"][attempt_row])
+        if layout < 0:
+            return None
+        start = int(columns["attempt_results_start"][attempt_row])
+        stop = int(columns["attempt_results_stop"][attempt_row])
+        return ResultsView(
+            self.col_labels[layout],
+            self._index_maps[layout],
+            columns[f"results{layout}"][start:stop],
+        )
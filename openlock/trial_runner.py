@@ -0,0 +1,404 @@
+"""
+Runs agents on grids of trials in a pool of worker processes.
+
+A job is a sequence of trials run by one agent, seeded by the job seed: a single trial of a grid
+over (scenario, trial, seed), or a transfer protocol of settings_trial.PARAMS, where the agent
+trains on trials of one scenario and is then tested on another. Workers send an AttemptSummary back
+to the parent after every attempt, which TrialRunner.run yields as they arrive.
+
+Agents are built in the worker by agent_factory(job), which must be picklable under the
+multiprocessing start method (a module level function or class). An agent needs one method,
+act(observation, action_space), returning the name of the next action in action_space. If it has an
+observe(observation, reward, done, info) method, it is called after every step. Agents draw from
+their own generators seeded by job.seed, as the global NumPy RNG belongs to the caller when jobs run
+in the parent process.
+
+With a log path, every summary is appended to the log as a line of JSON, followed by a line marking
+the job finished once all of its trials are. Runs with the same log skip the finished jobs and rerun
+the unfinished ones from the start, so an interrupted sweep can be resumed.
+"""
+import itertools
+import json
+import multiprocessing
+import os
+import queue
+import traceback
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+import numpy as np
+
+from openlock.envs.openlock_env import OpenLockEnv, make_env
+from openlock.settings_trial import (
+    ACTION_LIMIT,
+    ATTEMPT_LIMIT,
+    PARAMS,
+    get_possible_trials,
+)
+
+
+class TrialSpec(NamedTuple):
+    scenario_name: str
+    # None selects the trial with get_trial, without repeating the trials of the scenario in the job
+    trial_name: Optional[str] = None
+    action_limit: int = ACTION_LIMIT
+    attempt_limit: int = ATTEMPT_LIMIT
+
+
+class TrialJob(NamedTuple):
+    trials: Tuple[TrialSpec, ...]
+    seed: int
+
+    @property
+    def key(self) -> str:
+        """
+        Identifies the job in summaries and logs.
+        """
+        trials = []
+        # runs of the same trial spec are written once, with their length
+        for spec, run in itertools.groupby(self.trials):
+            num_trials = len(list(run))
+            trials.append(
+                f"{spec.scenario_name}/{spec.trial_name or 'random'}"
+                f"/{spec.action_limit}x{spec.attempt_limit}"
+                + (f"*{num_trials}" if num_trials > 1 else "")
+            )
+        return f"{','.join(trials)}/seed={self.seed}"
+
+
+class AttemptSummary(NamedTuple):
+    job: str
+    # index of the trial in the job
+    trial_index: int
+    scenario_name: str
+    trial_name: str
+    attempt: int
+    actions: Tuple[str, ...]
+    reward: float
+    # whether the attempt found a solution that had not been found before in the trial
+    success: bool
+    solutions_found: int
+    num_solutions: int
+
+
+def make_grid(
+    scenario_names: Sequence[str],
+    trial_names: Sequence[Optional[str]],
+    seeds: Iterable[int],
+    action_limit: int = ACTION_LIMIT,
+    attempt_limit: int = ATTEMPT_LIMIT,
+) -> List[TrialJob]:
+    """
+    :param scenario_names: scenarios of the grid
+    :param trial_names: trials of the grid, which must belong to every scenario. None selects a
+    random trial
+    :param seeds: seeds of the grid
+    :return: a single trial job for every (scenario, trial, seed)
+    """
+    seeds = list(seeds)
+    return [
+        TrialJob(
+            (TrialSpec(scenario_name, trial_name, action_limit, attempt_limit),), seed,
+        )
+        for scenario_name in scenario_names
+        for trial_name in trial_names
+        for seed in seeds
+    ]
+
+
+def make_protocol_jobs(params_name: str, seeds: Iterable[int]) -> List[TrialJob]:
+    """
+    :param params_name: transfer protocol, a key of settings_trial.PARAMS (e.g. CC3-CE4)
+    :param seeds: one job is made per seed
+    :return: jobs running train_num_trials random trials of the train scenario, then test_num_trials
+    random trials of the test scenario. Protocols that do not give a number of training trials train
+    on every trial of the train scenario.
+    """
+    params = PARAMS[params_name]
+    train_scenario_name = params["train_scenario_name"]
+    train = TrialSpec(
+        train_scenario_name,
+        None,
+        params["train_action_limit"],
+        params.get("train_attempt_limit", ATTEMPT_LIMIT),
+    )
+    trials = [train] * params.get(
+        "train_num_trials", len(get_possible_trials(train_scenario_name))
+    )
+    if params.get("test_scenario_name") is not None:
+        test = TrialSpec(
+            params["test_scenario_name"],
+            None,
+            params["test_action_limit"],
+            params.get("test_attempt_limit", ATTEMPT_LIMIT),
+        )
+        trials += [test] * params.get("test_num_trials", 1)
+    return [TrialJob(tuple(trials), seed) for seed in seeds]
+
+
+class RandomAgent(object):
+    """
+    Takes uniformly random actions. Its constructor can be used as an agent factory.
+    """
+
+    def __init__(self, job: TrialJob):
+        self.random_state = np.random.RandomState(job.seed)
+
+    def act(self, observation: np.ndarray, action_space: Sequence[str]) -> str:
+        return action_space[self.random_state.randint(len(action_space))]
+
+
+def run_job(
+    job: TrialJob, agent_factory: Callable[[TrialJob], Any], env_kwargs: Dict[str, Any]
+) -> Iterator[AttemptSummary]:
+    """
+    Runs the trials of a job.
+
+    :param job: the job
+    :param agent_factory: builds the agent of the job
+    :param env_kwargs: use_physics, physics_mode, reward_mode and effect_probabilities of the envs
+    :return: iterator over the summaries of the attempts, as they finish
+    """
+    agent = agent_factory(job)
+    observe = getattr(agent, "observe", None)
+    # one env per scenario, which keeps track of the trials of the scenario already run
+    envs: Dict[str, OpenLockEnv] = dict()
+    for trial_index, spec in enumerate(job.trials):
+        env = envs.get(spec.scenario_name)
+        if env is None:
+            env = make_env(spec.scenario_name, **env_kwargs)
+            # the i-th env of the job draws trials and action failures from seed (job seed, i)
+            env.seed([job.seed, len(envs)])
+            envs[spec.scenario_name] = env
+        trial_name = env.setup_trial(
+            scenario_name=spec.scenario_name,
+            action_limit=spec.action_limit,
+            attempt_limit=spec.attempt_limit,
+            specified_trial=spec.trial_name,
+            multiproc=True,
+        )
+        for attempt in range(spec.attempt_limit):
+            observation = env.reset()
+            actions = []
+            total_reward = 0.0
+            done = False
+            while not done:
+                action_name = agent.act(observation, env.action_space)
+                observation, reward, done, info = env.step(env.action_map[action_name])
+                if observe is not None:
+                    observe(observation, reward, done, info)
+                actions.append(action_name)
+                if reward is not None:
+                    total_reward += reward
+            env.finish_attempt()
+            yield AttemptSummary(
+                job.key,
+                trial_index,
+                spec.scenario_name,
+                str(trial_name),
+                attempt,
+                tuple(actions),
+                total_reward,
+                bool(env.cur_trial.solution_found[-1]),
+                len(env.cur_trial.completed_solutions),
+                len(env.cur_trial.solutions),
+            )
+            # the trial is over once every solution is found
+            if env.get_trial_success():
+                break
+        env.cur_trial.finish(env.get_time_source().time())
+        env.finish_trial(trial_name)
+
+
+# set in each worker by _init_worker
+_worker_state: Dict[str, Any] = dict()
+
+
+def _init_worker(
+    results: multiprocessing.Queue,
+    agent_factory: Callable[[TrialJob], Any],
+    env_kwargs: Dict[str, Any],
+) -> None:
+    _worker_state.update(
+        results=results, agent_factory=agent_factory, env_kwargs=env_kwargs
+    )
+
+
+def _worker(job: TrialJob) -> None:
+    results = _worker_state["results"]
+    try:
+        for summary in run_job(
+            job, _worker_state["agent_factory"], _worker_state["env_kwargs"]
+        ):
+            results.put(summary)
+        results.put(job.key)
+    except Exception:
+        results.put(RuntimeError(f"Job {job.key} failed:\n{traceback.format_exc()}"))
+
+
+def load_summaries(log_path: str) -> Tuple[List[AttemptSummary], Set[str]]:
+    """
+    :param log_path: log written by TrialRunner.run
+    :return: the summaries in the log and the keys of the finished jobs
+    """
+    summaries = []
+    finished = set()
+    with open(log_path) as f:
+        lines = f.readlines()
+    for i, line in enumerate(lines):
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            # the last line of an interrupted run may have been cut off while it was written
+            if i == len(lines) - 1:
+                break
+            raise
+        if "finished" in record:
+            finished.add(record["finished"])
+        else:
+            record["actions"] = tuple(record["actions"])
+            summaries.append(AttemptSummary(**record))
+    return summaries, finished
+
+
+class TrialRunner(object):
+    def __init__(
+        self,
+        agent_factory: Callable[[TrialJob], Any],
+        num_workers: int = os.cpu_count() or 1,
+        use_physics: bool = False,
+        physics_mode: str = "dynamic",
+        reward_mode: str = "basic",
+        effect_probabilities: Optional[Dict[str, float]] = None,
+        log_path: Optional[str] = None,
+        start_method: Optional[str] = None,
+    ):
+        """
+        :param agent_factory: builds the agent of a job from the job
+        :param num_workers: number of worker processes. If 0, jobs are run in this process
+        :param use_physics: whether the envs run the Box2D simulator
+        :param physics_mode: how the simulator moves the arm, one of openlock_env.PHYSICS_MODES
+        :param reward_mode: reward mode of the envs, see RewardStrategy
+        :param effect_probabilities: optional per-object effect probabilities, as in OpenLockEnv
+        :param log_path: optional JSON lines log of the summaries, used to resume runs
+        :param start_method: multiprocessing start method, the platform default if None
+        """
+        self.agent_factory = agent_factory
+        self.num_workers = num_workers
+        self.env_kwargs = dict(
+            use_physics=use_physics,
+            physics_mode=physics_mode,
+            reward_mode=reward_mode,
+            effect_probabilities=effect_probabilities,
+        )
+        self.log_path = log_path
+        self.start_method = start_method
+
+    def _open_log(self) -> Tuple[Any, Set[str]]:
+        """
+        Drop the summaries of unfinished jobs from the log, which are rerun.
+
+        :return: the log opened for appending and the keys of the finished jobs
+        """
+        if not os.path.exists(self.log_path):
+            return open(self.log_path, "w"), set()
+        summaries, finished = load_summaries(self.log_path)
+        # the log is replaced at once, so that an interruption keeps the finished jobs
+        tmp_path = self.log_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            for summary in summaries:
+                if summary.job in finished:
+                    f.write(json.dumps(summary._asdict()) + "\n")
+            for key in sorted(finished):
+                f.write(json.dumps({"finished": key}) + "\n")
+        os.replace(tmp_path, self.log_path)
+        return open(self.log_path, "a"), finished
+
+    def run(self, jobs: Sequence[TrialJob]) -> Iterator[AttemptSummary]:
+        """
+        Runs the jobs that are not finished in the log.
+
+        :param jobs: jobs with unique keys
+        :return: iterator over the summaries of the attempts, in the order they finish
+        """
+        if len({job.key for job in jobs}) != len(jobs):
+            raise ValueError("Jobs must have unique keys")
+        log, finished = None, set()
+        if self.log_path is not None:
+            log, finished = self._open_log()
+        try:
+            jobs = [job for job in jobs if job.key not in finished]
+            for message in self._run(jobs):
+                if isinstance(message, AttemptSummary):
+                    record = message._asdict()
+                else:
+                    record = {"finished": message}
+                if log is not None:
+                    log.write(json.dumps(record) + "\n")
+                    log.flush()
+                if isinstance(message, AttemptSummary):
+                    yield message
+        finally:
+            if log is not None:
+                log.close()
+
+    def _run(self, jobs: Sequence[TrialJob]) -> Iterator[Any]:
+        """
+        :return: iterator over the summaries of the jobs, each job followed by its key once it is
+        finished
+        """
+        if self.num_workers == 0:
+            for job in jobs:
+                yield from run_job(job, self.agent_factory, self.env_kwargs)
+                yield job.key
+            return
+        if not jobs:
+            return
+
+        ctx = multiprocessing.get_context(self.start_method)
+        results = ctx.Queue()
+        executor = ProcessPoolExecutor(
+            min(self.num_workers, len(jobs)),
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(results, self.agent_factory, self.env_kwargs),
+        )
+        futures: List[Future] = []
+        try:
+            futures = [executor.submit(_worker, job) for job in jobs]
+            num_finished = 0
+            while num_finished < len(jobs):
+                try:
+                    message = results.get(timeout=1)
+                except queue.Empty:
+                    # a worker that dies, e.g. in the simulator, breaks the pool, which fails every
+                    # unfinished job instead of running it
+                    for future in futures:
+                        if future.done() and future.exception() is not None:
+                            raise RuntimeError(
+                                "Worker exited before finishing its job"
+                            ) from future.exception()
+                    continue
+                if isinstance(message, Exception):
+                    raise message
+                if isinstance(message, str):
+                    num_finished += 1
+                yield message
+        finally:
+            # when the consumer stops early, jobs that have not started are dropped and running ones
+            # finish in the background instead of being waited for
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=all(future.done() for future in futures))
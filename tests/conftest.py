@@ -0,0 +1,98 @@
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pytest
+
+from openlock.envs.openlock_env import OpenLockEnv
+
+
+def _make_fsm_env(
+    scenario_name: str,
+    trial_name: Optional[str] = None,
+    action_limit: int = 3,
+    attempt_limit: int = 10,
+    reward_mode: str = "basic",
+    seed: Optional[int] = None,
+) -> OpenLockEnv:
+    """
+    :param seed: if given, the env is seeded before the trial is selected
+    :return: FSM-only env, set up for a trial
+    """
+    env = OpenLockEnv()
+    env.use_physics = False
+    env.reward_mode = reward_mode
+    if seed is not None:
+        env.seed(seed)
+    env.initialize_for_scenario(scenario_name)
+    env.setup_trial(
+        scenario_name=scenario_name,
+        action_limit=action_limit,
+        attempt_limit=attempt_limit,
+        specified_trial=trial_name,
+        multiproc=True,
+    )
+    return env
+
+
+def _record_trial(
+    scenario_name: str,
+    trial_name: Optional[str],
+    seed: int,
+    reward_mode: str = "basic",
+    active_effect_probability: Optional[float] = None,
+    num_attempts: int = 20,
+    use_reward_tables: bool = False,
+) -> Tuple[OpenLockEnv, List[Sequence[str]], Tuple[np.ndarray, List, List]]:
+    """
+    Steps an env through random attempts that often contain solutions.
+
+    :param active_effect_probability: effect probability of the levers of the delay scenarios
+    :return: the env, its attempts and the observations, rewards and successes of env.step
+    """
+    env = _make_fsm_env(
+        scenario_name, trial_name, reward_mode=reward_mode, attempt_limit=num_attempts
+    )
+    env.use_reward_tables = use_reward_tables
+    if active_effect_probability is not None:
+        env.scenario._active_effect_probability = active_effect_probability
+    random_state = np.random.RandomState(seed)
+    solutions = [
+        [str(action) for action in solution] for solution in env.get_solutions()
+    ]
+    # the delay scenarios have solutions longer than the default action limit
+    env.action_limit = max(len(solution) for solution in solutions)
+    env.seed(seed)
+    attempts, observations, rewards, action_success = [], [], [], []
+    for _ in range(num_attempts):
+        env.reset()
+        if random_state.random_sample() < 0.5:
+            attempt = [
+                random_state.choice(env.action_space) if action == "*" else action
+                for action in solutions[random_state.randint(len(solutions))]
+            ]
+        else:
+            attempt = random_state.choice(env.action_space, env.action_limit)
+        for action_name in attempt:
+            observation, reward, done, info = env.step(env.action_map[action_name])
+            observations.append(observation.copy())
+            rewards.append(reward)
+            action_success.append(info["action_success"])
+        env.finish_attempt()
+        attempts.append(tuple(attempt))
+    return env, attempts, (np.array(observations), rewards, action_success)
+
+
+@pytest.fixture
+def make_fsm_env():
+    """
+    Builds FSM-only envs set up for a trial, see _make_fsm_env.
+    """
+    return _make_fsm_env
+
+
+@pytest.fixture
+def record_trial():
+    """
+    Steps FSM-only envs through random attempts of a trial, see _record_trial.
+    """
+    return _record_trial
@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+
+from openlock.envs.batched_openlock_env import BatchedOpenLockEnv
+
+SCENARIOS = ["CC3D", "CC4D", "CE3D", "CE4D"]
+
+
+def test_matches_single_env(make_fsm_env):
+    rng = np.random.RandomState(0)
+    for scenario in SCENARIOS:
+        trial = "trial1" if "3" in scenario else "trial7"
+        num_envs = 8
+        batched = BatchedOpenLockEnv(
+            num_envs, scenario, action_limit=4, attempt_limit=10, specified_trial=trial
+        )
+        envs = [make_fsm_env(scenario, trial, action_limit=4) for _ in range(num_envs)]
+
+        observations = batched.reset()
+        for i, env in enumerate(envs):
+            assert np.array_equal(env.reset(), observations[i])
+        assert envs[0].action_space == batched.action_space
+
+        for _ in range(4 * 10):
+            actions = rng.randint(0, len(batched.action_space), size=num_envs)
+            observations, rewards, dones, info = batched.step(actions)
+            for i, env in enumerate(envs):
+                action = env.action_map[batched.action_space[actions[i]]]
+                observation, reward, done, _ = env.step(action)
+                assert np.array_equal(
+                    observation, info["terminal_observation"][i]
+                ), scenario
+                assert done == dones[i]
+                assert reward == rewards[i]
+                if done:
+                    env.finish_attempt()
+                    assert (
+                        env.cur_trial.solution_found[-1] == info["attempt_success"][i]
+                    )
+                    assert np.array_equal(env.reset(), observations[i])
+
+
+def test_solutions():
+    for scenario in SCENARIOS:
+        trial = "trial1" if "3" in scenario else "trial7"
+        batched = BatchedOpenLockEnv(
+            1, scenario, action_limit=4, attempt_limit=10, specified_trial=trial
+        )
+        for solution in batched._solutions:
+            # fill the wildcard with a door push, which never changes the state
+            actions = [
+                batched._push_door if action == -1 else action for action in solution
+            ]
+            for action in actions:
+                observations, rewards, dones, info = batched.step([action])
+            assert rewards[0] == batched.reward_strategy.REWARD_OPEN
+            assert info["terminal_observation"][0, -1] == 1
+            assert dones[0] and info["attempt_success"][0]
+        assert batched.trial_success[0]
+
+
+def test_effect_probabilities(make_fsm_env):
+    # the random streams differ from those of the single envs, compare outcome frequencies instead
+    scenario, trial, num_envs = "CE3D", "trial1", 64
+    obj_names = BatchedOpenLockEnv(
+        1, scenario, action_limit=4, attempt_limit=10, specified_trial=trial
+    ).obj_names
+    effect_probabilities = {name: 0.6 for name in obj_names}
+    batched = BatchedOpenLockEnv(
+        num_envs,
+        scenario,
+        action_limit=4,
+        attempt_limit=10,
+        specified_trial=trial,
+        effect_probabilities=effect_probabilities,
+        seed=0,
+    )
+    envs = [
+        make_fsm_env(scenario, trial, action_limit=4, seed=i) for i in range(num_envs)
+    ]
+    # the FSM-only OpenLockEnv.reset drops per-object probabilities, set that of every lever
+    for env in envs:
+        env.scenario._active_effect_probability = 0.6
+        env.reset()
+
+    rng = np.random.RandomState(0)
+    batched_observations, observations = [], []
+    batched_success, success = [], []
+    for _ in range(4 * 10):
+        actions = rng.randint(0, len(batched.action_space), size=num_envs)
+        _, _, dones, info = batched.step(actions)
+        batched_observations.append(info["terminal_observation"])
+        batched_success.extend(info["attempt_success"][dones])
+        for i, env in enumerate(envs):
+            action = env.action_map[batched.action_space[actions[i]]]
+            observation, _, done, _ = env.step(action)
+            observations.append(observation)
+            if done:
+                env.finish_attempt()
+                success.append(env.cur_trial.solution_found[-1])
+                env.reset()
+    assert np.allclose(
+        np.concatenate(batched_observations).mean(axis=0),
+        np.mean(observations, axis=0),
+        atol=0.05,
+    )
+    assert len(success) == len(batched_success)
+    assert abs(np.mean(success) - np.mean(batched_success)) < 0.05
+
+
+def test_reward_mode():
+    with pytest.raises(ValueError, match="basic"):
+        BatchedOpenLockEnv(
+            1, "CC3D", action_limit=4, attempt_limit=10, reward_mode="change_state"
+        )
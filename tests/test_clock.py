@@ -0,0 +1,59 @@
+import time
+
+from openlock.clock import RealClock, VirtualClock
+from openlock.envs.openlock_env import OpenLockEnv
+
+
+def test_virtual_clock():
+    clock = VirtualClock(start_time=10.0, tick_seconds=0.5)
+    clock.tick()
+    clock.tick(2)
+    assert clock.time() == 11.5
+
+    calls = []
+    start = time.time()
+    clock.pause(4, lambda: calls.append(clock.time()))
+    assert time.time() - start < 1
+    assert calls == [15.5]
+
+    start = time.time()
+    RealClock().pause(0.01)
+    assert time.time() - start >= 0.01
+
+
+def test_env_time_source():
+    env = OpenLockEnv()
+    env.use_physics = False
+    env.human_agent = False
+    env.initialize_for_scenario("CC3")
+    env.setup_trial(
+        scenario_name="CC3", action_limit=3, attempt_limit=10, specified_trial="trial1"
+    )
+    clock = env.get_time_source()
+    assert isinstance(clock, VirtualClock)
+
+    env.reset()
+    for action_name in ("push_l0", "push_l1", "push_door"):
+        env.step(env.action_map[action_name])
+    env.finish_attempt()
+
+    attempt = env.cur_trial.attempt_seq[0]
+    assert [action.start_time for action in attempt.action_seq] == [
+        i * clock.tick_seconds for i in range(3)
+    ]
+    assert attempt.end_time == clock.time() == 3 * clock.tick_seconds
+
+    human_env = OpenLockEnv()
+    assert isinstance(human_env.get_time_source(), RealClock)
+
+    # the clock follows human_agent when it is set after setup_trial
+    env = OpenLockEnv()
+    env.use_physics = False
+    env.initialize_for_scenario("CC3")
+    env.setup_trial(
+        scenario_name="CC3", action_limit=3, attempt_limit=10, specified_trial="trial1"
+    )
+    env.human_agent = False
+    env.reset()
+    assert isinstance(env.get_time_source(), VirtualClock)
+    assert env.cur_trial.clock is env.get_time_source()
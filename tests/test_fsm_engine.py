@@ -0,0 +1,104 @@
+import numpy as np
+import openlock.finite_state_machine as finite_state_machine
+from openlock.envs.openlock_env import OpenLockEnv
+from openlock.fsm_engine import Machine
+
+SCENARIOS = ["CC3", "CE3", "CC4", "CE4"]
+
+
+class Model:
+    def __init__(self):
+        self.calls = 0
+
+    def callback(self):
+        self.calls += 1
+
+
+def test_machine():
+    model = Model()
+    machine = Machine(
+        model=model, states=["a", "b", "c"], initial="a", ignore_invalid_triggers=True
+    )
+    machine.add_transition("go", "a", "b", after="callback")
+    # the first transition added for a (trigger, source) pair wins
+    machine.add_transition("go", "a", "c")
+    machine.add_transition(trigger="go", source=["b", "c"], dest="a")
+    machine.add_transition("stay", "*", "c")
+
+    assert model.trigger("go")
+    assert model.state == "b" and model.calls == 1
+    assert model.trigger("go")
+    assert model.state == "a" and model.calls == 1
+    assert model.trigger("stay") and model.state == "c"
+    assert not model.trigger("unknown")
+    machine.set_state("b")
+    assert model.state == "b"
+
+
+def make_env(scenario: str, engine: str) -> OpenLockEnv:
+    finite_state_machine.DEFAULT_ENGINE = engine
+    try:
+        env = OpenLockEnv()
+        env.use_physics = False
+        env.initialize_for_scenario(scenario)
+        env.setup_trial(
+            scenario_name=scenario,
+            action_limit=3,
+            attempt_limit=10,
+            specified_trial="trial1" if "3" in scenario else "trial7",
+        )
+    finally:
+        finite_state_machine.DEFAULT_ENGINE = "internal"
+    return env
+
+
+def test_matches_transitions():
+    rng = np.random.RandomState(0)
+    for scenario in SCENARIOS:
+        internal = make_env(scenario, "internal")
+        reference = make_env(scenario, "transitions")
+        assert np.array_equal(internal.reset(), reference.reset())
+        for _ in range(200):
+            action = internal.action_space[rng.randint(len(internal.action_space))]
+            # effects are deterministic for these scenarios
+            observation, reward, done, _ = internal.step(internal.action_map[action])
+            expected = reference.step(reference.action_map[action])
+            assert np.array_equal(observation, expected[0]), scenario
+            assert (reward, done) == expected[1:3]
+            assert (
+                internal.scenario.fsmm.get_internal_state()
+                == reference.scenario.fsmm.get_internal_state()
+            )
+            if done:
+                internal.finish_attempt()
+                reference.finish_attempt()
+                assert np.array_equal(internal.reset(), reference.reset())
+
+
+def test_state_codes():
+    rng = np.random.RandomState(0)
+    for scenario in SCENARIOS:
+        env = make_env(scenario, "internal")
+        fsmm = env.scenario.fsmm
+        for fsm in (fsmm.observable_fsm, fsmm.latent_fsm):
+            codes = [fsm.encode(state) for state in fsm.state_permutations]
+            assert len(set(codes)) == len(codes)
+            for state, code in zip(fsm.state_permutations, codes):
+                assert fsm.decode(code) == state
+                for var in fsm.vars:
+                    value = fsmm.extract_entity_state(state, var)
+                    assert fsm.get_value(var, code) == value
+                    assert fsm.var_is(var, value, code)
+
+        env.reset()
+        for _ in range(50):
+            action = env.action_space[rng.randint(len(env.action_space))]
+            env.step(env.action_map[action])
+            observable_state = fsmm.observable_fsm.state
+            unlocked = observable_state in env.scenario.door_unlock_criteria
+            assert fsmm.latent_fsm.var_is("door:", "unlocked,") == unlocked
+            for lever_name, state in env.scenario.get_obj_state().items():
+                if lever_name in ("door", "door_lock") or "inactive" in lever_name:
+                    continue
+                value = fsmm.extract_entity_state(observable_state, lever_name + ":")
+                assert state == (value == "pulled,")
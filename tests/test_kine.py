@@ -0,0 +1,73 @@
+import numpy as np
+
+from openlock.kine import (
+    InverseKinematics,
+    KinematicChain,
+    PlanarInverseKinematics,
+    TwoDKinematicTransform,
+    generate_five_arm,
+    planar_delta_theta_dls,
+    planar_error_vec,
+    planar_forward_kinematics,
+    planar_jacobian,
+)
+
+
+def random_problems(num_problems, seed=0):
+    rng = np.random.RandomState(seed)
+    for _ in range(num_problems):
+        base_x, base_y, base_theta = rng.uniform(-2, 2, size=3)
+        base = TwoDKinematicTransform(x=base_x, y=base_y, theta=base_theta)
+        chain = KinematicChain(base, generate_five_arm(*rng.uniform(-3, 3, size=5)))
+        targ_x, targ_y, targ_theta = rng.uniform(-10, 10, size=3)
+        target = TwoDKinematicTransform(x=targ_x, y=targ_y, theta=targ_theta)
+        yield chain, target
+
+
+def test_planar_matches_general():
+    for chain, target in random_problems(20):
+        general = InverseKinematics(chain, target)
+        planar = PlanarInverseKinematics(chain, target)
+
+        jacobian = chain.get_jacobian()
+        np.testing.assert_allclose(
+            chain.get_planar_jacobian(), jacobian[[0, 1, 5]], atol=1e-12
+        )
+        np.testing.assert_allclose(jacobian[[2, 3, 4]], 0)
+        np.testing.assert_allclose(
+            planar.get_error_vec(), general.get_error_vec(), atol=1e-12
+        )
+        np.testing.assert_allclose(planar.get_error(), general.get_error(), atol=1e-12)
+        np.testing.assert_allclose(
+            planar.get_delta_theta_dls(lam=5),
+            general.get_delta_theta_dls(lam=5),
+            atol=1e-12,
+        )
+        np.testing.assert_allclose(
+            planar.get_delta_theta_trans(), general.get_delta_theta_trans(), atol=1e-12
+        )
+
+
+def test_batched_matches_scalar():
+    problems = list(random_problems(10))
+    chain = problems[0][0]
+    bases = [[c.base.x, c.base.y, c.base.theta] for c, _ in problems]
+    thetas = [[link.minus.theta for link in c.chain] for c, _ in problems]
+    targets = [t.get_planar_pose() for _, t in problems]
+
+    joint_positions, end_poses = planar_forward_kinematics(
+        bases, thetas, chain.get_planar_geometry()
+    )
+    jacobians = planar_jacobian(joint_positions)
+    err_vecs = planar_error_vec(end_poses, targets)
+    dthetas = planar_delta_theta_dls(jacobians, err_vecs, lam=5)
+    for i, (chain, target) in enumerate(problems):
+        planar = PlanarInverseKinematics(chain, target)
+        np.testing.assert_allclose(end_poses[i], chain.get_planar_pose(), atol=1e-12)
+        np.testing.assert_allclose(
+            jacobians[i], chain.get_planar_jacobian(), atol=1e-12
+        )
+        np.testing.assert_allclose(err_vecs[i], planar.get_error_vec(), atol=1e-12)
+        np.testing.assert_allclose(
+            dthetas[i], planar.get_delta_theta_dls(lam=5), atol=1e-12
+        )
@@ -0,0 +1,44 @@
+import subprocess
+import sys
+
+import pytest
+
+from openlock.settings_scenario import (
+    SCENARIO_ALIASES,
+    SCENARIO_NAMES,
+    get_scenario_class,
+    select_scenario,
+)
+
+FSM_TRIAL = """
+import sys
+from openlock.envs.openlock_env import OpenLockEnv
+
+env = OpenLockEnv()
+env.use_physics = False
+env.initialize_for_scenario("CE3")
+env.setup_trial(scenario_name="CE3", action_limit=3, attempt_limit=3, multiproc=True)
+env.reset()
+env.step(env.action_map["push_l0"])
+print(" ".join(sorted(name for name in ("Box2D", "shapely", "pyglet") if name in sys.modules)))
+"""
+
+
+def test_fsm_trial_does_not_load_physics():
+    output = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", FSM_TRIAL],
+        check=True,
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    ).stdout
+    assert output.strip() == ""
+
+
+def test_scenario_registry():
+    for scenario_name in SCENARIO_NAMES + list(SCENARIO_ALIASES.keys()):
+        assert isinstance(get_scenario_class(scenario_name), type)
+    for scenario_name in ["CC3_simplified", "CE4", "CC4D"]:
+        scenario = select_scenario(scenario_name, use_physics=False)
+        assert isinstance(scenario, get_scenario_class(scenario_name))
+    with pytest.raises(ValueError):
+        select_scenario("CC5")
@@ -0,0 +1,127 @@
+import numpy as np
+import pytest
+
+from openlock.mdp_compiler import MDPState, TrialMDP, compile_trial
+
+ATTEMPT_LIMIT = 20
+
+
+def outcomes(mdp, state, action_idx):
+    """
+    :return: (next state, reward) of every outcome of an action
+    """
+    row = mdp.state_index[state] * mdp.num_actions + action_idx
+    return [
+        (mdp.states[mdp.next_states[i]], mdp.rewards[i])
+        for i in range(mdp.offsets[row], mdp.offsets[row + 1])
+    ]
+
+
+def test_optimal_policy_solves_trial(make_fsm_env):
+    # the basic rewards do not favour new solutions over repeating one
+    mdp = compile_trial("CC3", "trial1", "unique_solutions", action_limit=3)
+    values, policy = mdp.value_iteration(gamma=0.9)
+    assert values[0] > 0
+    env = make_fsm_env("CC3", "trial1", 3, ATTEMPT_LIMIT, "unique_solutions")
+    env.reset()
+    state = mdp.states[0]
+    for _ in range(len(env.get_solutions())):
+        for _ in range(3):
+            action_idx = policy[mdp.state_index[state]]
+            env.step(env.action_map[mdp.action_space[action_idx]])
+            # the actions of CC3 always have an effect
+            ((state, _),) = outcomes(mdp, state, action_idx)
+        env.finish_attempt()
+        env.reset()
+    assert len(env.get_completed_solutions()) == len(env.get_solutions())
+    assert mdp.terminal[mdp.state_index[state]]
+
+
+@pytest.mark.parametrize(
+    "scenario_name,trial_name,reward_mode,active_effect_probability",
+    [
+        ("CC3", "trial1", "negative_immovable_negative_repeat", None),
+        ("CE4", "trial7", "change_state_unique_solutions", None),
+        (
+            "CC3D",
+            "trial1",
+            "negative_immovable_partial_action_seq_solution_multiplier_door_seq",
+            0.7,
+        ),
+        ("CE4D", "trial7", "negative_immovable_partial_action_seq", 0.5),
+    ],
+)
+def test_env_steps_are_outcomes(
+    make_fsm_env, scenario_name, trial_name, reward_mode, active_effect_probability
+):
+    action_limit = 4 if scenario_name.endswith("D") else 3
+    env = make_fsm_env(
+        scenario_name, trial_name, action_limit, ATTEMPT_LIMIT, reward_mode
+    )
+    env.reset()
+    if active_effect_probability is not None:
+        env.scenario._active_effect_probability = active_effect_probability
+    env.seed(0)
+    mdp = TrialMDP.compile(env, reward_mode)
+    assert mdp.states[0].scenario_state == env.scenario.snapshot()
+    np.testing.assert_allclose(
+        np.bincount(
+            mdp._rows, weights=mdp.probabilities, minlength=len(mdp.offsets) - 1
+        ),
+        np.where(np.repeat(mdp.terminal, mdp.num_actions), 0.0, 1.0),
+    )
+
+    random_state = np.random.RandomState(0)
+    state = mdp.states[0]
+    for _ in range(ATTEMPT_LIMIT):
+        for _ in range(action_limit):
+            action_idx = random_state.randint(mdp.num_actions)
+            _, reward, _, _ = env.step(env.action_map[mdp.action_space[action_idx]])
+            next_states = outcomes(mdp, state, action_idx)
+            if state.num_actions + 1 == action_limit:
+                env.finish_attempt()
+                env.reset()
+                # the env resets the effect probabilities of its scenario
+                if active_effect_probability is not None:
+                    env.scenario._active_effect_probability = active_effect_probability
+                assert len({next_state for next_state, _ in next_states}) == 1
+                assert reward in [outcome_reward for _, outcome_reward in next_states]
+                state = next_states[0][0]
+                assert state.completed_solutions == sum(
+                    1 << env.get_solutions().index(solution)
+                    for solution in env.get_completed_solutions()
+                )
+            else:
+                ((state, outcome_reward),) = [
+                    outcome
+                    for outcome in next_states
+                    if outcome[0].scenario_state == env.scenario.snapshot()
+                ]
+                assert outcome_reward == reward
+        if mdp.terminal[mdp.state_index[state]]:
+            break
+
+
+def test_solvers_agree(make_fsm_env):
+    env = make_fsm_env(
+        "CE3D", "trial1", 4, ATTEMPT_LIMIT, "negative_immovable_solution_multiplier"
+    )
+    env.reset()
+    env.scenario._active_effect_probability = 0.8
+    mdp = TrialMDP.compile(env, "negative_immovable_solution_multiplier")
+    assert isinstance(mdp.states[0], MDPState)
+    vi_values, vi_policy = mdp.value_iteration(gamma=0.95, tol=1e-9)
+    pi_values, pi_policy = mdp.policy_iteration(gamma=0.95, tol=1e-9)
+    np.testing.assert_allclose(pi_values, vi_values, atol=1e-6)
+    q_values = mdp.q_values(vi_values, 0.95)
+    states = np.arange(mdp.num_states)
+    np.testing.assert_allclose(
+        q_values[states, pi_policy], q_values[states, vi_policy], atol=1e-6
+    )
+    np.testing.assert_allclose(
+        mdp.evaluate_policy(vi_policy, 0.95, tol=1e-9), vi_values, atol=1e-6
+    )
+
+    with pytest.raises(ValueError):
+        env.use_physics = True
+        TrialMDP.compile(env)
@@ -0,0 +1,39 @@
+import pytest
+from openlock.envs.openlock_env import OpenLockEnv
+
+ATTEMPTS = [
+    ("push_l0", "push_l1", "push_door"),
+    ("push_l0", "push_l2", "push_door"),
+    ("push_l1", "pull_l0", "push_door"),
+    ("push_l0", "pull_l0", "push_l2"),
+    ("push_inactive0", "pull_inactive1", "push_door"),
+]
+
+
+def run_attempts(physics_mode):
+    env = OpenLockEnv()
+    env.use_physics = True
+    env.human_agent = False
+    env.physics_mode = physics_mode
+    env.initialize_for_scenario("CC3")
+    env.setup_trial(
+        scenario_name="CC3", action_limit=3, attempt_limit=10, specified_trial="trial1"
+    )
+    outcomes = []
+    for attempt in ATTEMPTS:
+        env.reset()
+        for action_name in attempt:
+            obs, reward, _, _ = env.step(env.action_map[action_name])
+            obj_states = env.get_state()["OBJ_STATES"]
+            outcomes.append((list(obs), reward, obj_states))
+        env.finish_attempt()
+    return outcomes
+
+
+def test_kinematic_matches_dynamic():
+    dynamic = run_attempts("dynamic")
+    kinematic = run_attempts("kinematic")
+    assert kinematic == dynamic
+
+    with pytest.raises(ValueError):
+        run_attempts("teleport")
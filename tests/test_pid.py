@@ -0,0 +1,61 @@
+import numpy as np
+import openlock.common as common
+from openlock.envs.openlock_env import OpenLockEnv
+from openlock.envs.world_defs.openlock_def import ArmLockDefBatch
+from openlock.pid_central import ArrayPIDController, PIDController
+from openlock.settings_render import BOX2D_SETTINGS
+
+
+def test_array_pid_controller():
+    rng = np.random.RandomState(0)
+    setpoint = rng.uniform(-np.pi, np.pi, size=5)
+    args = ([10] * 5, [1] * 5, [0.5] * 5, list(setpoint), 0.002)
+    kwargs = dict(max_out=1.5, err_wrap_func=common.wrapToMinusPiToPi)
+    reference = PIDController(*args, **kwargs)
+    controller = ArrayPIDController(*args, **kwargs)
+    for i in range(50):
+        if i == 25:
+            setpoint = rng.uniform(-np.pi, np.pi, size=5)
+            reference.set_setpoint(list(setpoint))
+            controller.set_setpoint(setpoint)
+        current = rng.uniform(-4, 4, size=5)
+        assert list(controller.update(current)) == reference.update(list(current))
+        assert list(controller.error) == reference.error
+
+    # stacked controllers share their state with the batch
+    controllers = [ArrayPIDController(*args, **kwargs) for _ in range(3)]
+    batch = ArrayPIDController.stack(controllers)
+    current = rng.uniform(-4, 4, size=(3, 5))
+    out = batch.update(current)
+    assert (controllers[1].error == batch.error[1]).all()
+    controllers[1].set_setpoint(np.zeros(5))
+    assert (batch.setpoint[1] == 0).all()
+    assert (ArrayPIDController(*args, **kwargs).update(current[2]) == out[2]).all()
+
+
+def test_arm_lock_def_batch():
+    env = OpenLockEnv()
+    env.use_physics = True
+    env.human_agent = False
+    env.initialize_for_scenario("CC3")
+    env.setup_trial(
+        scenario_name="CC3", action_limit=3, attempt_limit=10, specified_trial="trial1"
+    )
+    world_defs = [env.init_world_def() for _ in range(4)]
+    batch = ArmLockDefBatch(world_defs[:2])
+    step_args = (
+        1.0 / BOX2D_SETTINGS["FPS"],
+        BOX2D_SETTINGS["VEL_ITERS"],
+        BOX2D_SETTINGS["POS_ITERS"],
+    )
+    setpoints = [[0.5, -0.5, 0.3, 0.2, 0.1], [-0.5, 0.4, 0.3, -0.2, 0.0]]
+    for i in range(2):
+        world_defs[i].set_controllers(setpoints[i])
+        world_defs[i + 2].set_controllers(setpoints[i])
+    for _ in range(100):
+        batch.step(*step_args)
+        world_defs[2].step(*step_args)
+        world_defs[3].step(*step_args)
+    for i in range(2):
+        assert world_defs[i].get_abs_config() == world_defs[i + 2].get_abs_config()
+    assert world_defs[0].get_abs_config() != world_defs[1].get_abs_config()
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from openlock.replay import ReplayRecord, TrialReplayer, replay_records
+
+REWARD_MODES = [
+    "basic",
+    "change_state",
+    "unique_solutions",
+    "change_state_unique_solutions",
+    "negative_immovable",
+    "negative_immovable_unique_solutions",
+    "negative_immovable_partial_action_seq",
+    "negative_immovable_negative_repeat",
+    "negative_immovable_solution_multiplier",
+    "negative_immovable_partial_action_seq_solution_multiplier",
+    "negative_immovable_partial_action_seq_solution_multiplier_door_seq",
+]
+ATTEMPT_LIMIT = 20
+
+
+def make_record(env, attempts, seed):
+    return ReplayRecord(
+        env.cur_trial.scenario_name,
+        env.cur_trial.name,
+        tuple(attempts),
+        seed,
+        env.action_limit,
+        ATTEMPT_LIMIT,
+    )
+
+
+@pytest.mark.parametrize(
+    "scenario_name,trial_name,active_effect_probability",
+    [("CC3", "trial1", None), ("CE4", "trial7", None), ("CC3D", "trial1", 0.7)],
+)
+def test_replay_matches_env(
+    record_trial, scenario_name, trial_name, active_effect_probability
+):
+    replayer = TrialReplayer(scenario_name, trial_name)
+    if active_effect_probability is not None:
+        replayer.scenario._active_effect_probability = active_effect_probability
+    for reward_mode in REWARD_MODES:
+        env, attempts, (observations, rewards, action_success) = record_trial(
+            scenario_name, trial_name, 3, reward_mode, active_effect_probability
+        )
+        record = make_record(env, attempts, 3)
+        result = replayer.replay(record, reward_mode)
+        np.testing.assert_array_equal(result.observations, observations)
+        assert result.rewards.tolist() == rewards
+        assert result.action_success.tolist() == action_success
+        assert result.attempt_offsets.tolist() == list(
+            range(0, len(rewards) + 1, record.action_limit)
+        )
+        assert result.attempt_success.tolist() == env.cur_trial.solution_found
+        if active_effect_probability is not None:
+            # the scenario's effect draws change the replay
+            reseeded = replayer.replay(record._replace(seed=4), reward_mode)
+            assert not np.array_equal(reseeded.observations, observations)
+
+
+def test_workers_match_inline(record_trial):
+    # records of the trials selected by setup_trial
+    records = [
+        make_record(*record_trial(scenario_name, None, seed)[:2], seed)
+        for scenario_name in ["CC3", "CE4", "CE3D"]
+        for seed in range(4)
+    ]
+    inline = replay_records(records, reward_mode="change_state", num_workers=0)
+    parallel = replay_records(
+        records, reward_mode="change_state", num_workers=2, chunksize=3
+    )
+    assert len(parallel) == len(records)
+    for a, b in zip(inline, parallel):
+        for x, y in zip(a, b):
+            np.testing.assert_array_equal(x, y)
+
+
+def test_from_trial_log(record_trial):
+    env, attempts, (_, rewards, _) = record_trial("CE3", "trial1", 5)
+    record = make_record(env, attempts, 5)
+    env.cur_trial.finish(env.get_time_source().time())
+    env.cur_trial.random_seed = 5
+    assert (
+        ReplayRecord.from_trial_log(env.cur_trial, attempt_limit=ATTEMPT_LIMIT)
+        == record
+    )
+    (result,) = replay_records([record], num_workers=0)
+    assert result.rewards.tolist() == rewards
+
+    with pytest.raises(ValueError):
+        TrialReplayer("CE3", "trial2").replay(record)
+    with pytest.raises(ValueError):
+        replay_records(
+            [record._replace(attempts=(("push_l9",),))], num_workers=0,
+        )
@@ -0,0 +1,116 @@
+import copy
+
+import numpy as np
+from openlock.envs.openlock_env import OpenLockEnv
+from openlock.logger_env import (
+    AttemptLog,
+    ResultsTable,
+    ResultsWriter,
+    read_results,
+    reserve_results_path,
+)
+
+
+def test_results_table():
+    col_label = ["frame", "a", "b"]
+    table = ResultsTable(col_label, capacity=2)
+    rows = [[i, i % 2, 1 - i % 2] for i in range(5)]
+    for row in rows:
+        table.append(row)
+
+    assert len(table) == len(rows) + 1
+    assert table[0] == col_label
+    assert list(table[-1]) == rows[-1]
+    assert list(table[2]) == rows[1]
+    assert table[1:] == rows
+    assert table.to_list() == [col_label] + rows
+
+    table_copy = copy.deepcopy(table)
+    table.clear()
+    assert len(table) == 1
+    assert table_copy.to_list() == [col_label] + rows
+
+    attempt = AttemptLog(0, 0)
+    attempt.results = table_copy
+    list_attempt = AttemptLog(0, 0)
+    list_attempt.results = [col_label] + rows
+    assert attempt.pretty_str_results() == list_attempt.pretty_str_results()
+
+
+def test_env_results():
+    env = OpenLockEnv()
+    env.use_physics = False
+    env.initialize_for_scenario("CC3")
+    env.setup_trial(
+        scenario_name="CC3", action_limit=3, attempt_limit=10, specified_trial="trial1"
+    )
+    obs = env.reset()
+    agent_col = env.col_label.index("agent")
+    assert len(env.results) == 2
+    assert list(env.results[1][1:agent_col]) == list(obs)
+
+    for action_idx in (0, 3, 5):
+        action_name = env.action_space[action_idx]
+        obs, _, _, info = env.step(env.action_map[action_name])
+        results = info["results"]
+        pre_obs, post_obs = results[-2], results[-1]
+        assert pre_obs[0] == post_obs[0] - 1 == env.action_count - 1
+        assert pre_obs[env.col_label.index(action_name)] == 1
+        assert list(post_obs[1:agent_col]) == list(obs)
+        assert not post_obs[agent_col + 1 :].any()
+
+    # step returns a view of the results, a snapshot of them outlives the attempt
+    assert np.shares_memory(results.rows, env.results.rows)
+    assert not results.rows.flags.writeable
+    kept = results.snapshot()
+    rows = kept.to_list()
+    env.finish_attempt()
+    env.reset()
+    env.step(env.action_map[env.action_space[0]])
+    assert kept.to_list() == rows
+    assert not kept.rows.flags.writeable
+
+
+def test_results_writer(tmp_path):
+    save_path = str(tmp_path) + "/"
+    (tmp_path / "results0.csv").write_text("")
+    col_label = ["frame", "a", "b"]
+    rows = [[i, i % 2, 1 - i % 2] for i in range(10)]
+    writer = ResultsWriter(col_label, save_path, chunk_size=3)
+    assert writer.path == save_path + "results1.csv"
+    writer.extend(rows[:4])
+    writer.flush()
+    assert read_results(writer.path).to_list() == [col_label] + rows[:4]
+    writer.extend(rows[4:])
+    writer.close()
+    assert read_results(writer.path).to_list() == [col_label] + rows
+    assert reserve_results_path(save_path) == save_path + "results2.csv"
+
+
+def test_env_results_stream(tmp_path):
+    save_path = str(tmp_path) + "/"
+    env = OpenLockEnv()
+    env.use_physics = False
+    env.initialize_for_scenario("CC3")
+    env.setup_trial(
+        scenario_name="CC3", action_limit=3, attempt_limit=10, specified_trial="trial1"
+    )
+    env.save_path = save_path
+    env.reset()
+    exported = env._export_results()
+    writer = env.start_results_stream()
+    streamed = []
+    for attempt in range(3):
+        if attempt > 0:
+            env.reset()
+        for action_idx in (0, 3, 5):
+            env.step(env.action_map[env.action_space[action_idx]])
+        streamed.extend(env.results[1:])
+        env.finish_attempt()
+    env.stop_results_stream()
+
+    assert writer.path == save_path + "results1.csv"
+    assert read_results(writer.path).to_list() == [env.col_label] + streamed
+    exported.close()
+    assert exported.path == save_path + "results0.csv"
+    assert read_results(exported.path).to_list() == [env.col_label] + streamed[:1]
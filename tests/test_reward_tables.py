@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from openlock.rewards import RewardTable
+from openlock.solution_automaton import SolutionAutomaton
+
+REWARD_MODES = [
+    "basic",
+    "change_state",
+    "unique_solutions",
+    "change_state_unique_solutions",
+    "negative_immovable",
+    "negative_immovable_unique_solutions",
+    "negative_immovable_partial_action_seq",
+    "negative_immovable_negative_repeat",
+    "negative_immovable_solution_multiplier",
+    "negative_immovable_partial_action_seq_solution_multiplier",
+    "negative_immovable_partial_action_seq_solution_multiplier_door_seq",
+]
+ATTEMPT_LIMIT = 20
+
+
+@pytest.mark.parametrize(
+    "scenario_name,trial_name,active_effect_probability",
+    [("CC3", "trial1", None), ("CE4", "trial7", None), ("CE4D", "trial7", 0.6)],
+)
+def test_tables_match_reward_functions(
+    record_trial, scenario_name, trial_name, active_effect_probability
+):
+    for reward_mode in REWARD_MODES:
+        rewards = [
+            record_trial(
+                scenario_name,
+                trial_name,
+                0,
+                reward_mode,
+                active_effect_probability,
+                use_reward_tables=use_reward_tables,
+            )[2][1]
+            for use_reward_tables in (False, True)
+        ]
+        assert rewards[1] == rewards[0]
+
+
+def test_table_layout():
+    automaton = SolutionAutomaton(
+        [["push_l0", "push_door"], ["push_l1", "pull_l1", "push_door"]]
+    )
+    action_space = ["push_l0", "push_l1", "pull_l1", "push_door"]
+    table = RewardTable("basic", automaton, action_space, 3, ATTEMPT_LIMIT)
+    # progress: (1, first), (1, second), (1, none), (2, first), (2, second), (2, none),
+    # (3, second), (3, none)
+    assert table.rewards.shape == (8, 4, 8, 4)
+    assert table.rewards.max() == 50
+    # the rewards only tell pushing the door from the other actions
+    np.testing.assert_array_equal(table.rewards[..., 0], table.rewards[..., 2])
+
+    with pytest.raises(ValueError):
+        RewardTable("unknown", automaton, action_space, 3, ATTEMPT_LIMIT)
@@ -0,0 +1,46 @@
+import numpy as np
+
+from openlock.common import UniformBlocks
+from openlock.envs.openlock_env import OpenLockEnv
+
+ACTIONS = ["push_l0", "push_l1", "push_l2", "pull_l0", "pull_l1", "push_door"]
+
+
+def test_uniform_blocks():
+    blocks = UniformBlocks(np.random.default_rng(0), block_size=5)
+    samples = [blocks.sample() for _ in range(3)]
+    samples += list(blocks.take(9))
+    samples += [blocks.sample() for _ in range(4)]
+    assert samples == list(np.random.default_rng(0).random(16))
+
+
+def run_trial(make_fsm_env, seed, global_seed):
+    np.random.seed(global_seed)
+    env = make_fsm_env("CE4D", action_limit=4, seed=seed)
+    # the delay scenarios draw the effects of actions themselves
+    env.scenario._active_effect_probability = 0.5
+    observations = []
+    for _ in range(10):
+        env.reset()
+        for action_name in ACTIONS[:4]:
+            observations.append(env.step(env.action_map[action_name])[0].copy())
+        env.finish_attempt()
+    return env.cur_trial.name, np.array(observations)
+
+
+def test_seeded_envs(make_fsm_env):
+    trial_name, observations = run_trial(make_fsm_env, 1, 0)
+    # independent of the global NumPy RNG
+    other_trial_name, other_observations = run_trial(make_fsm_env, 1, 1)
+    assert other_trial_name == trial_name
+    np.testing.assert_array_equal(other_observations, observations)
+
+    different = [run_trial(make_fsm_env, seed, 0) for seed in range(2, 6)]
+    assert any(name != trial_name for name, _ in different)
+    assert not any(np.array_equal(obs, observations) for _, obs in different)
+
+
+def test_unseeded_envs_are_independent():
+    np.random.seed(0)
+    a, b = OpenLockEnv(), OpenLockEnv()
+    assert not np.array_equal(a.random_blocks.take(8), b.random_blocks.take(8))
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from openlock import software_rendering
+from openlock.envs.openlock_env import OpenLockEnv
+from openlock.settings_render import RENDER_SETTINGS
+
+WHITE = [255, 255, 255]
+
+
+def test_viewer_primitives():
+    viewer = software_rendering.Viewer(40, 20)
+    viewer.set_bounds(0, 40, 0, 20)
+    viewer.draw_polygon([(0, 0), (10, 0), (10, 5), (0, 5)], color=(1, 0, 0))
+    viewer.draw_line((20, 10.5), (30, 10.5), color=(0, 0, 1))
+    viewer.draw_circle(2, color=(0, 1, 0)).add_attr(
+        software_rendering.Transform(translation=(35, 15))
+    )
+    out = np.zeros((20, 40, 3), dtype=np.uint8)
+    frame = viewer.render(return_rgb_array=True, out=out)
+    assert frame is out
+
+    # row 0 is the top of the window
+    assert (frame[15:, :10] == [255, 0, 0]).all()
+    assert (frame[:15, :10] == WHITE).all()
+    assert (frame[9, 20:30] == [0, 0, 255]).all()
+    assert (frame[5, 35] == [0, 255, 0]).all()
+    assert (frame[5, 25] == WHITE).all()
+    # one-time geoms are cleared after rendering
+    np.testing.assert_array_equal(viewer.get_array(), out)
+    assert (viewer.render(return_rgb_array=True) == WHITE).all()
+
+    with pytest.raises(ValueError):
+        viewer.render(out=np.zeros((20, 40, 3)))
+
+
+def test_env_rgb_array():
+    env = OpenLockEnv()
+    env.use_physics = True
+    env.human_agent = False
+    env.physics_mode = "kinematic"
+    env.initialize_for_scenario("CC3")
+    env.setup_trial(
+        scenario_name="CC3", action_limit=3, attempt_limit=10, specified_trial="trial1"
+    )
+    env.reset()
+    frame = env.render(mode="rgb_array").copy()
+    assert frame.shape == (800, 800, 3) and frame.dtype == np.uint8
+    colors = {tuple(color) for color in frame.reshape(-1, 3)}
+    for name in ("active", "inactive", "static"):
+        color = RENDER_SETTINGS["COLORS"][name]
+        assert tuple(round(c * 255) for c in color) in colors
+
+    env.step(env.action_map["push_l0"])
+    out = np.empty_like(frame)
+    assert env.render(mode="rgb_array", out=out) is out
+    assert (out != frame).any()
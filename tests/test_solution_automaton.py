@@ -0,0 +1,90 @@
+import numpy as np
+from openlock.logger_env import TrialLog
+from openlock.solution_automaton import SolutionAutomaton
+
+SOLUTIONS = [
+    ["push_l0", "push_l1", "push_door"],
+    ["push_l0", "*", "push_door"],
+    ["pull_l2", "push_door"],
+    ["push_l1", "push_l0", "push_door", "push_door"],
+]
+ACTIONS = ["push_l0", "push_l1", "pull_l2", "push_door"]
+
+
+def agrees(action_seq, solution):
+    return all(
+        solution_action == "*" or action == solution_action
+        for action, solution_action in zip(action_seq, solution)
+    )
+
+
+def test_matches():
+    automaton = SolutionAutomaton(SOLUTIONS)
+    rng = np.random.RandomState(0)
+    for _ in range(500):
+        action_seq = list(rng.choice(ACTIONS, size=rng.randint(0, 6)))
+        matches = automaton.run(action_seq)
+        expected = [agrees(action_seq, solution) for solution in SOLUTIONS]
+        assert SolutionAutomaton.indices(matches) == [
+            i for i, match in enumerate(expected) if match
+        ]
+        assert SolutionAutomaton.first(matches) == (
+            expected.index(True) if any(expected) else -1
+        )
+        partial = automaton.partial(matches, len(action_seq))
+        assert SolutionAutomaton.indices(partial) == [
+            i
+            for i, solution in enumerate(SOLUTIONS)
+            if expected[i] and len(action_seq) <= len(solution)
+        ]
+        complete = automaton.complete(matches, len(action_seq))
+        assert SolutionAutomaton.indices(complete) == [
+            i
+            for i, solution in enumerate(SOLUTIONS)
+            if expected[i] and len(action_seq) == len(solution)
+        ]
+
+
+def test_trial_log():
+    trial = TrialLog("trial", "scenario", SOLUTIONS, 0)
+    attempts = [
+        ["push_l0", "push_l1", "push_door"],
+        ["push_l0", "push_l1", "push_door"],
+        ["push_l0", "pull_l2", "push_door"],
+        ["pull_l2", "push_door", "push_l0"],
+        ["push_l1", "push_l1", "push_door"],
+    ]
+    for attempt in attempts:
+        trial.add_attempt()
+        trial.finish_attempt([], attempt)
+    assert trial.solution_found == [True, False, True, True, False]
+    assert trial.completed_solutions == [SOLUTIONS[0], SOLUTIONS[1], SOLUTIONS[2]]
+    assert not trial.success
+
+
+def test_solution_rewards(make_fsm_env):
+    # rewards for unlocking the door and for partial solutions, with repeated solutions
+    expected = {
+        "basic": [[0, 10, 50], [0, 10, 50], [0, 10, 50]],
+        "unique_solutions": [[0, 10, 50], [0, 0, 0], [0, 10, 50]],
+        "negative_immovable_partial_action_seq": [
+            [1, 10, 50],
+            [1, 10, 50],
+            [1, 10, 50],
+        ],
+    }
+    attempts = [
+        ["push_l0", "push_l1", "push_door"],
+        ["push_l0", "push_l1", "push_door"],
+        ["push_l0", "push_l2", "push_door"],
+    ]
+    for reward_mode, attempt_rewards in expected.items():
+        env = make_fsm_env("CC3", "trial1", reward_mode=reward_mode)
+        rewards = []
+        for attempt in attempts:
+            env.reset()
+            rewards.append(
+                [env.step(env.action_map[action_name])[1] for action_name in attempt]
+            )
+            env.finish_attempt()
+        assert rewards == attempt_rewards, reward_mode
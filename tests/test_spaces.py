@@ -0,0 +1,61 @@
+import numpy as np
+from openlock.envs.openlock_env import ActionSpace, OpenLockEnv
+
+
+def test_spaces_cached(make_fsm_env):
+    env = make_fsm_env("CC3", "trial1")
+    obs = env.reset()
+    action_map = env.action_map
+    observation_space = env.observation_space
+    env.finish_attempt()
+    assert np.array_equal(env.reset(), obs)
+    assert env.action_map is action_map
+    assert env.observation_space is observation_space
+
+    other = make_fsm_env("CC3", "trial1")
+    other.reset()
+    assert other.action_map is action_map
+    assert other.observation_space.multi_discrete is observation_space.multi_discrete
+
+    # the cached spaces match freshly built ones
+    fresh = ActionSpace.create_action_space(env, env.obj_map)
+    assert fresh[0] == env.action_space
+    assert fresh[1].keys() == env.action_map.keys()
+
+    other = make_fsm_env("CC3", "trial2")
+    other.reset()
+    assert other.action_map is not action_map
+
+
+def test_observation_out():
+    for scenario, trial in (("CE3", "trial1"), ("CC4D", "trial7")):
+        env = OpenLockEnv()
+        env.use_physics = False
+        env.lever_index_mode = "position"
+        env.initialize_for_scenario(scenario)
+        env.setup_trial(
+            scenario_name=scenario,
+            action_limit=3,
+            attempt_limit=10,
+            specified_trial=trial,
+        )
+        obs = env.reset()
+        out = np.zeros_like(obs)
+        state, labels = env.get_discrete_state(out=out)
+        assert state is out and state.dtype == np.int8
+        assert np.array_equal(out, obs)
+
+        num_levers = len(env.levers)
+        positions = [
+            action.split("_", 1)[1] for action in env.action_space[:num_levers]
+        ]
+        assert labels == (
+            positions + [p + "_active" for p in positions] + ["door_lock", "door"]
+        )
+        (
+            state,
+            internal_labels,
+        ) = env.observation_space.create_discrete_observation_from_fsm(env)
+        assert np.array_equal(state, obs)
+        for lever in env.levers:
+            assert internal_labels.index(lever.name) < num_levers
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from openlock.envs.openlock_env import OpenLockEnv
+from openlock.envs.subproc_openlock_env import SubprocOpenLockEnv
+
+ACTIONS = ["push_l0", "push_l1", "push_door"]
+
+
+def test_subproc_env():
+    env = OpenLockEnv()
+    env.use_physics = True
+    env.human_agent = False
+    env.initialize_for_scenario("CC3")
+    env.setup_trial(
+        scenario_name="CC3", action_limit=3, attempt_limit=2, specified_trial="trial1"
+    )
+    expected = [env.reset()]
+    expected_rewards = []
+    for action_name in ACTIONS:
+        obs, reward, _, _ = env.step(env.action_map[action_name])
+        expected.append(obs)
+        expected_rewards.append(reward)
+
+    num_envs = 2
+    envs = SubprocOpenLockEnv(
+        num_envs, "CC3", action_limit=3, attempt_limit=2, specified_trial="trial1"
+    )
+    try:
+        obs = envs.reset()
+        assert envs.action_spaces == [list(env.action_space)] * num_envs
+        assert (obs == expected[0]).all()
+        for i, action_name in enumerate(ACTIONS):
+            action = env.action_space.index(action_name)
+            envs.step_async([action] * num_envs)
+            obs, rewards, dones, info = envs.step_wait()
+            assert (info["terminal_observation"] == expected[i + 1]).all()
+            assert (rewards == expected_rewards[i]).all()
+            assert (dones == (i == len(ACTIONS) - 1)).all()
+        # attempts auto-reset
+        assert (obs == expected[0]).all()
+        assert info["attempt_success"].all()
+        assert not info["trial_finished"].any()
+    finally:
+        envs.close()
+
+
+def test_failed_worker():
+    envs = SubprocOpenLockEnv(
+        2,
+        "CC3",
+        action_limit=3,
+        attempt_limit=2,
+        specified_trial="trial1",
+        use_physics=False,
+    )
+    envs.reset()
+    try:
+        with pytest.raises(RuntimeError):
+            envs.step([999, 0])
+        assert not envs.waiting
+    finally:
+        envs.close()
+    assert not any(process.is_alive() for process in envs._processes)
+
+
+def test_new_trials():
+    num_envs = 2
+    envs = SubprocOpenLockEnv(
+        num_envs, "CC3", action_limit=1, attempt_limit=1, use_physics=False, seed=0
+    )
+    try:
+        envs.reset()
+        trial_names = [[name] for name in envs.trial_names]
+        # every step finishes a trial, CC3 has 6 of them
+        for _ in range(5):
+            _, _, _, info = envs.step([0] * num_envs)
+            assert info["trial_finished"].all()
+            for names, name in zip(trial_names, envs.trial_names):
+                names.append(name)
+    finally:
+        envs.close()
+    for names in trial_names:
+        assert len(set(names)) == 6
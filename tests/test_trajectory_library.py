@@ -0,0 +1,72 @@
+import numpy as np
+
+from openlock.envs.openlock_env import OpenLockEnv
+from openlock.trajectory_library import TrajectoryLibrary
+
+ATTEMPTS = [
+    ("push_l0", "pull_l0", "push_door"),
+    ("push_l1", "push_l0", "push_door"),
+]
+
+
+def make_env(trajectory_library=None):
+    env = OpenLockEnv()
+    env.use_physics = True
+    env.human_agent = False
+    env.physics_mode = "kinematic"
+    env.trajectory_library = trajectory_library
+    env.initialize_for_scenario("CC3")
+    env.setup_trial(
+        scenario_name="CC3", action_limit=3, attempt_limit=10, specified_trial="trial1"
+    )
+    return env
+
+
+def run_attempts(env):
+    outcomes = []
+    for attempt in ATTEMPTS:
+        env.reset()
+        for action_name in attempt:
+            obs, reward, _, _ = env.step(env.action_map[action_name])
+            outcomes.append((list(obs), reward, env.world_def.get_abs_config()))
+        env.finish_attempt()
+    return outcomes
+
+
+def test_save_load(tmp_path):
+    library = TrajectoryLibrary()
+    library.add(library.make_key([0, 0, 0, 1, 2], [3, 4, 5]), np.ones((2, 2)))
+    library.add(library.make_key([0, 0, 0, 1, 2], [3, 4, 6]), np.zeros((0, 2)))
+    path = str(tmp_path / "trajectories")
+    library.save(path)
+
+    loaded = TrajectoryLibrary(path)
+    assert len(loaded) == 2
+    for key, trajectory in library.trajectories.items():
+        np.testing.assert_array_equal(loaded.get(key), trajectory)
+    assert loaded.get(library.make_key([0, 0, 0, 1, 2], [0, 0, 0])) is None
+    assert (loaded.hits, loaded.misses) == (2, 1)
+
+
+def test_reused_trajectories_match(tmp_path):
+    env = make_env()
+    planned = run_attempts(env)
+    path = str(tmp_path / "trajectories.npz")
+    env.trajectory_library.save(path)
+
+    library = TrajectoryLibrary(path)
+    reused = run_attempts(make_env(library))
+    assert library.misses == 0
+    assert reused == planned
+
+
+def test_precompute_trajectories():
+    env = make_env()
+    env.reset()
+    env.precompute_trajectories()
+    library = env.trajectory_library
+    assert len(library) > 0
+    # the arm starts every attempt at rest, so the first approach is in the library
+    env.reset()
+    env.step(env.action_map["push_l0"])
+    assert library.hits == 1
@@ -0,0 +1,45 @@
+import copy
+import pickle
+
+from openlock.envs.openlock_env import OpenLockEnv
+
+
+def test_attempt_records():
+    env = OpenLockEnv()
+    env.use_physics = False
+    env.initialize_for_scenario("CC3")
+    env.setup_trial(
+        scenario_name="CC3", action_limit=3, attempt_limit=10, specified_trial="trial1"
+    )
+    attempts = [("push_l0", "push_l1", "push_door"), ("pull_l0", "push_l2", "push_l1")]
+    results = []
+    for action_names in attempts:
+        env.reset()
+        for action_name in action_names:
+            env.step(env.action_map[action_name])
+        results.append(env.results.to_list())
+        env.finish_attempt()
+
+    trial = env.cur_trial
+    assert len(trial.attempt_seq) == len(attempts)
+    for attempt_num, (attempt, action_names, attempt_results) in enumerate(
+        zip(trial.attempt_seq, attempts, results)
+    ):
+        assert attempt.attempt_num == attempt_num
+        assert [str(action) for action in attempt.action_seq] == list(action_names)
+        assert attempt.reward == sum(action.reward for action in attempt.action_seq)
+        assert all(action.end_time is not None for action in attempt.action_seq)
+        # the environment reuses its results table, the recorded attempts keep their own
+        assert attempt.results.to_list() == attempt_results
+        assert attempt.results is not env.results
+        assert attempt.end_time >= attempt.start_time
+    assert trial.attempt_seq[0].success
+    assert not trial.attempt_seq[1].success
+
+    for attempt in (
+        copy.deepcopy(trial.attempt_seq[0]),
+        pickle.loads(pickle.dumps(trial.attempt_seq[0])),
+    ):
+        assert attempt == trial.attempt_seq[0]
+        assert attempt.results.to_list() == results[0]
+        assert str(attempt) == str(trial.attempt_seq[0])
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from openlock.trial_log_file import TrialLogFile, write_trial_logs
+
+
+def run_trial(env, attempts):
+    for action_names in attempts:
+        env.reset()
+        for action_name in action_names:
+            env.step(env.action_map[action_name])
+        env.finish_attempt()
+    env.cur_trial.finish(env.get_time_source().time())
+    return env.cur_trial
+
+
+def test_round_trip(make_fsm_env, tmp_path):
+    trials = [
+        run_trial(
+            make_fsm_env("CC3", "trial1"),
+            [("push_l0", "push_l1", "push_door"), ("pull_l0", "push_l2", "push_l1")],
+        ),
+        run_trial(make_fsm_env("CE4", "trial7"), [("push_l1", "push_l0", "push_door")]),
+    ]
+    # attempts recorded with list results
+    trials[1].attempt_seq[0].results = trials[1].attempt_seq[0].results.to_list()
+    path = str(tmp_path / "trials.oltl")
+    write_trial_logs(path, trials)
+
+    with TrialLogFile(path) as log_file:
+        assert len(log_file) == 2
+        np.testing.assert_array_equal(
+            log_file.columns["attempt_success"],
+            [a.success for t in trials for a in t.attempt_seq],
+        )
+        for trial, view in zip(trials, log_file):
+            for name in (
+                "name",
+                "scenario_name",
+                "start_time",
+                "end_time",
+                "success",
+                "solution_found",
+            ):
+                assert getattr(view, name) == getattr(trial, name)
+            # solutions are stored as action names
+            for name in ("solutions", "completed_solutions"):
+                assert getattr(view, name) == [
+                    list(map(str, solution)) for solution in getattr(trial, name)
+                ]
+            for attempt, attempt_view in zip(trial.attempt_seq, view.attempt_seq):
+                assert attempt_view == attempt
+                assert attempt_view.results.to_list() == list(
+                    map(list, attempt.results)
+                )
+                assert [
+                    (a.start_time, a.end_time, a.reward)
+                    for a in attempt_view.action_seq
+                ] == [(a.start_time, a.end_time, a.reward) for a in attempt.action_seq]
+
+            loaded = view.to_trial_log()
+            assert loaded.completed_solutions_mask == trial.completed_solutions_mask
+            assert [str(a) for a in loaded.attempt_seq] == [
+                str(a) for a in trial.attempt_seq
+            ]
+
+
+def test_not_a_trial_log(tmp_path):
+    path = tmp_path / "results.csv"
+    path.write_text("frame,a,b\n")
+    with pytest.raises(ValueError):
+        TrialLogFile(str(path))
+
+
+def test_close_with_live_columns(make_fsm_env, tmp_path):
+    trial = run_trial(
+        make_fsm_env("CC3", "trial1"), [("push_l0", "push_l1", "push_door")]
+    )
+    path = str(tmp_path / "trials.oltl")
+    write_trial_logs(path, [trial])
+    with TrialLogFile(path) as log_file:
+        success = log_file.columns["attempt_success"]
+        results = log_file[0].attempt_seq[0].results
+    # the columns kept outlive the file
+    assert success.tolist() == [True]
+    assert len(results) == len(trial.attempt_seq[0].results)
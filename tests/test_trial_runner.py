@@ -0,0 +1,135 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from openlock.trial_runner import (
+    RandomAgent,
+    TrialRunner,
+    load_summaries,
+    make_grid,
+    make_protocol_jobs,
+)
+
+JOBS = make_grid(["CC3", "CE4"], [None], range(3), attempt_limit=4)
+
+
+class FailingAgent(object):
+    def __init__(self, job):
+        pass
+
+    def act(self, observation, action_space):
+        raise KeyError("no action")
+
+
+class ExitingAgent(object):
+    def __init__(self, job):
+        pass
+
+    def act(self, observation, action_space):
+        # dies like a worker crashing in the simulator
+        os._exit(1)
+
+
+class SlowAgent(RandomAgent):
+    def act(self, observation, action_space):
+        time.sleep(0.25)
+        return super(SlowAgent, self).act(observation, action_space)
+
+
+class SolvingAgent(object):
+    """
+    Takes the actions of every solution of its trial in turn.
+    """
+
+    solutions = []
+
+    def __init__(self, job):
+        self.actions = iter(sum(self.solutions, []))
+
+    def act(self, observation, action_space):
+        return next(self.actions)
+
+
+def test_workers_match_inline():
+    inline = list(TrialRunner(RandomAgent, num_workers=0).run(JOBS))
+    parallel = list(TrialRunner(RandomAgent, num_workers=2).run(JOBS))
+    assert len(inline) == len(JOBS) * 4
+    assert sorted(parallel) == sorted(inline)
+
+
+def test_protocol_jobs():
+    (job,) = make_protocol_jobs("CC3-CE4", [0])
+    assert [spec.scenario_name for spec in job.trials] == ["CC3"] * 6 + ["CE4"]
+    summaries = list(
+        TrialRunner(RandomAgent, num_workers=0).run(
+            [job._replace(trials=job.trials[-2:])]
+        )
+    )
+    assert [s.scenario_name for s in summaries] == ["CC3"] * 30 + ["CE4"] * 30
+
+
+def test_resume(tmp_path):
+    log_path = str(tmp_path / "log.jsonl")
+    runner = TrialRunner(RandomAgent, num_workers=2, log_path=log_path)
+    summaries = list(runner.run(JOBS))
+    assert list(runner.run(JOBS)) == []
+
+    # interrupt the last job after its first attempt
+    with open(log_path) as f:
+        lines = f.readlines()
+    last_job = JOBS[-1].key
+    kept = [line for line in lines if last_job not in line]
+    kept.append(next(line for line in lines if last_job in line))
+
+    # and cut off the last line of the log while it was written
+    kept.append(kept[-1][: len(kept[-1]) // 2])
+    with open(log_path, "w") as f:
+        f.writelines(kept)
+
+    rerun = list(runner.run(JOBS))
+    assert {s.job for s in rerun} == {last_job}
+    logged, finished = load_summaries(log_path)
+    assert finished == {job.key for job in JOBS}
+    assert sorted(logged) == sorted(summaries)
+
+
+def test_worker_error():
+    with pytest.raises(RuntimeError, match="no action"):
+        list(TrialRunner(FailingAgent, num_workers=2).run(JOBS[:2]))
+
+
+def test_trial_ends_once_solved(make_fsm_env, monkeypatch):
+    env = make_fsm_env("CC3", "trial1")
+    solutions = [
+        [str(action) for action in solution] for solution in env.get_solutions()
+    ]
+    monkeypatch.setattr(SolvingAgent, "solutions", solutions)
+    num_solutions = len(solutions)
+    jobs = make_grid(["CC3"], ["trial1"], [0], attempt_limit=10)
+    summaries = list(TrialRunner(SolvingAgent, num_workers=0).run(jobs))
+    assert len(summaries) == num_solutions
+    assert all(summary.success for summary in summaries)
+
+
+def test_worker_exit():
+    with pytest.raises(RuntimeError, match="exited"):
+        list(TrialRunner(ExitingAgent, num_workers=2).run(JOBS[:2]))
+
+
+def test_global_random_state_untouched():
+    np.random.seed(0)
+    expected = np.random.random_sample()
+    np.random.seed(0)
+    list(TrialRunner(RandomAgent, num_workers=0).run(JOBS[:2]))
+    assert np.random.random_sample() == expected
+
+
+def test_stop_early():
+    summaries = TrialRunner(SlowAgent, num_workers=2).run(JOBS[:4])
+    next(summaries)
+    start = time.time()
+    # the running jobs have several seconds of attempts left
+    summaries.close()
+    assert time.time() - start < 1
@@ -0,0 +1,73 @@
+import numpy as np
+
+from openlock.envs.openlock_env import OpenLockEnv
+
+ATTEMPTS = [
+    ("push_l0", "push_l1", "push_door"),
+    ("pull_l0", "push_l2", "push_inactive1"),
+    ("push_l0", "push_l2", "push_door"),
+]
+
+
+def run_attempts(restore):
+    env = OpenLockEnv()
+    env.use_physics = True
+    env.human_agent = False
+    env.initialize_for_scenario("CC3")
+    env.setup_trial(
+        scenario_name="CC3", action_limit=3, attempt_limit=10, specified_trial="trial1"
+    )
+    outcomes = []
+    world_defs = set()
+    for attempt in ATTEMPTS:
+        if not restore:
+            # without a world to restore, reset builds a new one
+            env.world_def = None
+        env.reset()
+        world_defs.add(id(env.world_def))
+        for action_name in attempt:
+            obs, reward, _, _ = env.step(env.action_map[action_name])
+            outcomes.append(
+                (
+                    list(obs),
+                    reward,
+                    env.world_def.clock,
+                    env.world_def.get_abs_config(),
+                    env.get_state()["OBJ_STATES"],
+                )
+            )
+        env.finish_attempt()
+    return outcomes, len(world_defs)
+
+
+def test_restored_world_matches_new_world():
+    rebuilt, num_rebuilt = run_attempts(restore=False)
+    restored, num_restored = run_attempts(restore=True)
+    assert (num_rebuilt, num_restored) == (len(ATTEMPTS), 1)
+    # the first attempt opens the door, so the door lock is restored too
+    assert rebuilt[2][4]["door"] == 1
+    assert restored == rebuilt
+
+
+def test_snapshot_restore():
+    env = OpenLockEnv()
+    env.use_physics = True
+    env.human_agent = False
+    env.initialize_for_scenario("CC3")
+    env.setup_trial(
+        scenario_name="CC3", action_limit=3, attempt_limit=10, specified_trial="trial1"
+    )
+    env.reset()
+    world_def = env.world_def
+    env.step(env.action_map["push_l0"])
+    snapshot = world_def.snapshot()
+    config = world_def.get_abs_config()
+    state = world_def.get_state()["OBJ_STATES"]
+
+    env.step(env.action_map["pull_l0"])
+    assert world_def.get_abs_config() != config
+    world_def.restore(snapshot)
+    assert world_def.clock == snapshot.clock
+    assert world_def.get_abs_config() == config
+    assert world_def.get_state()["OBJ_STATES"] == state
+    np.testing.assert_array_equal(world_def.torque, snapshot.torque)